@@ -0,0 +1,52 @@
+"""Load-test the sync and async read paths under uvicorn.
+
+Starts love_project.asgi twice, with ASYNC_VIEWS=False and ASYNC_VIEWS=True,
+and compares requests/s and p50/p99 latency per endpoint. Prints JSON.
+
+Usage: python -m benchmarks.async_load [--concurrency N] [--duration S] [--messages M]
+"""
+import argparse
+import json
+
+from benchmarks.harness import (
+    UvicornServer, benchmark_env, run_load, seed, session_cookie, setup_django, summarize, temp_db_path,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--messages', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    setup_django(db_path)
+    (user, pages), = seed(users=1, pages=2, messages=args.messages)
+    cookie = session_cookie(user)
+    page = pages[0]
+
+    endpoints = {
+        'view_page': (f'/view/{page.id}/', {}),
+        'preview_page': (f'/preview/{page.id}/', {'Cookie': cookie}),
+        'page_analytics': (f'/analytics/{page.id}/', {'Cookie': cookie}),
+    }
+
+    results = {}
+    for mode in ('sync', 'async'):
+        env = benchmark_env(db_path, ASYNC_VIEWS=mode == 'async', VIEW_COUNT_FLUSH_INTERVAL=1)
+        with UvicornServer(env) as server:
+            for name, (path, headers) in endpoints.items():
+                run_load(server.port, path, concurrency=2, duration=0.5, headers=headers)  # warm up
+                latencies, errors, elapsed = run_load(
+                    server.port, path, args.concurrency, args.duration, headers
+                )
+                results.setdefault(name, {})[mode] = summarize(latencies, elapsed, errors)
+
+    for name, modes in results.items():
+        modes['rps_ratio'] = round(modes['async']['rps'] / modes['sync']['rps'], 2) if modes['sync']['rps'] else None
+    print(json.dumps({'concurrency': args.concurrency, 'duration': args.duration, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Time to first request of a fresh worker, and what it imported on the way.
+
+Starts love_project.asgi under a new uvicorn process --repeat times and
+measures the time from spawn until the first request to --path is answered:
+interpreter start, imports, django.setup(), the first middleware and URLconf
+load, and the request itself. Also reports the startup import profile from
+`manage.py profile_imports` and whether the QR/imaging stack (qrcode, PIL,
+numpy) was loaded before any QR was asked for.
+
+With --max-ms the run exits non-zero when the median time to first request
+exceeds it, so it can guard against import-time regressions.
+
+Usage: python -m benchmarks.cold_start [--repeat N] [--path /login/] [--max-ms MS]
+"""
+import argparse
+import http.client
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import REPO_ROOT, benchmark_env, free_port, setup_django, temp_db_path
+
+HEAVY_MODULES = ('qrcode', 'PIL', 'numpy')
+
+
+def time_to_first_request(env, path, timeout=60.0):
+    """Seconds from spawning a uvicorn worker until it answers path"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'love_project.asgi:application', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=REPO_ROOT, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+                conn.request('GET', path)
+                status = conn.getresponse().status
+                conn.close()
+            except OSError:
+                time.sleep(0.005)
+                continue
+            if status >= 500:
+                raise RuntimeError(f'{path} answered {status}')
+            return time.perf_counter() - started
+        raise RuntimeError('uvicorn did not answer in time')
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def heavy_modules_loaded(env):
+    """Which of HEAVY_MODULES a worker has imported once its app and URLconf are loaded"""
+    script = (
+        'import sys, django; django.setup(); import love_project.asgi, love_project.urls; '
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    return output.split(',') if output else []
+
+
+def import_profile(env, top):
+    output = subprocess.run(
+        [sys.executable, 'manage.py', 'profile_imports', '--json', '--top', str(top)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--path', default='/login/', help='First request; one that renders no QR')
+    parser.add_argument('--top', type=int, default=15, help='Slowest startup imports to report')
+    parser.add_argument('--max-ms', type=float, help='Fail when the median time to first request is above this')
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    setup_django(db_path)
+    # No pool warm-up: it would open connections before the first request and blur what is measured
+    env = benchmark_env(db_path, DB_WARMUP='False')
+
+    time_to_first_request(env, args.path)  # warm the OS file cache and .pyc files
+    times = [time_to_first_request(env, args.path) for _ in range(args.repeat)]
+    median_ms = statistics.median(times) * 1000
+    profile = import_profile(env, args.top)
+    print(json.dumps({
+        'path': args.path,
+        'repeat': args.repeat,
+        'time_to_first_request_ms': {
+            'min': round(min(times) * 1000, 1),
+            'median': round(median_ms, 1),
+            'max': round(max(times) * 1000, 1),
+        },
+        'startup_imports_ms': profile['total_ms'],
+        'slowest_imports': profile['modules'],
+        'heavy_modules_at_startup': heavy_modules_loaded(env),
+    }, indent=2))
+    if args.max_ms is not None and median_ms > args.max_ms:
+        sys.exit(f'Median time to first request {median_ms:.1f} ms is above {args.max_ms} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Effect of compression_middleware on editor, viewer and messages API payloads.
+
+Seeds a page with --messages messages and fetches edit_page, view_page and
+the messages API with no Accept-Encoding, with gzip and with br, recording
+the bytes sent, the encoder's CPU time per response (from the middleware's
+own counters), in-process latency and the transfer time the saved bytes are
+worth on a --mbps link. Then, unless --skip-load, load-tests the same pages
+under uvicorn per encoding for requests/s.
+
+Usage: python -m benchmarks.compression [--messages N] [--iterations N] [--mbps N] [--skip-load]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.harness import (
+    UvicornServer, benchmark_env, percentile, run_load, seed, session_cookie, setup_django, summarize,
+    temp_db_path,
+)
+
+ENCODINGS = {'identity': None, 'gzip': 'gzip', 'br': 'br'}
+
+
+def payloads(page):
+    from django.urls import reverse
+    return {
+        'edit_page': (reverse('edit_page', args=[page.id]), True),
+        'view_page': (reverse('view_page', args=[page.id]), False),
+        'page_messages': (reverse('page_messages', args=[page.id]) + '?limit=1000', False),
+    }
+
+
+def bench_payload(client, path, accept, iterations):
+    from love_project.compression import stats
+
+    headers = {'HTTP_ACCEPT_ENCODING': accept} if accept else {}
+    client.get(path, **headers)  # warm caches
+    stats.reset()
+    latencies, size = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(path, **headers)
+        latencies.append(time.perf_counter() - started)
+        size = len(response.content)
+    encoded = stats.totals().get(accept, [0, 0, 0, 0.0])
+    return {
+        'status': response.status_code,
+        'content_encoding': response.get('Content-Encoding'),
+        'bytes': size,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'encode_cpu_ms': round(encoded[3] / encoded[0] * 1000, 3) if encoded[0] else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--mbps', type=float, default=10.0, help='Link speed for the transfer time estimate')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--skip-load', action='store_true')
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    setup_django(db_path, VIEW_COUNT_FLUSH_INTERVAL=0)
+    from django.test import Client
+
+    (user, (page,)), = seed(users=1, pages=1, messages=args.messages)
+    results = {}
+    for name, (path, auth) in payloads(page).items():
+        client = Client()
+        if auth:
+            client.force_login(user)
+        runs = {encoding: bench_payload(client, path, accept, args.iterations) for encoding, accept in ENCODINGS.items()}
+        identity = runs['identity']['bytes']
+        for encoding, run in runs.items():
+            run['ratio'] = round(run['bytes'] / identity, 3) if identity else None
+            # Time the saved bytes would take on the wire, against the CPU spent saving them
+            run['transfer_ms'] = round(run['bytes'] * 8 / (args.mbps * 1000), 3)
+        results[name] = {'in_process': runs}
+
+    if not args.skip_load:
+        env = benchmark_env(db_path, VIEW_COUNT_FLUSH_INTERVAL=1)
+        with UvicornServer(env) as server:
+            for name, (path, auth) in payloads(page).items():
+                cookie = {'Cookie': session_cookie(user)} if auth else {}
+                results[name]['uvicorn'] = {}
+                for encoding, accept in ENCODINGS.items():
+                    headers = dict(cookie, **({'Accept-Encoding': accept} if accept else {}))
+                    run_load(server.port, path, concurrency=2, duration=0.5, headers=headers)  # warm up
+                    latencies, errors, elapsed = run_load(server.port, path, args.concurrency, args.duration, headers)
+                    results[name]['uvicorn'][encoding] = summarize(latencies, elapsed, errors)
+
+    from love_messages.qr_service import qr_render_service
+    qr_render_service.shutdown()  # its worker processes would outlive this one
+    print(json.dumps({'messages': args.messages, 'mbps': args.mbps, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Shared helpers for the benchmark scripts: fixtures, a local uvicorn server and a load generator.
+
+Benchmarks run against a throwaway SQLite database (USE_SQLITE/SQLITE_PATH),
+never against the configured MSSQL server.
+"""
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def benchmark_env(db_path, **overrides):
+    """Environment for the benchmark database and any setting overrides"""
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'love_project.settings',
+        'USE_SQLITE': 'True',
+        'SQLITE_PATH': db_path,
+        'PAGE_CACHE_LOCATION': os.path.join(os.path.dirname(db_path), 'page-cache'),
+    })
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
+
+
+def setup_django(db_path, **overrides):
+    """Configure Django in this process against a fresh benchmark database and migrate it"""
+    os.environ.update(benchmark_env(db_path, **overrides))
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def temp_db_path():
+    return os.path.join(tempfile.mkdtemp(prefix='love-bench-'), 'bench.sqlite3')
+
+
+def seed(users=1, pages=10, messages=20):
+    """Create users, each with pages of messages; returns [(user, [page, ...]), ...]"""
+    from django.contrib.auth.models import User
+    from love_messages.models import Message, MessagePage
+
+    seeded = []
+    for u in range(users):
+        user = User.objects.create_user(username=f'bench{u}-{time.time_ns()}', password='bench-password')
+        user_pages = MessagePage.objects.bulk_create([
+            MessagePage(user=user, title=f'Bench page {p}') for p in range(pages)
+        ])
+        Message.objects.bulk_create([
+            Message(page=page, text=f'Love message number {m} on {page.title}', order=m)
+            for page in user_pages for m in range(messages)
+        ], batch_size=500)
+        seeded.append((user, user_pages))
+    return seeded
+
+
+def session_cookie(user):
+    """Cookie header of a logged-in session for user, without going through the login form"""
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.sessions.backends.db import SessionStore
+
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class UvicornServer:
+    """love_project.asgi under a local uvicorn process, as deployed"""
+
+    def __init__(self, env, workers=1):
+        self.env = env
+        self.workers = workers
+        self.port = free_port()
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'love_project.asgi:application',
+             '--port', str(self.port), '--workers', str(self.workers), '--log-level', 'warning'],
+            cwd=REPO_ROOT, env=self.env,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError('uvicorn did not start')
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def run_load(port, path, concurrency=8, duration=5.0, headers=None):
+    """Hit path with concurrency keep-alive clients for duration seconds; returns latencies and errors"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors), time.perf_counter() - started
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Latency percentiles (ms) and throughput for one benchmark run"""
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3) if latencies else 0.0,
+    }
@@ -0,0 +1,102 @@
+"""Enqueue latency and worker throughput of the background job queue.
+
+Measures how long a request waits to enqueue a job (jobs.enqueue directly,
+with and without an idempotency key, and duplicate_page?async=1 through the
+test client), then queues --jobs duplicate_page jobs per --concurrency level
+and times `manage.py run_worker --burst` draining them in a child process,
+as deployed. Prints JSON.
+
+Usage: python -m benchmarks.jobs [--jobs N] [--messages N] [--concurrency 1,2,4] [--iterations N]
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import REPO_ROOT, benchmark_env, percentile, seed, setup_django, temp_db_path
+
+
+def latency_summary(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+    }
+
+
+def bench_enqueue(user, page, iterations):
+    from django.test import Client
+    from love_messages.jobs import enqueue
+    from love_messages.models import Job
+
+    payload = {'page_id': str(page.id)}
+    client = Client()
+    client.force_login(user)
+    cases = {
+        'enqueue': lambda i: enqueue('duplicate_page', payload, user=user),
+        'enqueue_idempotent_new': lambda i: enqueue('duplicate_page', payload, user=user, idempotency_key=f'bench-{i}'),
+        'enqueue_idempotent_repeat': lambda i: enqueue('duplicate_page', payload, user=user, idempotency_key='bench-0'),
+        'duplicate_page_async_request': lambda i: client.get(f'/duplicate/{page.id}/?async=1'),
+    }
+    results = {}
+    for name, func in cases.items():
+        latencies = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            func(i)
+            latencies.append(time.perf_counter() - started)
+        results[name] = latency_summary(latencies)
+    # Leave the queue empty for the throughput runs
+    Job.objects.all().delete()
+    return results
+
+
+def bench_worker(db_path, user, page, jobs, concurrency):
+    from love_messages.jobs import enqueue
+    from love_messages.models import Job
+
+    for _ in range(jobs):
+        enqueue('duplicate_page', {'page_id': str(page.id)}, user=user)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, 'manage.py', 'run_worker', '--burst', '--concurrency', str(concurrency),
+         '--poll-interval', '0.05'],
+        cwd=REPO_ROOT, env=benchmark_env(db_path), capture_output=True, text=True, check=True,
+    ).stdout
+    elapsed = time.perf_counter() - started
+    ran = int(re.search(r'Ran (\d+) jobs', output).group(1))
+    failed = Job.objects.exclude(status=Job.SUCCEEDED).count()
+    Job.objects.all().delete()
+    return {
+        'jobs': ran,
+        'not_succeeded': failed,
+        'seconds': round(elapsed, 3),
+        # Includes the child's startup, as a freshly deployed worker would
+        'jobs_per_second': round(ran / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=50, help='Messages on the page each job duplicates')
+    parser.add_argument('--concurrency', default='1,2,4')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed enqueues per case')
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    setup_django(db_path)
+    (user, (page,)), = seed(users=1, pages=1, messages=args.messages)
+
+    results = {'enqueue': bench_enqueue(user, page, args.iterations), 'worker': {}}
+    for concurrency in map(int, args.concurrency.split(',')):
+        results['worker'][concurrency] = bench_worker(db_path, user, page, args.jobs, concurrency)
+    print(json.dumps({'jobs': args.jobs, 'messages': args.messages, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark the vectorized heart QR renderer against the original per-pixel version.
+
+Usage: python benchmarks/qr_render.py [--repeat N]
+"""
+import argparse
+import io
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qrcode
+from PIL import Image, ImageDraw
+
+from love_messages.qr_render import render_heart_qr_png
+
+URL = "https://snowfall.example.com/view/2453bd13-de26-4015-addd-b3960f3c1fc3/"
+
+
+def legacy_remove_white_bg(image):
+    """Original per-pixel implementation of views.remove_whiteBG"""
+    datas = image.getdata()
+    new_data = []
+    for item in datas:
+        if item[0] > 240 and item[1] > 240 and item[2] > 240:
+            new_data.append((255, 255, 255, 0))
+        else:
+            new_data.append(item)
+    image.putdata(new_data)
+    return image
+
+
+def legacy_heart_qr_png(url):
+    """Original views.generate_heart_qr_code, returning PNG bytes instead of a data URI"""
+    qr = qrcode.QRCode(version=6, error_correction=qrcode.constants.ERROR_CORRECT_H, box_size=8, border=1)
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="red", back_color="white").convert("RGBA")
+    qr_img = legacy_remove_white_bg(qr_img)
+    qr_size = qr_img.size[0]
+
+    mask_left = Image.new("L", (qr_size, qr_size), 0)
+    ImageDraw.Draw(mask_left).pieslice([0, 0, qr_size, qr_size], 90, 270, fill=255)
+    mask_right = Image.new("L", (qr_size, qr_size), 0)
+    ImageDraw.Draw(mask_right).pieslice([0, 0, qr_size, qr_size], 270, 90, fill=255)
+
+    qr_left = qr_img.copy()
+    qr_left.putalpha(mask_left)
+    qr_left = legacy_remove_white_bg(qr_left)
+    qr_right = qr_img.copy()
+    qr_right.putalpha(mask_right)
+    qr_right = legacy_remove_white_bg(qr_right)
+
+    qr_left = qr_left.rotate(-45, expand=False, fillcolor=(255, 255, 255, 0))
+    qr_right = qr_right.rotate(45, expand=False, fillcolor=(255, 255, 255, 0))
+    rotated_qr = qr_img.rotate(45, expand=True, fillcolor=(255, 255, 255, 0))
+    rotated_size = rotated_qr.size[0]
+
+    heart_width = rotated_size + qr_size
+    heart_height = rotated_size + qr_size // 2
+    heart_img = Image.new('RGBA', (heart_width, heart_height), (255, 255, 255, 0))
+    qr_x = (heart_width - rotated_size) // 2
+    qr_y = heart_height - rotated_size - 10
+    heart_img.paste(rotated_qr, (qr_x, qr_y), rotated_qr)
+
+    radius = qr_size // 2
+    center_x = heart_width // 2
+    vertical_offset = (radius // 2) + 40
+    horizontal_offset = int(radius // (2 * math.pi))
+    left_center_x = center_x - radius // 2 - horizontal_offset
+    right_center_x = center_x + radius // 2 + horizontal_offset
+    heart_img.paste(qr_left, (left_center_x - radius, qr_y + vertical_offset - radius), qr_left)
+    heart_img.paste(qr_right, (right_center_x - radius, qr_y + vertical_offset - radius), qr_right)
+
+    border_size = 15
+    bordered_img = Image.new('RGBA', (heart_width + border_size * 2, heart_height + border_size * 2),
+                             (255, 182, 193, 100))
+    bordered_img.paste(heart_img, (border_size, border_size), heart_img)
+
+    buffered = io.BytesIO()
+    bordered_img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if legacy_heart_qr_png(URL) != render_heart_qr_png(URL):
+        sys.exit("Vectorized renderer output differs from the per-pixel version")
+
+    legacy = min(timeit.repeat(lambda: legacy_heart_qr_png(URL), number=1, repeat=args.repeat))
+    vectorized = min(timeit.repeat(lambda: render_heart_qr_png(URL), number=1, repeat=args.repeat))
+    print(f"per-pixel:  {legacy * 1000:8.2f} ms")
+    print(f"vectorized: {vectorized * 1000:8.2f} ms")
+    print(f"speedup:    {legacy / vectorized:8.2f}x (PNG output byte-identical)")
+
+
+if __name__ == "__main__":
+    main()
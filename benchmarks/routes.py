@@ -0,0 +1,315 @@
+"""Latency, queries, memory and throughput of every route in love_messages/urls.py.
+
+Seeds --users users with --pages pages of --messages messages, then:
+
+* in process, drives each route through the Django test client and records
+  p50/p95/p99 latency, template render time (from Server-Timing), response
+  size, queries per request and peak allocated memory (tracemalloc, measured
+  on separate runs so it does not skew timings);
+* under a local uvicorn server (love_project.asgi, as deployed) load-tests
+  the routes that are safe to repeat (GETs) for requests/s and latency;
+* micro-benchmarks the QR generators, views.generate_heart_qr_code (cold and
+  cached) and MessagePage.generate_heart_qr.
+
+Prints JSON (or writes it to --output) tagged with the git commit, so runs can
+be diffed across commits. A route added to urls.py without an entry in ROUTES
+fails the run.
+
+Usage: python -m benchmarks.routes [--iterations N] [--duration S] [--only name,...] [--output FILE]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import time
+import timeit
+import tracemalloc
+from collections import namedtuple
+
+from benchmarks.harness import (
+    REPO_ROOT, UvicornServer, benchmark_env, percentile, run_load, seed, session_cookie, setup_django,
+    summarize, temp_db_path,
+)
+
+# path(fx) -> URL; body(fx) -> (kind, data); auth names the fixture user to log in as;
+# prepare(fx) runs untimed before each request; load marks routes safe to hammer under uvicorn
+Route = namedtuple('Route', 'method path body auth prepare load', defaults=(None, 'user', None, False))
+
+
+def _json(data):
+    return ('json', data)
+
+
+def _fresh_page(fx):
+    from love_messages.models import MessagePage
+    fx['scratch_page'] = MessagePage.objects.create(user=fx['user'], title='Scratch page')
+
+
+def _fresh_message(fx):
+    from love_messages.models import Message
+    fx['scratch_message'] = Message.objects.create(page=fx['other_page'], text='Scratch message', order=999)
+
+
+def _reset_copies(fx):
+    from love_messages.models import MessagePage
+    MessagePage.objects.filter(user=fx['copier']).exclude(pk=fx['copier_page'].pk).delete()
+
+
+def _export_body(fx):
+    from love_messages.models import MessagePage
+    from love_messages.transfer import export_lines
+    return ('ndjson', ''.join(export_lines(MessagePage.objects.filter(pk=fx['other_page'].pk))))
+
+
+# One entry per URL name in love_messages/urls.py
+ROUTES = {
+    'dashboard': Route('GET', lambda fx: '/', load=True),
+    'register': Route('GET', lambda fx: '/register/', auth=None, load=True),
+    'login': Route('GET', lambda fx: '/login/', auth=None, load=True),
+    'logout': Route('POST', lambda fx: '/logout/'),
+    'create_page': Route('GET', lambda fx: '/create/', load=True),
+    'edit_page': Route('GET', lambda fx: f"/edit/{fx['page'].id}/", load=True),
+    'view_page': Route('GET', lambda fx: f"/view/{fx['page'].id}/", auth=None, load=True),
+    'page_analytics': Route('GET', lambda fx: f"/analytics/{fx['page'].id}/", load=True),
+    'heart_qr_png': Route('GET', lambda fx: f"/qr/{fx['page'].id}.png", auth=None, load=True),
+    'heart_qr_webp': Route('GET', lambda fx: f"/qr/{fx['page'].id}.webp", auth=None, load=True),
+    'heart_qr_svg': Route('GET', lambda fx: f"/qr/{fx['page'].id}.svg", auth=None, load=True),
+    'duplicate_page': Route('GET', lambda fx: f"/duplicate/{fx['other_page'].id}/"),
+    'duplicate_all_pages': Route('POST', lambda fx: '/duplicate-all/', auth='copier', prepare=_reset_copies),
+    'delete_page': Route('POST', lambda fx: f"/delete/{fx['scratch_page'].id}/", prepare=_fresh_page),
+    'add_message': Route('POST', lambda fx: f"/api/add-message/{fx['other_page'].id}/",
+                         lambda fx: _json({'text': 'Benchmark message', 'order': 1000})),
+    'add_messages': Route('POST', lambda fx: f"/api/add-messages/{fx['scratch_page'].id}/",
+                          lambda fx: _json({'messages': [{'text': f'Bulk {i}', 'order': i} for i in range(20)]}),
+                          prepare=_fresh_page),
+    'delete_message': Route('DELETE', lambda fx: f"/api/delete-message/{fx['scratch_message'].id}/",
+                            prepare=_fresh_message),
+    'copy_messages': Route('POST', lambda fx: '/api/copy-messages/', lambda fx: _json({
+        'source_page_id': str(fx['page'].id), 'target_page_id': str(fx['scratch_page'].id)}),
+        prepare=_fresh_page),
+    'update_message': Route('POST', lambda fx: f"/api/update-message/{fx['message'].id}/",
+                            lambda fx: _json({'text': 'Updated by the benchmark'})),
+    'reorder_messages': Route('POST', lambda fx: f"/api/reorder-messages/{fx['page'].id}/",
+                              lambda fx: _json({'message_ids': fx['message_ids'][::-1]})),
+    'page_messages': Route('GET', lambda fx: f"/api/pages/{fx['page'].id}/messages/", auth=None, load=True),
+    'job_list': Route('GET', lambda fx: '/api/jobs/', load=True),
+    'job_status': Route('GET', lambda fx: f"/api/jobs/{fx['job'].id}/", load=True),
+    'export_pages': Route('GET', lambda fx: '/api/export/', load=True),
+    'import_pages': Route('POST', lambda fx: '/api/import/', _export_body),
+    'preview_page': Route('GET', lambda fx: f"/preview/{fx['page'].id}/", load=True),
+}
+
+
+def url_names():
+    from django.urls import get_resolver
+    return {pattern.name for pattern in get_resolver('love_messages.urls').url_patterns if pattern.name}
+
+
+def fixtures(users, pages, messages):
+    """Seeded objects the routes act on: the first user's pages, plus a one-page user for duplicate-all"""
+    from love_messages.jobs import enqueue
+
+    seeded = seed(users=users, pages=pages, messages=messages)
+    user, user_pages = seeded[0]
+    page, other_page = user_pages[0], user_pages[-1]
+    (copier, (copier_page,)), = seed(users=1, pages=1, messages=messages)
+    job, _ = enqueue('duplicate_page', {'page_id': str(page.id)}, user=user)
+    return {
+        'user': user,
+        'copier': copier,
+        'copier_page': copier_page,
+        'page': page,
+        'other_page': other_page,
+        'message': page.messages.order_by('order', 'id').first(),
+        'message_ids': list(page.messages.values_list('id', flat=True)),
+        'job': job,
+    }
+
+
+def request(client, route, fx):
+    path, body = route.path(fx), route.body(fx) if route.body else None
+    method = getattr(client, route.method.lower())
+    if body is None:
+        return method(path)
+    kind, data = body
+    content_type = 'application/json' if kind == 'json' else 'application/x-ndjson'
+    return method(path, json.dumps(data) if kind == 'json' else data, content_type=content_type)
+
+
+def consume(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def template_ms(response):
+    """Template render time reported by love_project.metrics in Server-Timing"""
+    for entry in response.get('Server-Timing', '').split(', '):
+        name, _, rest = entry.partition(';dur=')
+        if name == 'tpl':
+            return float(rest.split(';')[0])
+    return None
+
+
+def bench_in_process(name, route, fx, iterations):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    if route.auth:
+        client.force_login(fx[route.auth])
+
+    def once():
+        if route.prepare:
+            route.prepare(fx)
+        if name == 'logout':
+            client.force_login(fx[route.auth])
+        started = time.perf_counter()
+        response = consume(request(client, route, fx))
+        return time.perf_counter() - started, response
+
+    _, response = once()  # warm caches and imports
+    latencies, render_times, sizes = [], [], []
+    for _ in range(iterations):
+        elapsed, response = once()
+        latencies.append(elapsed)
+        sizes.append(len(response.getvalue()) if not response.streaming else 0)
+        if template_ms(response) is not None:
+            render_times.append(template_ms(response))
+
+    # Queries and allocations on a few more runs, apart from the timed ones
+    queries, peaks = [], []
+    for _ in range(min(iterations, 5)):
+        if route.prepare:
+            route.prepare(fx)
+        if name == 'logout':
+            client.force_login(fx[route.auth])
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as captured:
+            consume(request(client, route, fx))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries.append(len(captured))
+
+    return {
+        'method': route.method,
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'template_p50_ms': round(statistics.median(render_times), 3) if render_times else None,
+        'response_bytes': max(sizes),
+        'queries': max(queries),
+        'peak_alloc_kb': round(max(peaks) / 1024, 1),
+    }
+
+
+def bench_qr(repeat):
+    """Micro-benchmarks of the QR code generators"""
+    from django.test import RequestFactory
+    from love_messages.models import MessagePage
+    from love_messages.qr_cache import heart_qr_cache
+    from love_messages.views import generate_heart_qr_code
+
+    page = MessagePage(title='QR benchmark')
+    url = f'https://snowfall.example.com{page.get_absolute_url()}'
+    http_request = RequestFactory().get('/', HTTP_HOST='snowfall.example.com')
+
+    def cold():
+        heart_qr_cache.clear()
+        generate_heart_qr_code(url)
+
+    cases = {
+        'generate_heart_qr_code_cold': cold,
+        'generate_heart_qr_code_cached': lambda: generate_heart_qr_code(url),
+        'MessagePage.generate_heart_qr': lambda: page.generate_heart_qr(http_request),
+    }
+    results = {}
+    for name, func in cases.items():
+        func()
+        times = timeit.repeat(func, number=1, repeat=repeat)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {
+            'repeat': repeat,
+            'min_ms': round(min(times) * 1000, 3),
+            'median_ms': round(statistics.median(times) * 1000, 3),
+            'peak_alloc_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=50, help='Timed requests per route in process')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds of uvicorn load per route')
+    parser.add_argument('--qr-repeat', type=int, default=10)
+    parser.add_argument('--only', help='Comma-separated route names')
+    parser.add_argument('--skip-load', action='store_true', help='Skip the uvicorn phase')
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    # Write-through view counts, so every request does the work a deployed one eventually does;
+    # every in-process request sampled for its template render time
+    setup_django(db_path, VIEW_COUNT_FLUSH_INTERVAL=0, METRICS_SAMPLE_RATE=1)
+
+    missing = url_names() - set(ROUTES)
+    if missing:
+        parser.error(f"No benchmark for routes: {', '.join(sorted(missing))}")
+    names = args.only.split(',') if args.only else list(ROUTES)
+
+    fx = fixtures(args.users, args.pages, args.messages)
+    results = {'in_process': {}, 'uvicorn': {}}
+    for name in names:
+        results['in_process'][name] = bench_in_process(name, ROUTES[name], fx, args.iterations)
+
+    if not args.skip_load:
+        env = benchmark_env(db_path, VIEW_COUNT_FLUSH_INTERVAL=1)
+        with UvicornServer(env) as server:
+            for name in names:
+                route = ROUTES[name]
+                if not route.load:
+                    continue
+                path = route.path(fx)
+                headers = {'Cookie': session_cookie(fx[route.auth])} if route.auth else {}
+                run_load(server.port, path, concurrency=2, duration=0.5, headers=headers)  # warm up
+                latencies, errors, elapsed = run_load(server.port, path, args.concurrency, args.duration, headers)
+                results['uvicorn'][name] = summarize(latencies, elapsed, errors)
+
+    results['qr'] = bench_qr(args.qr_repeat)
+    from love_messages.qr_service import qr_render_service
+    qr_render_service.shutdown()  # its worker processes would outlive this one
+    report = json.dumps({
+        'commit': git_commit(),
+        'fixture': {'users': args.users, 'pages': args.pages, 'messages': args.messages},
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'results': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
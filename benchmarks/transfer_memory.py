@@ -0,0 +1,117 @@
+"""Peak memory and throughput of export_pages / import_pages on a large account.
+
+Seeds a user with --messages messages (1M by default) and a second with a
+tenth of that, then runs both commands for each in a subprocess and records
+their peak RSS. With streaming export and chunked import the two peaks should
+be about the same. Prints JSON.
+
+Usage: python -m benchmarks.transfer_memory [--messages N] [--per-page N] [--gzip]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import REPO_ROOT, benchmark_env, setup_django, temp_db_path
+
+
+def seed_account(username, messages, per_page, batch_size=5000):
+    """A user with messages spread over pages of per_page, created in batches to keep this process small"""
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from love_messages.models import Message, MessagePage
+
+    user = User.objects.create_user(username=username, password='bench-password')
+    text = 'Love message number {} with enough text to look like a real note'
+    remaining = messages
+    while remaining:
+        pages = max(1, min(remaining, batch_size) // per_page)
+        with transaction.atomic():
+            page_objs = MessagePage.objects.bulk_create([
+                MessagePage(user=user, title=f'Bench page {p}') for p in range(pages)
+            ])
+            batch = []
+            for page in page_objs:
+                for m in range(min(per_page, remaining)):
+                    batch.append(Message(page=page, text=text.format(m), order=m))
+                    remaining -= 1
+            Message.objects.bulk_create(batch, batch_size=1000)
+    return user
+
+
+def run_command(env, *args):
+    """Run manage.py args in a child; returns (peak RSS in MB, seconds, stdout + stderr)"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', *args], cwd=REPO_ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    output = process.stdout.read().decode()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = status
+    if status:
+        raise RuntimeError(f"manage.py {' '.join(args)} failed:\n{output}")
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return round(rss, 1), time.perf_counter() - started, output
+
+
+def rows_per_second(output):
+    match = re.search(r'\(([\d.]+) rows/s\)', output)
+    return float(match.group(1)) if match else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    setup_django(db_path)
+    from django.contrib.auth.models import User
+
+    sizes = {'small': args.messages // 10, 'large': args.messages}
+    started = time.perf_counter()
+    for name, messages in sizes.items():
+        seed_account(f'export-{name}', messages, args.per_page)
+        User.objects.create_user(username=f'import-{name}', password='bench-password')
+    seed_seconds = time.perf_counter() - started
+
+    env = benchmark_env(db_path)
+    out_dir = os.path.dirname(db_path)
+    results = {}
+    for name, messages in sizes.items():
+        path = os.path.join(out_dir, f'{name}.ndjson' + ('.gz' if args.gzip else ''))
+        export_args = ['export_pages', '--user', f'export-{name}', '--output', path]
+        export_rss, export_seconds, export_output = run_command(env, *export_args + (['--gzip'] if args.gzip else []))
+        import_rss, import_seconds, import_output = run_command(
+            env, 'import_pages', path, '--user', f'import-{name}'
+        )
+        results[name] = {
+            'messages': messages,
+            'file_mb': round(os.path.getsize(path) / (1024 * 1024), 1),
+            'export': {'peak_rss_mb': export_rss, 'seconds': round(export_seconds, 2),
+                       'rows_per_second': rows_per_second(export_output)},
+            'import': {'peak_rss_mb': import_rss, 'seconds': round(import_seconds, 2),
+                       'rows_per_second': rows_per_second(import_output)},
+        }
+
+    small, large = results['small'], results['large']
+    print(json.dumps({
+        'messages': args.messages,
+        'gzip': args.gzip,
+        'seed_seconds': round(seed_seconds, 1),
+        'results': results,
+        # ~1.0 means memory does not grow with the size of the account
+        'export_rss_ratio': round(large['export']['peak_rss_mb'] / small['export']['peak_rss_mb'], 2),
+        'import_rss_ratio': round(large['import']['peak_rss_mb'] / small['import']['peak_rss_mb'], 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 # 6. ADMIN (admin.py)
 from django.contrib import admin
-from .models import MessagePage, Message
+from .models import Job, MessagePage, Message
 
 @admin.register(MessagePage)
 class MessagePageAdmin(admin.ModelAdmin):
@@ -12,4 +12,10 @@ class MessagePageAdmin(admin.ModelAdmin):
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['text', 'page', 'order', 'created_at']
     list_filter = ['page', 'created_at']
-    search_fields = ['text']
\ No newline at end of file
+    search_fields = ['text']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'user', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['user__username', 'idempotency_key']
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class LoveMessagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'love_messages'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from love_project.metrics import registry
+
+        def qr_metrics():
+            from .qr_cache import collect_metrics
+            return collect_metrics()
+
+        registry.register_collector(qr_metrics)
@@ -0,0 +1,201 @@
+"""ASGI-native versions of the read path and the single-message JSON APIs.
+
+These mirror the views of the same name in views.py but use Django's async
+ORM, so under uvicorn they run on the event loop instead of being handed to
+the sync-to-async thread pool. urls.py picks them when settings.ASYNC_VIEWS
+is on. Views that need transaction.atomic (reorder, copy, bulk add) stay sync,
+as the async ORM has no transaction support. The single-message writes hop to
+a thread once, via atomic_call, so the message and its page's snapshot commit
+together.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse, JsonResponse
+from django.db import transaction
+from django.shortcuts import render
+from django.utils import timezone
+
+from love_project.db.routers import replica_reads
+
+from . import page_cache
+from .conditional import not_modified, page_validators, set_validators
+from .models import Message, MessagePage
+from .views import PAGE_MESSAGES_FIELDS, page_messages_query, page_messages_response
+from .view_counter import view_counter
+
+
+def async_login_required(view):
+    """login_required for async views; Django 4.2's decorator only wraps sync ones"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Resolving the lazy request.user hits the session and user tables
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def async_csrf_exempt(view):
+    """csrf_exempt that keeps the view a coroutine function"""
+    view.csrf_exempt = True
+    return view
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+
+
+@sync_to_async
+def atomic_call(func, *args, **kwargs):
+    """Run an ORM write and the signal handlers it fires in one transaction"""
+    with transaction.atomic():
+        return func(*args, **kwargs)
+
+
+@replica_reads
+async def view_page(request, page_id):
+    # Hot pages are served straight from the cache; views are still counted
+    cached = await page_cache.aget_response(page_id)
+    if cached is not None:
+        await view_counter.aincrement(page_id)
+        content, etag, last_modified = cached
+        response = not_modified(request, etag, last_modified) or HttpResponse(content)
+        return set_validators(response, etag, last_modified)
+
+    version = await page_cache.arender_version(page_id)
+    page = await aget_object_or_404(MessagePage.objects.all(), id=page_id)
+
+    # Increment view count
+    await view_counter.aincrement(page.id)
+
+    etag, last_modified = page_validators(page)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = render(request, 'view_page.html', {
+            'page': page,
+            'messages_json': page.messages_json
+        })
+        await page_cache.aset_response(page.id, version, response.content, etag, last_modified)
+    return set_validators(response, etag, last_modified)
+
+
+@replica_reads
+@async_login_required
+async def preview_page(request, page_id):
+    """Preview page in a modal or new tab"""
+    page = await aget_object_or_404(MessagePage.objects.all(), id=page_id, user=request.user)
+
+    etag, last_modified = page_validators(page, variant='preview')
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        # Don't increment view count for preview
+        response = render(request, 'view_page.html', {
+            'page': page,
+            'messages_json': page.messages_json,
+            'is_preview': True
+        })
+    return set_validators(response, etag, last_modified, public=False)
+
+
+@replica_reads
+async def page_messages(request, page_id):
+    """A page's messages as paginated JSON (?fields=text,order&limit=100&cursor=...), with ETag revalidation"""
+    page = await aget_object_or_404(MessagePage.objects.only(*PAGE_MESSAGES_FIELDS), id=page_id)
+    etag, last_modified = page_validators(page, variant='messages')
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        try:
+            rows, fields, limit = page_messages_query(page, request.GET)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        response = page_messages_response(page, [row async for row in rows], fields, limit)
+    return set_validators(response, etag, last_modified)
+
+
+@replica_reads
+@async_login_required
+async def page_analytics(request, page_id):
+    """Simple analytics for page views"""
+    page = await aget_object_or_404(MessagePage.objects.all(), id=page_id, user=request.user)
+
+    context = {
+        'page': page,
+        'total_views': (page.view_count or 0) + view_counter.pending(page.id),
+        'total_messages': page.message_count,
+        'created_days_ago': (timezone.now() - page.created_at).days
+    }
+
+    return render(request, 'analytics.html', context)
+
+
+@async_csrf_exempt
+@async_login_required
+async def add_message(request, page_id):
+    if request.method == 'POST':
+        page = await aget_object_or_404(MessagePage.objects.all(), id=page_id, user=request.user)
+
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+
+        # Check for required 'text' field
+        if 'text' not in data or not data['text'].strip():
+            return JsonResponse({'success': False, 'error': 'Text field is required'}, status=400)
+
+        await atomic_call(
+            Message.objects.create,
+            page=page,
+            text=data['text'],
+            order=data.get('order', 0)
+        )
+
+        return JsonResponse({'success': True})
+
+    return JsonResponse({'success': False}, status=405)
+
+
+@async_csrf_exempt
+@async_login_required
+async def update_message(request, message_id):
+    """Update an existing message"""
+    if request.method == 'POST':
+        message = await aget_object_or_404(Message.objects.all(), id=message_id, page__user=request.user)
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+
+        message.text = data.get('text', message.text)
+        message.font_size = data.get('font_size', message.font_size)
+        await atomic_call(message.save)
+
+        return JsonResponse({
+            'success': True,
+            'message_id': message.id,
+            'text': message.text
+        })
+
+    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+
+@async_csrf_exempt
+@async_login_required
+async def delete_message(request, message_id):
+    if request.method == 'DELETE':
+        try:
+            message = await aget_object_or_404(Message.objects.all(), id=message_id, page__user=request.user)
+            await atomic_call(message.delete)
+            return JsonResponse({'success': True})
+        except Exception:
+            return JsonResponse({'success': False, 'error': 'Message not found or access denied'})
+
+    return JsonResponse({'success': False, 'error': 'Invalid request method'})
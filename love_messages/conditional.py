@@ -0,0 +1,58 @@
+"""ETag / Last-Modified validators for pages, and conditional GET.
+
+A page's validator is derived from its row alone: updated_at (bumped by
+every page and message write) plus messages_version, salted with the
+rendering code (templates and static manifest) so a deploy never answers
+304 for HTML that now renders differently. Views check it before rendering,
+so a revalidation costs at most one page lookup, and no Message query or
+template render.
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.template import loader
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# Templates whose output the page validators vouch for
+RENDERED_TEMPLATES = ('view_page.html', 'base.html')
+
+
+@lru_cache(maxsize=None)
+def render_salt():
+    """Short digest of what renders a page besides its row: templates and static file names"""
+    digest = hashlib.blake2b(digest_size=4)
+    for name in RENDERED_TEMPLATES:
+        digest.update(loader.get_template(name).template.source.encode())
+    manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    if os.path.exists(manifest):
+        with open(manifest, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def page_etag(updated_at, messages_version, variant=''):
+    """Quoted ETag for a page row; variant distinguishes representations of the same page"""
+    tag = f'{render_salt()}-{int(updated_at.timestamp() * 1_000_000):x}-{messages_version}'
+    return quote_etag(f'{variant}-{tag}' if variant else tag)
+
+
+def page_validators(page, variant=''):
+    """(etag, last_modified) of a MessagePage"""
+    return page_etag(page.updated_at, page.messages_version, variant), int(page.updated_at.timestamp())
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 (or 412) response if the request's validators match, else None"""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified=None, public=True):
+    """Attach validators and make caches (CDN and browser) revalidate on every use"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True, **({'public': True} if public else {'private': True}))
+    return response
@@ -0,0 +1,248 @@
+"""Background jobs kept in the database and run by `manage.py run_worker`.
+
+Heavy page operations (duplicating pages, copying messages) can be enqueued
+instead of run in the request. A Job row is the queue entry, the status a
+client polls (/api/jobs/<id>/) and the result; no broker is needed, so this
+runs on one box against the app's own database.
+
+Workers claim a due job with a conditional UPDATE (status queued -> running)
+and only run it if that UPDATE changed the row, so any number of worker
+threads and processes can poll the same table without locking hints that
+SQLite lacks. A failed attempt is retried after JOB_RETRY_BACKOFF seconds,
+doubling with each attempt, up to Job.max_attempts. While jobs run, their worker process refreshes
+Job.heartbeat_at every JOB_HEARTBEAT_INTERVAL seconds; a running job whose
+heartbeat is older than JOB_TIMEOUT was left by a worker that died and is
+requeued. A job that is merely slow keeps its heartbeat and is never run twice.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, MessagePage
+from .services import clone_pages, copy_page_messages
+
+logger = logging.getLogger(__name__)
+
+JOB_TIMEOUT = getattr(settings, 'JOB_TIMEOUT', 600)
+JOB_WORKER_CONCURRENCY = getattr(settings, 'JOB_WORKER_CONCURRENCY', 2)
+JOB_POLL_INTERVAL = getattr(settings, 'JOB_POLL_INTERVAL', 1.0)
+JOB_HEARTBEAT_INTERVAL = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 30)
+JOB_RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 2)
+
+MAX_IDEMPOTENCY_KEY_LENGTH = Job._meta.get_field('idempotency_key').max_length
+
+# kind -> handler(job) returning a JSON-serializable result
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register the decorated function as the handler of jobs of this kind"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload=None, user=None, idempotency_key=None, max_attempts=3):
+    """Queue a job; returns (job, created)
+
+    With an idempotency_key the user's existing job with that key is returned
+    instead of queueing a second one, even when both requests race.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f'Idempotency keys must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters')
+    if idempotency_key:
+        existing = Job.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing, False
+    try:
+        # Its own savepoint, so a lost race leaves the caller's transaction usable
+        with transaction.atomic():
+            job = Job.objects.create(kind=kind, payload=payload or {}, user=user,
+                                     idempotency_key=idempotency_key, max_attempts=max_attempts)
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        return Job.objects.get(user=user, idempotency_key=idempotency_key), False
+    return job, True
+
+
+def claim(worker_id, candidates=5):
+    """Claim the oldest due job for worker_id, or None when there is none"""
+    due = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+        .order_by('run_after', 'created_at').values_list('pk', flat=True)
+    )
+    # Other workers may claim the first few: try the next one rather than poll again
+    for pk in list(due[:candidates]):
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record its outcome"""
+    started = time.perf_counter()
+    try:
+        result = HANDLERS[job.kind](job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        # A page that is gone stays gone: no point retrying
+        if job.attempts < job.max_attempts and not isinstance(e, ObjectDoesNotExist):
+            backoff = JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            fields = {'status': Job.QUEUED, 'run_after': timezone.now() + timedelta(seconds=backoff)}
+        else:
+            fields = {'status': Job.FAILED, 'finished_at': timezone.now()}
+        fields['error'] = f'{type(e).__name__}: {e}'
+    else:
+        fields = {'status': Job.SUCCEEDED, 'result': result, 'error': '', 'finished_at': timezone.now()}
+        logger.info("Job %s (%s) succeeded in %.3fs", job.pk, job.kind, time.perf_counter() - started)
+    # Only if it is still ours: requeue_stale may have handed it to another worker
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return job
+
+
+def run_next(worker_id):
+    """Claim and run one job; returns it, or None when the queue is empty"""
+    job = claim(worker_id)
+    return run(job) if job is not None else None
+
+
+def heartbeat(worker_ids):
+    """Mark the jobs these workers are running as still alive"""
+    return Job.objects.filter(status=Job.RUNNING, locked_by__in=list(worker_ids)).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale(timeout=None):
+    """Put running jobs back in the queue whose worker has not sent a heartbeat for timeout seconds"""
+    cutoff = timezone.now() - timedelta(seconds=JOB_TIMEOUT if timeout is None else timeout)
+    # Jobs claimed before heartbeats existed only have started_at
+    stale = Job.objects.filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+                               status=Job.RUNNING)
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, locked_by='', run_after=timezone.now()
+    )
+    failed = stale.update(
+        status=Job.FAILED, error='Timed out', finished_at=timezone.now()
+    )
+    if requeued or failed:
+        logger.warning("Requeued %s and failed %s stale jobs", requeued, failed)
+    return requeued + failed
+
+
+def unfinished():
+    """Whether any job is still queued (due or backing off) or running"""
+    return Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING]).exists()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class Worker:
+    """concurrency threads, each claiming and running one job at a time"""
+
+    def __init__(self, concurrency=JOB_WORKER_CONCURRENCY, poll_interval=JOB_POLL_INTERVAL, burst=False):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        # In burst mode threads exit once no job is queued or running: a job backing
+        # off after a failure, or running elsewhere and possibly failing, is waited for
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        # worker_id() of each thread, for heartbeats
+        self.worker_ids = set()
+        self._lock = threading.Lock()
+
+    def _loop(self):
+        name = worker_id()
+        with self._lock:
+            self.worker_ids.add(name)
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = run_next(name)
+                except Exception:
+                    # The database is unreachable or locked: back off instead of dying
+                    logger.exception("Job worker %s could not poll the queue", name)
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if job is not None:
+                    with self._lock:
+                        self.processed += 1
+                elif self.burst and not unfinished():
+                    return
+                else:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connections.close_all()
+
+    def run(self):
+        """Work until stop() (or, in burst mode, the queue is drained); returns the number of jobs run"""
+        threads = [threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        last_sweep, last_heartbeat = 0.0, time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            try:
+                # This thread runs no jobs, so it keeps beating however long they take
+                if time.monotonic() - last_heartbeat >= JOB_HEARTBEAT_INTERVAL:
+                    with self._lock:
+                        worker_ids = set(self.worker_ids)
+                    heartbeat(worker_ids)
+                    last_heartbeat = time.monotonic()
+                if time.monotonic() - last_sweep >= min(JOB_TIMEOUT, 60):
+                    requeue_stale()
+                    last_sweep = time.monotonic()
+            except Exception:
+                logger.exception("Job worker could not send heartbeats or requeue stale jobs")
+            for thread in threads:
+                thread.join(timeout=self.poll_interval)
+        return self.processed
+
+    def stop(self):
+        """Let running jobs finish, then exit"""
+        self.stopping.set()
+
+
+def _user_page(job, page_id):
+    return MessagePage.objects.get(pk=page_id, user=job.user)
+
+
+@handler('duplicate_page')
+def duplicate_page(job):
+    (clone,), stats = clone_pages([_user_page(job, job.payload['page_id'])], job.user)
+    return {'page_id': str(clone.pk), 'messages': stats['messages'], 'seconds': stats['seconds']}
+
+
+@handler('duplicate_all_pages')
+def duplicate_all_pages(job):
+    clones, stats = clone_pages(MessagePage.objects.filter(user=job.user).order_by('created_at'), job.user)
+    return {'page_ids': [str(clone.pk) for clone in clones], 'pages': stats['pages'],
+            'messages': stats['messages'], 'seconds': stats['seconds']}
+
+
+@handler('copy_messages')
+def copy_messages(job):
+    stats = copy_page_messages(_user_page(job, job.payload['source_page_id']),
+                               _user_page(job, job.payload['target_page_id']))
+    return {'copied': stats['messages'], 'seconds': stats['seconds']}
@@ -0,0 +1,99 @@
+import re
+import uuid
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from love_messages.models import Message, MessagePage, MessageTemplate
+from love_messages.views import dashboard_pages
+
+# Plan steps that mean a hot query reads a whole table or index, or sorts rows
+BAD_PLAN_STEPS = {
+    'sqlite': re.compile(r'\b(SCAN \S+(?: USING (?:COVERING )?INDEX (\S+))?|USE TEMP B-TREE FOR [A-Z ]+)'),
+    'microsoft': re.compile(r'\b(Table Scan|Index Scan|Sort)\b(?:\(OBJECT:\(\S+\.\[(\w+)\]\))?'),
+}
+
+# Scans of lookup tables smaller than this are what any planner should pick
+SMALL_TABLE_ROWS = 1000
+
+
+def hot_queries(page_id, user_id):
+    """The hot read queries, built as the views build them: name -> (queryset, lookup table?)"""
+    return {
+        # Every message write (services.message_snapshot)
+        'message_snapshot': (
+            Message.objects.filter(page_id=page_id).values_list('text', flat=True).order_by('order', 'id'), False,
+        ),
+        'edit_page_messages': (Message.objects.filter(page_id=page_id).order_by('order', 'id'), False),
+        'dashboard_pages': (dashboard_pages(User(pk=user_id)), False),
+        'page_by_id': (MessagePage.objects.filter(id=page_id), False),
+        # create_page
+        'active_templates': (MessageTemplate.objects.filter(is_active=True), True),
+    }
+
+
+def partial_indexes():
+    """Names of indexes with a condition: scanning one reads only the rows the query wants"""
+    return {
+        index.name
+        for model in apps.get_app_config('love_messages').get_models()
+        for index in model._meta.indexes if index.condition is not None
+    }
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot read queries and fail if any of them scans or sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failures')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        bad_steps = BAD_PLAN_STEPS.get(connection.vendor)
+        if bad_steps is None:
+            raise CommandError(f"No plan checks for the {connection.vendor} backend")
+
+        page = MessagePage.objects.using(connection.alias).only('id', 'user_id').first()
+        page_id = page.id if page else uuid.uuid4()
+        user_id = page.user_id if page and page.user_id else 0
+
+        failures = []
+        allowed_indexes = partial_indexes()
+        for name, (queryset, lookup_table) in hot_queries(page_id, user_id).items():
+            queryset = queryset.using(connection.alias)
+            plan = self.explain(connection, queryset)
+            bad = sorted(set(step for step, index in bad_steps.findall(plan) if index not in allowed_indexes))
+            rows = queryset.model.objects.using(connection.alias).count() if bad and lookup_table else None
+            if bad and rows is not None and rows < SMALL_TABLE_ROWS:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok (scans a {rows}-row lookup table)"))
+            elif bad:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {', '.join(bad)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if name in failures or options['verbose_plans']:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries scan or sort: {', '.join(failures)}")
+
+    def explain(self, connection, queryset):
+        if connection.vendor != 'microsoft':
+            return queryset.explain()
+        # mssql-django has no QuerySet.explain(); ask for the estimated plan instead
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('SET SHOWPLAN_TEXT ON')
+            try:
+                cursor.execute(sql, params)
+                plan = []
+                while True:
+                    plan.extend(row[0] for row in cursor.fetchall())
+                    if not cursor.nextset():
+                        break
+            finally:
+                cursor.execute('SET SHOWPLAN_TEXT OFF')
+        return '\n'.join(plan)
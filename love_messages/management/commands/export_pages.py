@@ -0,0 +1,54 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from love_messages.models import MessagePage
+from love_messages.transfer import encode_chunks, export_lines, gzip_chunks
+
+
+class Command(BaseCommand):
+    help = 'Stream pages and their messages to NDJSON, optionally gzip-compressed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username whose pages to export (default: every page)')
+        parser.add_argument('--output', '-o', default='-', help='File to write, or - for stdout')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pages = MessagePage.objects.all()
+        if options['user']:
+            try:
+                pages = pages.filter(user=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"No user {options['user']!r}")
+
+        rows = 0
+
+        def counted(lines):
+            nonlocal rows
+            for line in lines:
+                rows += 1
+                yield line
+
+        chunks = encode_chunks(counted(export_lines(pages, chunk_size=options['chunk_size'])))
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+
+        started = time.perf_counter()
+        out = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is sys.stdout.buffer:
+                out.flush()
+            else:
+                out.close()
+        seconds = time.perf_counter() - started
+
+        rows -= 1  # the header line
+        # stdout may be the export itself, so report on stderr
+        self.stderr.write(f"Exported {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)")
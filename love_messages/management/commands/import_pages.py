@@ -0,0 +1,35 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from love_messages.transfer import TransferError, import_pages
+
+
+class Command(BaseCommand):
+    help = 'Import pages and messages from an NDJSON export (gzip-compressed or not)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Export file, or - for stdin')
+        parser.add_argument('--user', required=True, help='Username that will own the imported pages')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+
+        stream = sys.stdin.buffer if options['input'] == '-' else open(options['input'], 'rb')
+        try:
+            stats = import_pages(stream, user, batch_size=options['batch_size'])
+        except TransferError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['pages']} pages with {stats['messages']} messages in {stats['seconds']:.2f}s "
+            f"({stats['rows_per_second']:.0f} rows/s)"
+        ))
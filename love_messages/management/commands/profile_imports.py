@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a web worker imports before serving its first request
+STARTUP_SCRIPT = """
+import importlib, django
+django.setup()
+for name in {targets!r}:
+    importlib.import_module(name)
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulative µs, depth)] from `python -X importtime` stderr, in import order"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or line.rstrip().endswith('imported package'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        # Nesting is shown by two spaces of indentation per level
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_startup(targets, runs=1):
+    """Import costs of a fresh interpreter loading targets, the fastest of runs for each module
+
+    Returns ({module: (self µs, cumulative µs)}, total µs of the top-level imports in the fastest run).
+    """
+    script = STARTUP_SCRIPT.format(targets=list(targets))
+    best, total = {}, None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                                env=os.environ.copy(), capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'Startup import failed:\n{result.stderr[-2000:]}')
+        rows = parse_importtime(result.stderr)
+        run_total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+        total = run_total if total is None else min(total, run_total)
+        for name, self_us, cumulative_us, _ in rows:
+            previous = best.get(name)
+            if previous is None or cumulative_us < previous[1]:
+                best[name] = (self_us, cumulative_us)
+    return best, total
+
+
+class Command(BaseCommand):
+    help = 'Report the cumulative import time per module of a fresh worker (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', dest='targets',
+                            help='Module to import after django.setup() (default: the ASGI app and URLconf)')
+        parser.add_argument('--top', type=int, default=25, help='Modules to list, slowest first')
+        parser.add_argument('--prefix', help='Only list modules starting with this, e.g. love_messages or PIL')
+        parser.add_argument('--by-package', action='store_true',
+                            help='Sum self time per top-level package instead of listing modules')
+        parser.add_argument('--runs', type=int, default=3, help='Interpreters to start; the fastest time counts')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or ['love_project.asgi', settings.ROOT_URLCONF]
+        modules, total = profile_startup(targets, options['runs'])
+
+        if options['by_package']:
+            packages = {}
+            for name, (self_us, _) in modules.items():
+                package = name.split('.', 1)[0]
+                packages[package] = packages.get(package, 0) + self_us
+            rows = [(package, self_us, self_us) for package, self_us in packages.items()]
+        else:
+            rows = [(name, self_us, cumulative_us) for name, (self_us, cumulative_us) in modules.items()]
+        if options['prefix']:
+            rows = [row for row in rows if row[0].startswith(options['prefix'])]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        rows = rows[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'targets': targets,
+                'total_ms': round(total / 1000, 1),
+                'modules': [{'module': name, 'self_ms': round(self_us / 1000, 2),
+                             'cumulative_ms': round(cumulative_us / 1000, 2)} for name, self_us, cumulative_us in rows],
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for name, self_us, cumulative_us in rows:
+            self.stdout.write(f'{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}')
+        self.stdout.write(self.style.SUCCESS(f"Startup imports of {', '.join(targets)}: {total / 1000:.1f} ms"))
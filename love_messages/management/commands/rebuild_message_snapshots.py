@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from love_messages import page_cache
+from love_messages.models import MessagePage
+from love_messages.services import message_snapshots, refresh_message_snapshot
+
+
+class Command(BaseCommand):
+    help = "Recompute every page's message_count and messages_json, fixing any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report pages that have drifted')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pages = MessagePage.objects.order_by('pk').values_list('pk', 'message_count', 'messages_json')
+        checked = fixed = 0
+        last_pk = None
+        while True:
+            # Keyset batches: no cursor stays open while the batch is written
+            batch = list((pages.filter(pk__gt=last_pk) if last_pk else pages)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            checked += len(batch)
+            actual = message_snapshots([pk for pk, _, _ in batch])
+            drifted = [
+                pk for pk, count, messages_json in batch
+                if (count, messages_json) != (actual[pk]['message_count'], actual[pk]['messages_json'])
+            ]
+            for pk in drifted:
+                self.stdout.write(f"{pk}: {actual[pk]['message_count']} messages")
+            if not options['dry_run']:
+                for pk in drifted:
+                    # Recomputed under the page lock, in case it is being edited right now
+                    refresh_message_snapshot(pk)
+                    page_cache.invalidate_page(pk)
+            fixed += len(drifted)
+
+        verb = 'would fix' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} pages, {verb} {fixed}"))
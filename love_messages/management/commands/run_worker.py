@@ -0,0 +1,29 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from love_messages.jobs import JOB_POLL_INTERVAL, JOB_WORKER_CONCURRENCY, Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (page duplication, message copies) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=JOB_WORKER_CONCURRENCY,
+                            help='Jobs run at the same time, each in its own thread')
+        parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL,
+                            help='Seconds between polls of an empty queue')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is queued or running, retries included')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['poll_interval'], burst=options['burst'])
+
+        def stop(signum, frame):
+            self.stderr.write('Stopping after the running jobs finish')
+            worker.stop()
+
+        # SIGTERM from the process manager, or Ctrl-C: finish what is running, claim nothing new
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        processed = worker.run()
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} jobs'))
@@ -0,0 +1,88 @@
+"""Precomputed shape masks for QR rendering.
+
+The heart and semi-circle lobe masks depend only on the image size, and
+there is one size per QR version x box_size, so each mask is built once and
+kept as an immutable 1-bit bitmap (8 pixels per byte) for later lookups.
+"""
+import os
+import threading
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+DEFAULT_MAX_BYTES = int(os.environ.get('MASK_ATLAS_MAX_BYTES', 4 * 1024 * 1024))
+
+
+def draw_lobe_mask(size, side):
+    """Left or right semi-circle of a size x size square"""
+    start, end = (90, 270) if side == 'left' else (270, 90)
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).pieslice([0, 0, size, size], start, end, fill=255)
+    return mask
+
+
+def draw_heart_mask(size):
+    """Heart filling a size x size square, from the implicit curve (x²+y²-1)³ ≤ x²y³"""
+    center = size // 2
+    scale = size // 6
+    coords = np.arange(size, dtype=np.float64)
+
+    # Normalize coordinates
+    nx = ((coords - center) / scale)[np.newaxis, :]
+    ny = ((center - coords) / scale - 0.5)[:, np.newaxis]
+
+    left_side = (nx * nx + ny * ny - 1) ** 3
+    right_side = nx * nx * ny * ny * ny
+    inside = (left_side <= right_side) & (ny >= -1.5)
+    return Image.fromarray(np.where(inside, 255, 0).astype(np.uint8), "L")
+
+
+MASK_BUILDERS = {
+    'heart': draw_heart_mask,
+    'lobe-left': lambda size: draw_lobe_mask(size, 'left'),
+    'lobe-right': lambda size: draw_lobe_mask(size, 'right'),
+}
+
+
+class MaskAtlas:
+    """Size-keyed store of packed 1-bit masks, bounded by a memory budget"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._bitmaps = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, size):
+        """Return the kind mask for a size x size image as an "L" image with values 0/255"""
+        key = (kind, size)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = MASK_BUILDERS[kind](size).convert("1").tobytes()
+            with self._lock:
+                # Masks past the budget are still returned, just rebuilt on every call
+                if key not in self._bitmaps and self.size + len(bitmap) <= self.max_bytes:
+                    self._bitmaps[key] = bitmap
+                    self.size += len(bitmap)
+        return Image.frombytes("1", (size, size), bitmap).convert("L")
+
+    def warm(self, sizes, kinds=tuple(MASK_BUILDERS)):
+        """Build masks ahead of time, e.g. for the QR sizes a deployment is known to use"""
+        for size in sizes:
+            for kind in kinds:
+                self.get(kind, size)
+
+    def resident(self):
+        """Which masks are built, with their size in bytes"""
+        return [
+            {'kind': kind, 'size': size, 'bytes': len(bitmap)}
+            for (kind, size), bitmap in sorted(self._bitmaps.items())
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._bitmaps.clear()
+            self.size = 0
+
+
+mask_atlas = MaskAtlas()
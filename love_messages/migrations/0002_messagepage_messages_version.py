@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('love_messages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagepage',
+            name='messages_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
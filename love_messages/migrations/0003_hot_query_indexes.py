@@ -0,0 +1,44 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('love_messages', '0002_messagepage_messages_version'),
+    ]
+
+    # The composite indexes lead with the foreign keys, so they replace the
+    # implicit FK indexes; they are created before those are dropped
+    operations = [
+        migrations.AlterModelOptions(
+            name='message',
+            options={'ordering': ['order', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['page', 'order', 'id'], include=('text',), name='message_page_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagepage',
+            index=models.Index(fields=['user', '-updated_at'], include=('title', 'created_at'), name='page_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagetemplate',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'name'], name='template_active_idx'),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='page',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='love_messages.messagepage'),
+        ),
+        migrations.AlterField(
+            model_name='messagepage',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
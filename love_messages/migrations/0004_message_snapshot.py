@@ -0,0 +1,55 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:11
+
+import json
+
+from django.db import migrations, models
+
+
+def fill_message_snapshots(apps, schema_editor):
+    MessagePage = apps.get_model('love_messages', 'MessagePage')
+    Message = apps.get_model('love_messages', 'Message')
+    db = schema_editor.connection.alias
+
+    page_ids = list(MessagePage.objects.using(db).values_list('pk', flat=True))
+    for start in range(0, len(page_ids), 500):
+        texts = {page_id: [] for page_id in page_ids[start:start + 500]}
+        rows = (
+            Message.objects.using(db).filter(page_id__in=list(texts))
+            .order_by('page_id', 'order', 'id').values_list('page_id', 'text')
+        )
+        for page_id, text in rows:
+            texts[page_id].append(text)
+        for page_id, page_texts in texts.items():
+            if page_texts:
+                MessagePage.objects.using(db).filter(pk=page_id).update(
+                    message_count=len(page_texts), messages_json=json.dumps(page_texts)
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('love_messages', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='messagepage',
+            name='page_user_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='messagepage',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagepage',
+            name='messages_json',
+            field=models.TextField(default='[]'),
+        ),
+        migrations.RunPython(fill_message_snapshots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='messagepage',
+            index=models.Index(fields=['user', '-updated_at'], include=('title', 'created_at', 'message_count'), name='page_user_updated_idx'),
+        ),
+    ]
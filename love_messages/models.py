@@ -1,16 +1,13 @@
 # ENHANCED MODELS with additional features (models.py - Enhanced)
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 import uuid
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
-import io
-import base64
-import math
 
 class MessagePage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Indexed by page_user_updated_idx, which leads with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
     title = models.CharField(max_length=200, default="Love Messages")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -19,83 +16,53 @@ class MessagePage(models.Model):
     animation_speed = models.FloatField(default=1.0)
     is_public = models.BooleanField(default=True)
     view_count = models.PositiveIntegerField(default=0)
+    # Bumped on every reorder so clients can detect conflicting edits
+    messages_version = models.PositiveIntegerField(default=0)
+    # Denormalized from the page's messages whenever they change (services.refresh_message_snapshot),
+    # so the public view renders from this row alone
+    message_count = models.PositiveIntegerField(default=0)
+    messages_json = models.TextField(default='[]')
+
+    class Meta:
+        indexes = [
+            # The dashboard: a user's pages, most recently updated first
+            models.Index(fields=['user', '-updated_at'], include=['title', 'created_at', 'message_count'],
+                         name='page_user_updated_idx'),
+        ]
     
     def get_absolute_url(self):
         return f"/view/{self.id}/"
     
     def generate_heart_qr(self, request):
         """Generate heart-shaped QR code with better heart shape"""
+        # Imported here: Pillow and qrcode are only needed once a QR is drawn
+        from .qr import png_data_uri
+        from .qr_render import render_page_qr_png
+
         url = request.build_absolute_uri(self.get_absolute_url())
-        
-        # Create QR code with higher version for better resolution
-        qr = qrcode.QRCode(version=3, box_size=8, border=4)
-        qr.add_data(url)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        size = qr_img.size[0]
-        
-        # Create heart mask with better heart shape
-        heart_mask = Image.new('L', (size, size), 0)
-        draw = ImageDraw.Draw(heart_mask)
-        
-        center_x, center_y = size // 2, size // 2
-        scale = size // 6
-        
-        # Better heart equation
-        for y in range(size):
-            for x in range(size):
-                # Normalize coordinates
-                nx = (x - center_x) / scale
-                ny = (center_y - y) / scale - 0.5
-                
-                # Heart equation: (x²+y²-1)³ ≤ x²y³
-                left_side = (nx*nx + ny*ny - 1)**3
-                right_side = nx*nx * ny*ny*ny
-                
-                if left_side <= right_side and ny >= -1.5:
-                    draw.point((x, y), fill=255)
-        
-        # Apply heart mask to QR code
-        result = Image.new('RGBA', qr_img.size, (255, 255, 255, 0))
-        qr_array = list(qr_img.getdata())
-        mask_array = list(heart_mask.getdata())
-        
-        new_data = []
-        for i in range(len(qr_array)):
-            if mask_array[i] > 0:
-                new_data.append(qr_array[i])
-            else:
-                new_data.append((255, 255, 255, 0))
-        
-        result.putdata(new_data)
-        
-        # Add romantic border
-        bordered = Image.new('RGBA', (size + 40, size + 40), (255, 182, 193, 100))
-        bordered.paste(result, (20, 20))
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        bordered.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
+        return png_data_uri(render_page_qr_png(url))
     
     def increment_view_count(self):
         """Increment view count"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        MessagePage.objects.filter(pk=self.pk).update(view_count=models.F('view_count') + 1)
+        self.refresh_from_db(fields=['view_count'])
 
 class Message(models.Model):
-    page = models.ForeignKey(MessagePage, on_delete=models.CASCADE, related_name='messages')
+    # Indexed by message_page_order_idx, which leads with page
+    page = models.ForeignKey(MessagePage, on_delete=models.CASCADE, related_name='messages', db_index=False)
     text = models.TextField()
     order = models.IntegerField(default=0)
     font_size = models.IntegerField(default=32)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['order', 'created_at']
+        # id, not created_at, breaks ties: bulk-created and copied messages share a timestamp
+        ordering = ['order', 'id']
+        indexes = [
+            # Messages of a page in display order; text is included so SQL Server
+            # answers the messages JSON query from the index alone
+            models.Index(fields=['page', 'order', 'id'], include=['text'], name='message_page_order_idx'),
+        ]
 
 class MessageTemplate(models.Model):
     """Pre-defined message templates for inspiration"""
@@ -108,4 +75,56 @@ class MessageTemplate(models.Model):
         ('birthday', 'Birthday'),
         ('general', 'General Love')
     ])
-    is_active = models.BooleanField(default=True)
\ No newline at end of file
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Only active templates are ever listed
+            models.Index(fields=['category', 'name'], condition=models.Q(is_active=True), name='template_active_idx'),
+        ]
+
+
+class Job(models.Model):
+    """A unit of background work (love_messages.jobs), claimed and run by manage.py run_worker"""
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    # A client-chosen key (the Idempotency-Key header): enqueueing it again returns the same job
+    idempotency_key = models.CharField(max_length=100, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not claimed before this; pushed back after a failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; a stale one means the worker is gone
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for the oldest due job
+            models.Index(fields=['run_after', 'created_at'], condition=models.Q(status='queued'),
+                         name='job_queued_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], condition=models.Q(idempotency_key__isnull=False),
+                                    name='job_idempotency_key_uniq'),
+        ]
+
+    @property
+    def done(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
@@ -0,0 +1,107 @@
+"""Cache of rendered public pages.
+
+Entries are tagged with a per-page version token. Any change to a page or
+its messages replaces the token (see signals.py), so a render that raced
+with an edit is stored under the old token and never served.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from love_project.db.routers import pin_to_primary
+
+PAGE_CACHE_ALIAS = getattr(settings, 'PAGE_CACHE_ALIAS', 'default')
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def _cache():
+    return caches[PAGE_CACHE_ALIAS]
+
+
+def _version_key(page_id):
+    return f'page-version:{page_id}'
+
+
+def _response_key(page_id):
+    return f'page-response:{page_id}'
+
+
+def current_version(page_id):
+    """Version token of a page; read it before loading what will be cached"""
+    return _cache().get_or_set(_version_key(page_id), time.time_ns, PAGE_CACHE_TIMEOUT)
+
+
+async def acurrent_version(page_id):
+    return await _cache().aget_or_set(_version_key(page_id), time.time_ns, PAGE_CACHE_TIMEOUT)
+
+
+def _pin_if_recent(version):
+    # Right after a change a replica may still hold the old rows, which would
+    # then be cached under the new token, so such renders read the primary
+    if time.time_ns() - version < settings.DB_REPLICA_STICKY_SECONDS * 1e9:
+        pin_to_primary()
+    return version
+
+
+def render_version(page_id):
+    """current_version for a render that will be cached, pinning recently changed pages to the primary"""
+    return _pin_if_recent(current_version(page_id))
+
+
+async def arender_version(page_id):
+    return _pin_if_recent(await acurrent_version(page_id))
+
+
+def _bump_version(page_id):
+    _cache().set(_version_key(page_id), time.time_ns(), PAGE_CACHE_TIMEOUT)
+
+
+def invalidate_page(page_id):
+    """Drop everything cached for a page, now and again once the current transaction commits"""
+    _bump_version(page_id)
+    # A reader between now and the commit could still cache the old rows under the new token
+    transaction.on_commit(lambda: _bump_version(page_id))
+
+
+def _entry(page_id, key, entries):
+    version = entries.get(_version_key(page_id))
+    cached = entries.get(key)
+    if version is None or cached is None or cached[0] != version:
+        return None
+    return cached[1]
+
+
+def _get(page_id, key):
+    # Version and entry come back in a single round trip
+    return _entry(page_id, key, _cache().get_many([_version_key(page_id), key]))
+
+
+async def _aget(page_id, key):
+    return _entry(page_id, key, await _cache().aget_many([_version_key(page_id), key]))
+
+
+def _set(page_id, key, version, value):
+    _cache().set(key, (version, value), PAGE_CACHE_TIMEOUT)
+
+
+async def _aset(page_id, key, version, value):
+    await _cache().aset(key, (version, value), PAGE_CACHE_TIMEOUT)
+
+
+def get_response(page_id):
+    """(body, etag, last_modified) of the rendered public page, or None"""
+    return _get(page_id, _response_key(page_id))
+
+
+async def aget_response(page_id):
+    return await _aget(page_id, _response_key(page_id))
+
+
+def set_response(page_id, version, content, etag=None, last_modified=None):
+    _set(page_id, _response_key(page_id), version, (content, etag, last_modified))
+
+
+async def aset_response(page_id, version, content, etag=None, last_modified=None):
+    await _aset(page_id, _response_key(page_id), version, (content, etag, last_modified))
@@ -0,0 +1,61 @@
+"""Heart-shaped QR code parameters and entry points.
+
+The rendering itself lives in love_messages.qr_render, which needs qrcode,
+Pillow and NumPy. Those take longer to import than the rest of the app, and
+most processes (web workers serving cached QRs, manage.py commands, the
+render pool's parent) never render one. So this module only holds what
+callers need to name a render (parameters, formats, cache keys) and imports
+the renderer on first use.
+"""
+import base64
+
+# Rendering parameters for the heart QR shown in the editor
+HEART_QR_VERSION = 6
+HEART_QR_ERROR_CORRECTION = 2  # qrcode.constants.ERROR_CORRECT_H, without importing qrcode
+HEART_QR_BOX_SIZE = 8
+HEART_QR_BORDER = 1
+HEART_QR_FILL_COLOR = "red"
+HEART_QR_BACK_COLOR = "white"
+HEART_BORDER_SIZE = 15
+HEART_BORDER_COLOR = (255, 182, 193, 100)  # Light pink border
+
+WHITE_THRESHOLD = 240
+TRANSPARENT = (255, 255, 255, 0)
+
+# Bump when the heart geometry or compositing changes so cached renders are not reused
+RENDERER_VERSION = 1
+
+
+def render_params():
+    """Everything besides the URL that determines the rendered heart QR"""
+    return {
+        'renderer': RENDERER_VERSION,
+        'version': HEART_QR_VERSION,
+        'error_correction': HEART_QR_ERROR_CORRECTION,
+        'box_size': HEART_QR_BOX_SIZE,
+        'border': HEART_QR_BORDER,
+        'fill_color': HEART_QR_FILL_COLOR,
+        'back_color': HEART_QR_BACK_COLOR,
+        'heart_border_size': HEART_BORDER_SIZE,
+        'heart_border_color': HEART_BORDER_COLOR,
+        'white_threshold': WHITE_THRESHOLD,
+    }
+
+
+# Formats served by the QR image endpoint, with their content types
+HEART_QR_FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml',
+}
+
+
+def png_data_uri(png):
+    """Wrap PNG bytes in a base64 data URI for embedding in HTML"""
+    return f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
+
+
+def render_heart_qr(url, fmt='png'):
+    """Render the heart QR code for url in one of HEART_QR_FORMATS"""
+    from .qr_render import render_heart_qr
+    return render_heart_qr(url, fmt)
@@ -0,0 +1,184 @@
+"""Content-addressed cache for rendered heart QR codes.
+
+Renders are keyed by a hash of the URL and every rendering parameter, so a
+page's QR is built once and then served from memory. An optional second tier
+on a Django cache alias (e.g. a FileBasedCache or Redis backend) lets worker
+processes share renders.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .qr import render_heart_qr, render_params
+from .qr_service import qr_render_service
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def heart_qr_digest(url, fmt='png', params=None):
+    """Content hash of the heart QR of url rendered as fmt with params"""
+    payload = json.dumps({'url': url, 'format': fmt, 'params': params or render_params()}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def heart_qr_key(url, fmt='png', params=None):
+    """Cache key for the heart QR of url rendered as fmt with params"""
+    return 'heart-qr:' + heart_qr_digest(url, fmt, params)
+
+
+class LRUByteCache:
+    """Thread-safe in-process LRU cache of bytes values, capped by total size"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class QRCache:
+    """Two-tier cache of rendered heart QR images"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, backend=None, service=None):
+        self.local = LRUByteCache(max_bytes)
+        self.backend = backend
+        self.service = service
+        self.shared_hits = 0
+        self.renders = 0
+
+    @property
+    def shared(self):
+        """The shared Django cache tier, or None when only the in-process tier is used"""
+        return caches[self.backend] if self.backend else None
+
+    def get(self, url, fmt='png'):
+        """Return the heart QR for url encoded as fmt, rendering it only on a miss in every tier"""
+        key = heart_qr_key(url, fmt)
+        image = self.local.get(key)
+        if image is not None:
+            return image
+
+        shared = self.shared
+        if shared is not None:
+            image = shared.get(key)
+            if image is not None:
+                self.shared_hits += 1
+                self.local.set(key, image)
+                return image
+
+        if self.service is not None:
+            image = self.service.render(url, fmt)
+        else:
+            image = render_heart_qr(url, fmt)
+        self.renders += 1
+        self.local.set(key, image)
+        if shared is not None:
+            shared.set(key, image, timeout=None)
+        return image
+
+    async def aget(self, url, fmt='png'):
+        """Async version of get; misses are rendered without blocking the event loop"""
+        key = heart_qr_key(url, fmt)
+        image = self.local.get(key)
+        if image is not None:
+            return image
+
+        shared = self.shared
+        if shared is not None:
+            image = await shared.aget(key)
+            if image is not None:
+                self.shared_hits += 1
+                self.local.set(key, image)
+                return image
+
+        if self.service is not None:
+            image = await self.service.arender(url, fmt)
+        else:
+            image = await sync_to_async(render_heart_qr, thread_sensitive=False)(url, fmt)
+        self.renders += 1
+        self.local.set(key, image)
+        if shared is not None:
+            await shared.aset(key, image, timeout=None)
+        return image
+
+    def get_png(self, url):
+        return self.get(url, 'png')
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {
+            'hits': self.local.hits,
+            'misses': self.local.misses,
+            'evictions': self.local.evictions,
+            'shared_hits': self.shared_hits,
+            'renders': self.renders,
+            'entries': len(self.local),
+            'bytes': self.local.size,
+            'max_bytes': self.local.max_bytes,
+        }
+
+
+heart_qr_cache = QRCache(
+    max_bytes=getattr(settings, 'QR_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+    backend=getattr(settings, 'QR_CACHE_BACKEND', None),
+    service=qr_render_service,
+)
+
+
+def collect_metrics():
+    """Heart QR cache and render pool counters for love_project.metrics"""
+    cache, service = heart_qr_cache.stats(), qr_render_service.stats()
+    return [
+        ('heart_qr_cache_events_total', 'Heart QR cache lookups and renders', 'counter', [
+            ({'event': event}, cache[event]) for event in ('hits', 'misses', 'shared_hits', 'evictions', 'renders')
+        ]),
+        ('heart_qr_cache_bytes', 'Bytes of heart QR images held in this process', 'gauge', [({}, cache['bytes'])]),
+        ('heart_qr_render_pending', 'Heart QR renders in flight', 'gauge', [({}, service['pending'])]),
+        ('heart_qr_render_seconds_total', 'Heart QR render and queue wait time', 'counter', [
+            ({'phase': 'render'}, service['render_seconds']),
+            ({'phase': 'queue_wait'}, service['queue_wait_seconds']),
+        ]),
+    ]
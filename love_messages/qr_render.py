@@ -0,0 +1,235 @@
+"""Heart-shaped QR code rendering.
+
+All per-pixel work (whiteness thresholding, lobe masking) is done on whole
+NumPy arrays; rotation, pasting and alpha compositing are left to Pillow's
+C routines. The output is byte-identical to the original per-pixel code.
+
+This module pulls in qrcode, Pillow and NumPy, so it is only imported when a
+QR is actually rendered (love_messages.qr loads it on first use).
+"""
+import io
+import logging
+import math
+
+import numpy as np
+import qrcode
+from PIL import Image
+
+from .masks import mask_atlas
+from .qr import (
+    HEART_BORDER_COLOR, HEART_BORDER_SIZE, HEART_QR_BACK_COLOR, HEART_QR_BORDER, HEART_QR_BOX_SIZE,
+    HEART_QR_ERROR_CORRECTION, HEART_QR_FILL_COLOR, HEART_QR_VERSION, TRANSPARENT, WHITE_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def white_mask(rgba):
+    """Boolean array marking pixels whose R, G and B are all above the threshold"""
+    return (rgba[..., :3] > WHITE_THRESHOLD).all(axis=-1)
+
+
+def remove_white_background(image):
+    """Return an RGBA copy of image with white (and near-white) pixels made transparent"""
+    rgba = np.array(image.convert("RGBA"))
+    rgba[white_mask(rgba)] = TRANSPARENT
+    return Image.fromarray(rgba, "RGBA")
+
+
+def lobe_masks(size):
+    """Left and right semi-circle masks for a square QR image of the given size"""
+    return mask_atlas.get('lobe-left', size), mask_atlas.get('lobe-right', size)
+
+
+def apply_lobe_mask(rgba, white, mask):
+    """Use mask as the alpha channel, keeping white pixels fully transparent"""
+    lobe = rgba.copy()
+    lobe[..., 3] = np.where(white, 0, np.asarray(mask))
+    return Image.fromarray(lobe, "RGBA")
+
+
+def build_qr(url, version=HEART_QR_VERSION, error_correction=HEART_QR_ERROR_CORRECTION,
+             box_size=HEART_QR_BOX_SIZE, border=HEART_QR_BORDER):
+    """Build the QR code matrix for url"""
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=error_correction,
+        box_size=box_size,
+        border=border
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def build_qr_image(url, fill_color=HEART_QR_FILL_COLOR, back_color=HEART_QR_BACK_COLOR, **kwargs):
+    """Build the plain square QR code for url as an RGBA image"""
+    return build_qr(url, **kwargs).make_image(fill_color=fill_color, back_color=back_color).convert("RGBA")
+
+
+def rotated_size(size, angle=45):
+    """Side of the square Pillow's rotate(angle, expand=True) produces for a size x size image"""
+    half = size / 2.0
+    cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    xs = [half + (x - half) * cos + (y - half) * sin for x, y in ((0, 0), (size, 0), (size, size), (0, size))]
+    return math.ceil(max(xs)) - math.floor(min(xs))
+
+
+def heart_layout(qr_size, rotated_size):
+    """Canvas size and paste positions of the heart parts for a QR of qr_size pixels"""
+    heart_width = rotated_size + qr_size  # Space for QR + semi-circles
+    heart_height = rotated_size + qr_size // 2  # Height for the heart
+
+    # Position the rotated QR code in the center-bottom of the heart
+    qr_x = (heart_width - rotated_size) // 2
+    qr_y = heart_height - rotated_size - 10
+
+    # Calculate positions for the semi-circular QR codes
+    radius = qr_size // 2
+    center_x = heart_width // 2
+    vertical_offset = (radius // 2) + 40
+    horizontal_offset = int(radius // (2 * math.pi))
+    lobe_y = qr_y + vertical_offset - radius
+
+    return {
+        'width': heart_width,
+        'height': heart_height,
+        'qr': (qr_x, qr_y),
+        'left_lobe': (center_x - radius // 2 - horizontal_offset - radius, lobe_y),
+        'right_lobe': (center_x + radius // 2 + horizontal_offset - radius, lobe_y),
+    }
+
+
+def render_heart(qr_img):
+    """Compose a square QR image into a heart: a rotated QR with two semi-circular lobes"""
+    rgba = np.array(qr_img.convert("RGBA"))
+    white = white_mask(rgba)
+    rgba[white] = TRANSPARENT
+    qr_img = Image.fromarray(rgba, "RGBA")
+    qr_size = qr_img.size[0]
+
+    # Semi-circular QR lobes, rotated towards the centre of the heart
+    mask_left, mask_right = lobe_masks(qr_size)
+    qr_left = apply_lobe_mask(rgba, white, mask_left)
+    qr_right = apply_lobe_mask(rgba, white, mask_right)
+    qr_left = qr_left.rotate(-45, expand=False, fillcolor=TRANSPARENT)
+    qr_right = qr_right.rotate(45, expand=False, fillcolor=TRANSPARENT)
+
+    # Rotate QR code 45 degrees for the bottom
+    rotated_qr = qr_img.rotate(45, expand=True, fillcolor=TRANSPARENT)
+    layout = heart_layout(qr_size, rotated_qr.size[0])
+    logger.debug("Heart dimensions: %sx%s, QR size: %s", layout['width'], layout['height'], qr_size)
+
+    heart_img = Image.new('RGBA', (layout['width'], layout['height']), TRANSPARENT)
+    heart_img.paste(rotated_qr, layout['qr'], rotated_qr)
+    heart_img.paste(qr_left, layout['left_lobe'], qr_left)
+    heart_img.paste(qr_right, layout['right_lobe'], qr_right)
+
+    # Add a romantic border
+    bordered_img = Image.new(
+        'RGBA',
+        (layout['width'] + HEART_BORDER_SIZE * 2, layout['height'] + HEART_BORDER_SIZE * 2),
+        HEART_BORDER_COLOR
+    )
+    bordered_img.paste(heart_img, (HEART_BORDER_SIZE, HEART_BORDER_SIZE), heart_img)
+    return bordered_img
+
+
+def modules_path(matrix, box_size):
+    """SVG path data drawing the dark modules of a QR matrix, one rectangle per horizontal run"""
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            parts.append(f"M{start * box_size},{y * box_size}h{(x - start) * box_size}v{box_size}h-{(x - start) * box_size}z")
+    return "".join(parts)
+
+
+def render_heart_svg(url):
+    """Render the heart QR for url as a vector SVG document with the same layout as the PNG"""
+    matrix = build_qr(url).get_matrix()
+    qr_size = len(matrix) * HEART_QR_BOX_SIZE
+    rotated = rotated_size(qr_size)
+    layout = heart_layout(qr_size, rotated)
+    width = layout['width'] + HEART_BORDER_SIZE * 2
+    height = layout['height'] + HEART_BORDER_SIZE * 2
+    half = qr_size / 2
+    r, g, b, a = HEART_BORDER_COLOR
+
+    def placed(x, y, box, angle):
+        # SVG rotates clockwise, Pillow counter-clockwise
+        cx = HEART_BORDER_SIZE + x + box / 2
+        cy = HEART_BORDER_SIZE + y + box / 2
+        return f"translate({cx:g},{cy:g}) rotate({-angle}) translate({-half:g},{-half:g})"
+
+    qr_x, qr_y = layout['qr']
+    left_x, left_y = layout['left_lobe']
+    right_x, right_y = layout['right_lobe']
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'<defs>'
+        f'<path id="qr" fill="{HEART_QR_FILL_COLOR}" d="{modules_path(matrix, HEART_QR_BOX_SIZE)}"/>'
+        f'<clipPath id="left"><path d="M{half:g},{half:g}L{half:g},{qr_size}A{half:g},{half:g} 0 0 1 {half:g},0z"/></clipPath>'
+        f'<clipPath id="right"><path d="M{half:g},{half:g}L{half:g},0A{half:g},{half:g} 0 0 1 {half:g},{qr_size}z"/></clipPath>'
+        f'</defs>'
+        f'<rect width="{width}" height="{height}" fill="rgb({r},{g},{b})" fill-opacity="{a / 255:.3f}"/>'
+        f'<use xlink:href="#qr" transform="{placed(qr_x, qr_y, rotated, 45)}"/>'
+        f'<g transform="{placed(left_x, left_y, qr_size, -45)}"><use xlink:href="#qr" clip-path="url(#left)"/></g>'
+        f'<g transform="{placed(right_x, right_y, qr_size, 45)}"><use xlink:href="#qr" clip-path="url(#right)"/></g>'
+        f'</svg>'
+    ).encode('utf-8')
+
+
+def encode_image(image, fmt):
+    """Encode an image as PNG or lossless WebP bytes"""
+    buffered = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffered, format="WEBP", lossless=True)
+    else:
+        image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def encode_png(image):
+    """Encode an image as PNG bytes"""
+    return encode_image(image, 'png')
+
+
+def render_heart_qr_png(url):
+    """Render the heart QR code for url and return the PNG bytes"""
+    return encode_png(render_heart(build_qr_image(url)))
+
+
+def render_heart_qr(url, fmt='png'):
+    """Render the heart QR code for url in one of HEART_QR_FORMATS"""
+    if fmt == 'svg':
+        return render_heart_svg(url)
+    return encode_image(render_heart(build_qr_image(url)), fmt)
+
+
+def render_page_qr_png(url):
+    """The plain, heart-masked QR of MessagePage.generate_heart_qr, as PNG bytes"""
+    # Create QR code with higher version for better resolution
+    qr = qrcode.QRCode(version=3, box_size=8, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    # Create QR code image
+    qr_img = qr.make_image(fill_color="black", back_color="white").convert('RGBA')
+    size = qr_img.size[0]
+
+    # Apply the precomputed heart mask to the QR code
+    result = Image.new('RGBA', qr_img.size, TRANSPARENT)
+    result.paste(qr_img, (0, 0), mask_atlas.get('heart', size))
+
+    # Add romantic border
+    bordered = Image.new('RGBA', (size + 40, size + 40), (255, 182, 193, 100))
+    bordered.paste(result, (20, 20))
+    return encode_png(bordered)
@@ -0,0 +1,160 @@
+"""Off-request QR rendering on a bounded process pool.
+
+Rendering is CPU-bound Pillow/NumPy work, so running it in the web worker
+holds the GIL and stalls every other request on that worker. Jobs are sent
+to a ProcessPoolExecutor instead; when the pool already has max_pending jobs
+in flight the render happens inline rather than queueing without bound.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .qr import render_heart_qr
+
+logger = logging.getLogger(__name__)
+
+
+class QRRenderTimeout(Exception):
+    """A pooled render did not finish within the per-job timeout"""
+
+
+def _render_job(url, fmt, submitted_at):
+    """Runs in a pool process: render and report how long the job queued and ran"""
+    started_at = time.time()
+    image = render_heart_qr(url, fmt)
+    return image, started_at - submitted_at, time.time() - started_at
+
+
+class QRRenderService:
+    """Renders heart QR codes on a process pool, falling back to inline rendering"""
+
+    def __init__(self, workers=2, max_pending=8, timeout=10.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'pooled': 0,
+            'inline': 0,
+            'timeouts': 0,
+            'queue_wait_seconds': 0.0,
+            'max_queue_wait_seconds': 0.0,
+            'render_seconds': 0.0,
+            'max_render_seconds': 0.0,
+        }
+
+    @property
+    def executor(self):
+        # Created on first use, with spawn so children never inherit DB connections or threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+        return self._executor
+
+    def _reserve(self):
+        """Claim a pool slot, or return False when rendering should happen inline"""
+        if self.workers <= 0:
+            return False
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _submit(self, url, fmt):
+        """Send a render to the pool; its reserved slot is freed when the job finishes"""
+        try:
+            future = self.executor.submit(_render_job, url, fmt, time.time())
+        except BaseException:
+            self._release()
+            raise
+        # Not when the caller stops waiting: a timed-out job that already started
+        # cannot be cancelled and keeps its pool process busy until it is done
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _record(self, queue_wait, render_time, pooled=True):
+        with self._lock:
+            stats = self._stats
+            stats['pooled' if pooled else 'inline'] += 1
+            stats['queue_wait_seconds'] += queue_wait
+            stats['max_queue_wait_seconds'] = max(stats['max_queue_wait_seconds'], queue_wait)
+            stats['render_seconds'] += render_time
+            stats['max_render_seconds'] = max(stats['max_render_seconds'], render_time)
+
+    def _record_timeout(self):
+        with self._lock:
+            self._stats['timeouts'] += 1
+        logger.warning("QR render exceeded %ss timeout", self.timeout)
+
+    def _render_inline(self, url, fmt):
+        started_at = time.time()
+        image = render_heart_qr(url, fmt)
+        self._record(0.0, time.time() - started_at, pooled=False)
+        return image
+
+    def render(self, url, fmt='png'):
+        """Render url as fmt, blocking the calling thread until the image is ready"""
+        if not self._reserve():
+            return self._render_inline(url, fmt)
+        future = self._submit(url, fmt)
+        try:
+            image, queue_wait, render_time = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self._record_timeout()
+            raise QRRenderTimeout(url)
+        self._record(queue_wait, render_time)
+        return image
+
+    async def arender(self, url, fmt='png'):
+        """Render url as fmt without blocking the event loop"""
+        if not self._reserve():
+            return await sync_to_async(self._render_inline, thread_sensitive=False)(url, fmt)
+        future = self._submit(url, fmt)
+        try:
+            image, queue_wait, render_time = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._record_timeout()
+            raise QRRenderTimeout(url)
+        self._record(queue_wait, render_time)
+        return image
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self):
+        """Queue wait and render time metrics for monitoring"""
+        with self._lock:
+            stats = dict(self._stats, pending=self.pending, workers=self.workers,
+                         max_pending=self.max_pending)
+        jobs = stats['pooled'] + stats['inline']
+        stats['avg_queue_wait_seconds'] = stats['queue_wait_seconds'] / jobs if jobs else 0.0
+        stats['avg_render_seconds'] = stats['render_seconds'] / jobs if jobs else 0.0
+        return stats
+
+
+qr_render_service = QRRenderService(
+    workers=getattr(settings, 'QR_RENDER_WORKERS', 2),
+    max_pending=getattr(settings, 'QR_RENDER_MAX_PENDING', 8),
+    timeout=getattr(settings, 'QR_RENDER_TIMEOUT', 10.0),
+)
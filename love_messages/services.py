@@ -0,0 +1,192 @@
+"""Multi-row operations on pages and messages.
+
+Each operation validates up front and writes in a single transaction with
+set-based queries. These paths use bulk_create/update(), which send no model
+signals, so they invalidate the page cache and refresh the page's messages
+snapshot themselves.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from love_project.metrics import span
+
+from . import page_cache
+from .models import Message, MessagePage
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGES_PER_REQUEST = getattr(settings, 'MAX_MESSAGES_PER_REQUEST', 500)
+# Pages whose message snapshots are read with one query, within SQL Server's parameter limit
+SNAPSHOT_BATCH = 100
+
+
+class MessageValidationError(ValueError):
+    """One or more messages in a bulk request are invalid"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def build_messages(page, items, max_messages=None):
+    """Validate message dicts in one pass and return unsaved Message objects"""
+    max_messages = MAX_MESSAGES_PER_REQUEST if max_messages is None else max_messages
+    if not isinstance(items, list):
+        raise MessageValidationError('Expected a list of messages')
+    if len(items) > max_messages:
+        raise MessageValidationError(f'At most {max_messages} messages can be added per request')
+
+    messages, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Message must be an object'})
+            continue
+        text = item.get('text')
+        if not isinstance(text, str) or not text.strip():
+            errors.append({'index': index, 'error': 'Text field is required'})
+            continue
+        fields = {'page': page, 'text': text, 'order': item.get('order', index)}
+        if 'font_size' in item:
+            fields['font_size'] = item['font_size']
+        bad = [name for name in ('order', 'font_size') if name in fields and not _is_int(fields[name])]
+        if bad:
+            errors.append({'index': index, 'error': f'{bad[0]} must be an integer'})
+            continue
+        messages.append(Message(**fields))
+
+    if errors:
+        raise MessageValidationError('Invalid messages', errors)
+    return messages
+
+
+def message_snapshot(page_id):
+    """MessagePage.message_count and messages_json computed from the page's messages"""
+    texts = list(Message.objects.filter(page_id=page_id).order_by('order', 'id').values_list('text', flat=True))
+    with span('json'):
+        messages_json = json.dumps(texts)
+    return {'message_count': len(texts), 'messages_json': messages_json}
+
+
+def message_snapshots(page_ids):
+    """message_snapshot for many pages with one query: {page_id: fields}"""
+    texts = {page_id: [] for page_id in page_ids}
+    rows = (
+        Message.objects.filter(page_id__in=list(texts))
+        .order_by('page_id', 'order', 'id').values_list('page_id', 'text')
+    )
+    for page_id, text in rows:
+        texts[page_id].append(text)
+    return {
+        page_id: {'message_count': len(page_texts), 'messages_json': json.dumps(page_texts)}
+        for page_id, page_texts in texts.items()
+    }
+
+
+def refresh_message_snapshot(page_id):
+    """Recompute a page's message_count and messages_json from its messages.
+
+    The page row is locked first, so concurrent writers refresh one after the
+    other and the last refresh sees every committed message.
+    """
+    # Part of the caller's transaction when there is one, without a savepoint
+    with transaction.atomic(savepoint=False):
+        # Nothing to refresh once the page itself is gone
+        if MessagePage.objects.select_for_update().filter(pk=page_id).exists():
+            # update() skips auto_now: bump updated_at here, it feeds the page's ETag
+            MessagePage.objects.filter(pk=page_id).update(updated_at=timezone.now(), **message_snapshot(page_id))
+
+
+def bulk_add_messages(page, items, max_messages=None):
+    """Validate and insert many messages on a page with bulk_create in one transaction"""
+    messages = build_messages(page, items, max_messages)
+    with transaction.atomic():
+        created = Message.objects.bulk_create(messages)
+        refresh_message_snapshot(page.pk)
+        page_cache.invalidate_page(page.pk)
+    return created
+
+
+def _insert_select_messages(connection, source_page_id, target_page_id, now):
+    """Copy every message of one page onto another with a single INSERT ... SELECT"""
+    qn = connection.ops.quote_name
+    table = qn(Message._meta.db_table)
+    page, text, order, font_size, created_at = (
+        qn(Message._meta.get_field(name).column)
+        for name in ('page', 'text', 'order', 'font_size', 'created_at')
+    )
+    page_pk = MessagePage._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({page}, {text}, {order}, {font_size}, {created_at}) "
+            f"SELECT %s, {text}, {order}, {font_size}, %s FROM {table} WHERE {page} = %s",
+            [
+                page_pk.get_db_prep_value(target_page_id, connection),
+                Message._meta.get_field('created_at').get_db_prep_value(now, connection),
+                page_pk.get_db_prep_value(source_page_id, connection),
+            ]
+        )
+        return cursor.rowcount
+
+
+def copy_page_messages(source_page, target_page):
+    """Copy all messages of source_page onto target_page server-side, in one transaction"""
+    using = router.db_for_write(Message)
+    started = time.perf_counter()
+    with transaction.atomic(using=using):
+        rows = _insert_select_messages(connections[using], source_page.pk, target_page.pk, timezone.now())
+        refresh_message_snapshot(target_page.pk)
+        page_cache.invalidate_page(target_page.pk)
+    stats = {'messages': rows, 'seconds': time.perf_counter() - started}
+    logger.info("Copied %(messages)s messages in %(seconds).3fs", stats)
+    return stats
+
+
+def clone_pages(pages, user, title_suffix=' (Copy)'):
+    """Deep-copy pages and all their messages for user in one transaction
+
+    Returns the new pages (in the order of pages) and a dict with the number of
+    pages and messages written and the time taken.
+    """
+    pages = list(pages)
+    using = router.db_for_write(MessagePage)
+    started = time.perf_counter()
+    with transaction.atomic(using=using):
+        # UUID keys are generated client-side, so the clones' ids are known after bulk_create
+        clones = MessagePage.objects.bulk_create([
+            MessagePage(
+                user=user,
+                title=f"{page.title}{title_suffix}",
+                text_color=page.text_color,
+                background_color=page.background_color,
+                animation_speed=page.animation_speed
+            )
+            for page in pages
+        ])
+        now = timezone.now()
+        rows = sum(
+            _insert_select_messages(connections[using], page.pk, clone.pk, now)
+            for page, clone in zip(pages, clones)
+        )
+        # From the rows just copied, not the source pages read above: their
+        # messages may have changed in between
+        snapshots = {}
+        for start in range(0, len(clones), SNAPSHOT_BATCH):
+            snapshots.update(message_snapshots([clone.pk for clone in clones[start:start + SNAPSHOT_BATCH]]))
+        for clone in clones:
+            for name, value in snapshots[clone.pk].items():
+                setattr(clone, name, value)
+            clone.updated_at = now
+        MessagePage.objects.bulk_update(clones, ['message_count', 'messages_json', 'updated_at'],
+                                        batch_size=SNAPSHOT_BATCH)
+    stats = {'pages': len(clones), 'messages': rows, 'seconds': time.perf_counter() - started}
+    logger.info("Cloned %(pages)s pages with %(messages)s messages in %(seconds).3fs", stats)
+    return clones, stats
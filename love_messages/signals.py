@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import page_cache
+from .models import Message, MessagePage
+from .services import refresh_message_snapshot
+
+
+@receiver([post_save, post_delete], sender=MessagePage)
+def invalidate_page_on_page_change(sender, instance, **kwargs):
+    """Any saved or deleted page drops its cached render"""
+    page_cache.invalidate_page(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Message)
+def invalidate_page_on_message_change(sender, instance, **kwargs):
+    """Any saved or deleted message drops its page's cached render"""
+    page_cache.invalidate_page(instance.page_id)
+
+
+@receiver([post_save, post_delete], sender=Message)
+def refresh_page_snapshot_on_message_change(sender, instance, origin=None, **kwargs):
+    """Keep the page's message_count and messages_json in step with single-message writes"""
+    # Deleting a page cascades to its messages; there is no snapshot left to refresh
+    if isinstance(origin, MessagePage):
+        return
+    refresh_message_snapshot(instance.page_id)
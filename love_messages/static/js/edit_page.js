@@ -0,0 +1,336 @@
+// Page editor; expects editorPage (set by edit_page.html)
+let autoSaveInterval;
+let isAutoSaving = false;
+let currentEditingMessageId = null;
+let draggedElement = null;
+
+// Random love messages for inspiration
+const randomMessages = [
+    "You make my heart skip a beat 💕",
+    "Every moment with you is magical ✨",
+    "You are my sunshine on cloudy days ☀️",
+    "Love you to the moon and back 🌙",
+    "You complete me in every way 💖",
+    "Forever and always, my love 💍",
+    "You are my happy place 🏠",
+    "My heart belongs to you 💝",
+    "You make life beautiful 🌺",
+    "Together we are unstoppable 💪"
+];
+
+// Initialize
+document.addEventListener('DOMContentLoaded', function() {
+    // Animation speed slider
+    const speedSlider = document.getElementById('animation_speed');
+    const speedValue = document.getElementById('speedValue');
+    
+    speedSlider.addEventListener('input', function() {
+        speedValue.textContent = this.value;
+    });
+    
+    // Setup drag and drop
+    setupDragAndDrop();
+    
+    // Auto-save on input changes
+    const inputs = document.querySelectorAll('#pageForm input');
+    inputs.forEach(input => {
+        input.addEventListener('change', function() {
+            if (isAutoSaving) {
+                savePage();
+            }
+        });
+    });
+});
+
+function showStatus(message, type = 'success') {
+    const statusEl = document.getElementById('saveStatus');
+    statusEl.textContent = message;
+    statusEl.className = `save-status ${type} show`;
+    
+    setTimeout(() => {
+        statusEl.classList.remove('show');
+    }, 3000);
+}
+
+function savePage() {
+    const formData = new FormData(document.getElementById('pageForm'));
+    const data = Object.fromEntries(formData.entries());
+    
+    fetch(window.location.href, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showStatus('✅ ' + data.message, 'success');
+        } else {
+            showStatus('❌ Failed to save', 'error');
+        }
+    })
+    .catch(error => {
+        showStatus('❌ Error saving page', 'error');
+        console.error('Save error:', error);
+    });
+}
+
+function autoSave() {
+    const statusEl = document.getElementById('autoSaveStatus');
+    
+    if (isAutoSaving) {
+        isAutoSaving = false;
+        clearInterval(autoSaveInterval);
+        statusEl.textContent = 'OFF';
+        showStatus('Auto-save disabled', 'success');
+    } else {
+        isAutoSaving = true;
+        autoSaveInterval = setInterval(savePage, 30000); // Save every 30 seconds
+        statusEl.textContent = 'ON';
+        showStatus('Auto-save enabled (every 30s)', 'success');
+    }
+}
+
+function addMessage() {
+    const messageText = document.getElementById('new-message').value.trim();
+    if (!messageText) return;
+    
+    fetch(editorPage.urls.addMessage, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({text: messageText, order: 0})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        }
+    });
+}
+
+function addRandomMessage() {
+    const randomMessage = randomMessages[Math.floor(Math.random() * randomMessages.length)];
+    document.getElementById('new-message').value = randomMessage;
+    addMessage();
+}
+
+function editMessage(messageId, currentText) {
+    currentEditingMessageId = messageId;
+    document.getElementById('editMessageText').value = currentText;
+    document.getElementById('editModal').style.display = 'block';
+}
+
+function saveEditedMessage() {
+    const newText = document.getElementById('editMessageText').value.trim();
+    if (!newText) {
+        showStatus('Message cannot be empty', 'error');
+        return;
+    }
+    
+            fetch(`/api/update-message/${currentEditingMessageId}/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: JSON.stringify({text: newText})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            closeEditModal();
+            location.reload();
+        } else {
+            showStatus('Failed to update message', 'error');
+        }
+    })
+    .catch(error => {
+        showStatus('Error updating message', 'error');
+        console.error('Update message error:', error);
+    });
+}
+
+function closeEditModal() {
+    document.getElementById('editModal').style.display = 'none';
+    currentEditingMessageId = null;
+}
+
+function deleteMessage(messageId) {
+    if (confirm('Are you sure you want to delete this message?')) {
+        fetch(`/api/delete-message/${messageId}/`, {
+            method: 'DELETE',
+            headers: {
+                'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                showStatus('Failed to delete message', 'error');
+            }
+        })
+        .catch(error => {
+            showStatus('Error deleting message', 'error');
+            console.error('Delete message error:', error);
+        });
+    }
+}
+
+function setupDragAndDrop() {
+    const messagesList = document.getElementById('messages-list');
+    const messageItems = messagesList.querySelectorAll('.message-item');
+    
+    messageItems.forEach(item => {
+        item.addEventListener('dragstart', handleDragStart);
+        item.addEventListener('dragover', handleDragOver);
+        item.addEventListener('drop', handleDrop);
+        item.addEventListener('dragend', handleDragEnd);
+    });
+}
+
+function handleDragStart(e) {
+    draggedElement = this;
+    this.classList.add('dragging');
+    e.dataTransfer.effectAllowed = 'move';
+    e.dataTransfer.setData('text/html', this.outerHTML);
+}
+
+function handleDragOver(e) {
+    e.preventDefault();
+    e.dataTransfer.dropEffect = 'move';
+    
+    const afterElement = getDragAfterElement(document.getElementById('messages-list'), e.clientY);
+    if (afterElement == null) {
+        document.getElementById('messages-list').appendChild(draggedElement);
+    } else {
+        document.getElementById('messages-list').insertBefore(draggedElement, afterElement);
+    }
+}
+
+// Ordering version the server last confirmed; a stale one is rejected with 409
+let messagesVersion = editorPage.messagesVersion;
+
+function handleDrop(e) {
+    e.preventDefault();
+    
+    // Get new order of messages
+    const messageItems = document.getElementById('messages-list').querySelectorAll('.message-item');
+    const messageIds = Array.from(messageItems).map(item => item.dataset.messageId);
+    
+    // Send reorder request
+    fetch(editorPage.urls.reorderMessages, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: JSON.stringify({message_ids: messageIds, version: messagesVersion})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            messagesVersion = data.version;
+            showStatus('Messages reordered successfully', 'success');
+        } else {
+            showStatus('Failed to reorder messages', 'error');
+            location.reload(); // Reload to restore original order
+        }
+    })
+    .catch(error => {
+        showStatus('Error reordering messages', 'error');
+        console.error('Reorder error:', error);
+        location.reload();
+    });
+}
+
+function handleDragEnd(e) {
+    this.classList.remove('dragging');
+    draggedElement = null;
+}
+
+function getDragAfterElement(container, y) {
+    const draggableElements = [...container.querySelectorAll('.message-item:not(.dragging)')];
+    
+    return draggableElements.reduce((closest, child) => {
+        const box = child.getBoundingClientRect();
+        const offset = y - box.top - box.height / 2;
+        
+        if (offset < 0 && offset > closest.offset) {
+            return { offset: offset, element: child };
+        } else {
+            return closest;
+        }
+    }, { offset: Number.NEGATIVE_INFINITY }).element;
+}
+
+function previewPage() {
+    window.open(editorPage.urls.view, '_blank');
+}
+
+function duplicatePage() {
+    if (confirm('Create a copy of this page?')) {
+        window.location.href = editorPage.urls.duplicate;
+    }
+}
+
+function deletePage() {
+    const pageName = editorPage.title;
+    if (confirm(`Are you sure you want to delete "${pageName}"? This action cannot be undone.`)) {
+        const form = document.createElement('form');
+        form.method = 'POST';
+        form.action = editorPage.urls.delete;
+        
+        const csrfInput = document.createElement('input');
+        csrfInput.type = 'hidden';
+        csrfInput.name = 'csrfmiddlewaretoken';
+        csrfInput.value = document.querySelector('[name=csrfmiddlewaretoken]').value;
+        
+        form.appendChild(csrfInput);
+        document.body.appendChild(form);
+        form.submit();
+    }
+}
+
+function downloadQR() {
+    const qrImage = document.querySelector('.qr-section img');
+    const link = document.createElement('a');
+    link.download = `${document.getElementById('title').value}-qr-code.png`;
+    link.href = qrImage.src;
+    link.click();
+}
+
+// Keyboard shortcuts
+document.addEventListener('keydown', function(e) {
+    if (e.ctrlKey || e.metaKey) {
+        switch(e.key) {
+            case 's':
+                e.preventDefault();
+                savePage();
+                break;
+            case 'Enter':
+                if (document.getElementById('new-message') === document.activeElement) {
+                    e.preventDefault();
+                    addMessage();
+                }
+                break;
+        }
+    }
+    
+    if (e.key === 'Escape') {
+        closeEditModal();
+    }
+});
+
+// Close modal when clicking outside
+document.getElementById('editModal').addEventListener('click', function(e) {
+    if (e.target === this) {
+        closeEditModal();
+    }
+});
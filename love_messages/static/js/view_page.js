@@ -0,0 +1,292 @@
+// 3D falling messages; expects lovePage (set by view_page.html)
+let scene, camera, renderer, controls, messages = [], hearts = [];
+let animationSpeed = lovePage.animationSpeed;
+let isAnimating = true;
+let cameraDistance = 50;
+let frameCount = 0;
+let lastTime = 0;
+let lastMessageTime = 0;
+
+// Message data
+const messageTexts = lovePage.messages;
+const textColor = lovePage.textColor;
+const backgroundColor = lovePage.backgroundColor;
+
+// Responsive camera setup for better mobile/desktop view
+function getInitialCameraSettings() {
+    if (window.innerWidth < 700) {
+        // Phone: wider view, higher up, looking upward a bit
+        return { pos: [0, 10, 90], look: [0, 20, 0] };
+    } else {
+        // Desktop: default, looking upward a bit
+        return { pos: [0, 0, cameraDistance], look: [0, 20, 0] };
+    }
+}
+
+function init() {
+    setTimeout(() => {
+        document.getElementById('loading').style.display = 'none';
+    }, 1000);
+
+    scene = new THREE.Scene();
+
+    // Lighting
+    scene.add(new THREE.AmbientLight(0xffffff, 1.2));
+    const dirLight = new THREE.DirectionalLight(0xffffff, 1.2);
+    dirLight.position.set(0, 50, 50);
+    scene.add(dirLight);
+
+    // Responsive camera
+    const camSet = getInitialCameraSettings();
+    camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
+    camera.position.set(...camSet.pos);
+    camera.lookAt(...camSet.look);
+
+    renderer = new THREE.WebGLRenderer({ antialias: true, alpha: true });
+    renderer.setSize(window.innerWidth, window.innerHeight);
+    renderer.setClearColor(backgroundColor, 0);
+    document.getElementById('three-container').appendChild(renderer.domElement);
+
+    // OrbitControls for camera movement
+    controls = new THREE.OrbitControls(camera, renderer.domElement);
+    controls.enableDamping = true;
+    controls.dampingFactor = 0.08;
+    controls.enablePan = false;
+
+    // Prevent zooming out from starting point
+    controls.minDistance = camera.position.distanceTo(new THREE.Vector3(...getInitialCameraSettings().look));
+    controls.maxDistance = controls.minDistance;
+
+    // Restrict horizontal rotation to ±60 degrees (in radians)
+    controls.minAzimuthAngle = -Math.PI / 6; // -30 degrees 
+    controls.maxAzimuthAngle = Math.PI / 6;  // +30 degrees
+
+    // Restrict vertical rotation so user can't look too far up or down
+    // (0 = straight up, Math.PI/2 = horizon, Math.PI = straight down)
+    controls.minPolarAngle = Math.PI / 4;    // 45deg from top (can't look too far up)
+    controls.maxPolarAngle = Math.PI / 1.5;  // ~120deg from top (can't look too far down)
+
+    // Mix text and hearts together
+    createMixedParticles();
+
+    window.addEventListener('resize', onWindowResize);
+
+    animate();
+}
+
+// Mix text and hearts together in the same array and z-range
+function createMixedParticles() {
+    const total = 80; // total objects (hearts + texts)
+    for (let i = 0; i < total; i++) {
+        if (Math.random() < 0.5) {
+            // Heart
+            const geometry = createHeartGeometry(0.7 + Math.random() * 0.7);
+            const material = new THREE.MeshPhongMaterial({
+                color: 0xff4d6d,
+                shininess: 80,
+                specular: 0xffffff,
+                transparent: true,
+                opacity: 0.7
+            });
+            const mesh = new THREE.Mesh(geometry, material);
+
+            mesh.position.x = (Math.random() - 0.5) * 100 + 20; // wider range
+            mesh.position.y = (Math.random() - 0.5) * 100 + 20; // start higher
+            mesh.position.z = (Math.random() - 0.5) * 100; // mix with text z-range
+
+            mesh.userData = {
+                floatSpeed: 0.1 + Math.random() * 0.2,
+                floatPhase: Math.random() * Math.PI * 2,
+                isHeart: true
+            };
+
+            scene.add(mesh);
+            messages.push(mesh);
+        } else {
+            // Text
+            createFallingMessage(true); // true = random z
+        }
+    }
+}
+
+// 3D heart geometry function (true heart)
+function createHeartGeometry(scale = 1) {
+    const shape = new THREE.Shape();
+    for (let t = 0; t <= Math.PI; t += Math.PI / 32) {
+        const x = 16 * Math.pow(Math.sin(t), 3);
+        const y = 13 * Math.cos(t) - 5 * Math.cos(2 * t) - 2 * Math.cos(3 * t) - Math.cos(4 * t);
+        if (t === 0) {
+            shape.moveTo(x * scale * 0.07, y * scale * 0.07);
+        } else {
+            shape.lineTo(x * scale * 0.07, y * scale * 0.07);
+        }
+    }
+    const extrudeSettings = {
+        depth: 2 * scale,
+        bevelEnabled: true,
+        bevelSegments: 2,
+        steps: 2,
+        bevelSize: 0.5 * scale,
+        bevelThickness: 0.7 * scale
+    };
+    return new THREE.ExtrudeGeometry(shape, extrudeSettings);
+}
+
+// If randomZ is true, text will be mixed in z-range with hearts
+function createFallingMessage(randomZ = false) {
+    if (!messageTexts.length) return;
+    const text = messageTexts[Math.floor(Math.random() * messageTexts.length)];
+
+    const canvas = document.createElement('canvas');
+    const ctx = canvas.getContext('2d');
+    canvas.width = 4096;
+    canvas.height = 1024;
+
+    ctx.shadowColor = "#fff";
+    ctx.shadowBlur = 180;
+    ctx.font = 'bold 220px Arial, sans-serif';
+    ctx.textAlign = 'center';
+    ctx.textBaseline = 'middle';
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+    ctx.fillStyle = textColor;
+    ctx.fillText(text, canvas.width / 2, canvas.height / 2);
+
+    const texture = new THREE.CanvasTexture(canvas);
+    const material = new THREE.MeshBasicMaterial({
+        map: texture,
+        transparent: true,
+        opacity: 1,
+        side: THREE.DoubleSide,
+        depthWrite: false
+    });
+    const geometry = new THREE.PlaneGeometry(70, 17);
+
+    const mesh = new THREE.Mesh(geometry, material);
+
+    mesh.position.x = (Math.random() - 0.5) * 200;
+    mesh.position.y = (Math.random() - 0.5) * 60 + 100; // start higher
+    mesh.position.z = randomZ ? (Math.random() - 0.5) * 40 : 0; // mix with hearts if randomZ
+
+    mesh.rotation.x = 0;
+    mesh.rotation.y = 0;
+    mesh.rotation.z = 0;
+
+    mesh.userData = {
+        fallSpeed: 12 + Math.random() * 10,
+        drift: 0,
+        rotSpeed: 0,
+        isHeart: false
+    };
+
+    scene.add(mesh);
+    messages.push(mesh);
+}
+
+function animate() {
+    requestAnimationFrame(animate);
+
+    // FPS counter
+    frameCount++;
+    const currentTime = performance.now();
+    if (currentTime - lastTime >= 1000) {
+        document.getElementById('fpsCounter').textContent = `FPS: ${Math.round((frameCount * 1000) / (currentTime - lastTime))}`;
+        frameCount = 0;
+        lastTime = currentTime;
+    }
+
+    // Add more falling text over time for density
+    if (isAnimating && messageTexts.length > 0) {
+        const now = Date.now();
+        if (!lastMessageTime || now - lastMessageTime > 100) {
+            createFallingMessage(true);
+            lastMessageTime = now;
+        }
+    }
+
+    // Animate all objects (hearts float, text falls)
+    for (let i = messages.length - 1; i >= 0; i--) {
+        const obj = messages[i];
+        if (obj.userData.isHeart) {
+            obj.position.y += Math.sin(Date.now() * 0.001 + obj.userData.floatPhase) * obj.userData.floatSpeed * 0.1;
+            obj.position.x += Math.cos(Date.now() * 0.001 + obj.userData.floatPhase) * obj.userData.floatSpeed * 0.05;
+            obj.rotation.y += 0.01;
+            obj.rotation.x += 0.005;
+            if (obj.position.y < -90) {
+                obj.position.y = 60 + Math.random() * 10;
+                obj.position.x = (Math.random() - 0.5) * 80;
+                obj.position.z = (Math.random() - 0.5) * 20;
+            }
+        } else {
+            obj.position.y -= obj.userData.fallSpeed * 0.016 * animationSpeed;
+            obj.rotation.x = 0;
+            obj.rotation.y = 0;
+            obj.rotation.z = 0;
+            if (obj.position.y < -80) {
+                scene.remove(obj);
+                messages.splice(i, 1);
+                obj.geometry.dispose();
+                obj.material.dispose();
+                if (obj.material.map) obj.material.map.dispose();
+            }
+        }
+    }
+
+    controls.update();
+    renderer.render(scene, camera);
+}
+
+function onWindowResize() {
+    camera.aspect = window.innerWidth / window.innerHeight;
+    camera.updateProjectionMatrix();
+    renderer.setSize(window.innerWidth, window.innerHeight);
+
+    // Adjust camera for phone/desktop on resize
+    const camSet = getInitialCameraSettings();
+    camera.position.set(...camSet.pos);
+    camera.lookAt(...camSet.look);
+
+    // Re-apply controls limits after resize
+    const minDist = camera.position.distanceTo(new THREE.Vector3(...camSet.look));
+    controls.minDistance = minDist;
+    controls.maxDistance = minDist;
+    controls.minAzimuthAngle = -Math.PI / 4;
+    controls.maxAzimuthAngle = Math.PI / 4;
+    controls.minPolarAngle = Math.PI / 4;
+    controls.maxPolarAngle = Math.PI / 1.5;
+}
+
+function toggleAnimation() {
+    isAnimating = !isAnimating;
+    const button = document.getElementById('playPauseBtn');
+    button.innerHTML = isAnimating ? '⏸️ Pause' : '▶️ Play';
+    button.className = isAnimating ? 'control-btn' : 'control-btn active';
+}
+
+function changeSpeed(delta) {
+    animationSpeed = Math.max(0.1, Math.min(5, animationSpeed + delta));
+}
+
+function resetCamera() {
+    controls.reset();
+    const camSet = getInitialCameraSettings();
+    camera.position.set(...camSet.pos);
+    camera.lookAt(...camSet.look);
+}
+
+function toggleInstructions() {
+    const instructions = document.getElementById('instructions');
+    instructions.classList.toggle('show');
+}
+
+function toggleFullscreen() {
+    if (!document.fullscreenElement) {
+        document.documentElement.requestFullscreen();
+    } else {
+        if (document.exitFullscreen) {
+            document.exitFullscreen();
+        }
+    }
+}
+
+window.addEventListener('load', init);
@@ -1,9 +1,9 @@
 import json
 import base64
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from io import BytesIO
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.core.paginator import Paginator
@@ -11,7 +11,7 @@ from django.utils import timezone
 from django.contrib.messages import get_messages
 from django.core.serializers.json import DjangoJSONEncoder
 
-from .models import MessagePage, Message, MessageTemplate
+from .models import Job, MessagePage, Message, MessageTemplate
 
 
 # Run all tests
@@ -323,6 +323,21 @@ class ViewsTestCase(TestCase):
         self.assertEqual(self.message1.text, 'Updated message text')
         self.assertEqual(self.message1.font_size, 20)
 
+    def test_update_message_invalid_json(self):
+        """Test updating a message with a malformed body"""
+        self.client.login(username='testuser', password='testpassword123')
+
+        response = self.client.post(
+            reverse('update_message', args=[self.message1.id]),
+            '{"text": ',
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {'success': False, 'error': 'Invalid JSON'})
+        self.message1.refresh_from_db()
+        self.assertEqual(self.message1.text, 'I love you')
+
     def test_update_message_unauthorized(self):
         """Test updating message by unauthorized user"""
         self.client.login(username='otheruser', password='otherpassword123')
@@ -491,36 +506,43 @@ class ViewsTestCase(TestCase):
         self.message_page.refresh_from_db()
         self.assertEqual(self.message_page.view_count, initial_view_count)
 
-    @patch('love_messages.views.qrcode.QRCode')
-    @patch('love_messages.views.Image')
-    def test_generate_heart_qr_code(self, mock_image, mock_qr_class):
+    def test_generate_heart_qr_code(self):
         """Test QR code generation function"""
-        # Mock QR code creation
-        mock_qr = MagicMock()
-        mock_qr_class.return_value = mock_qr
-        
-        # Mock image operations
-        mock_img = MagicMock()
-        mock_qr.make_image.return_value = mock_img
-        mock_img.convert.return_value = mock_img
-        mock_img.size = [200, 200]
-        mock_img.copy.return_value = mock_img
-        mock_img.rotate.return_value = mock_img
-        
-        mock_image.new.return_value = mock_img
-        
-        # Mock BytesIO for base64 conversion
-        with patch('love_messages.views.io.BytesIO') as mock_bytesio:
-            mock_buffer = MagicMock()
-            mock_bytesio.return_value = mock_buffer
-            mock_buffer.getvalue.return_value = b'fake_image_data'
-            
-            from .views import generate_heart_qr_code
-            result = generate_heart_qr_code('http://example.com')
-            
-            self.assertTrue(result.startswith('data:image/png;base64,'))
-            mock_qr.add_data.assert_called_with('http://example.com')
-            mock_qr.make.assert_called_with(fit=True)
+        from PIL import Image
+        from .views import generate_heart_qr_code
+
+        result = generate_heart_qr_code('http://example.com')
+
+        self.assertTrue(result.startswith('data:image/png;base64,'))
+        png = base64.b64decode(result.split(',', 1)[1])
+        image = Image.open(BytesIO(png))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+
+
+class HeartQRRenderTestCase(TestCase):
+    """Tests for the vectorized heart QR renderer"""
+
+    def test_remove_white_background_matches_per_pixel(self):
+        """Vectorized thresholding gives the same pixels as the per-pixel loop"""
+        from PIL import Image
+        from .qr_render import remove_white_background
+
+        pixels = [(255, 255, 255, 255), (241, 241, 241, 200), (240, 255, 255, 255),
+                  (255, 0, 0, 255), (250, 250, 239, 10), (0, 0, 0, 0)]
+        image = Image.new('RGBA', (len(pixels), 1))
+        image.putdata(pixels)
+
+        expected = [(255, 255, 255, 0) if r > 240 and g > 240 and b > 240 else (r, g, b, a)
+                    for r, g, b, a in pixels]
+        self.assertEqual(list(remove_white_background(image).getdata()), expected)
+
+    def test_render_heart_qr_png_is_deterministic(self):
+        """The same URL always renders to the same PNG bytes"""
+        from .qr_render import render_heart_qr_png
+
+        self.assertEqual(render_heart_qr_png('http://example.com/view/1/'),
+                         render_heart_qr_png('http://example.com/view/1/'))
 
 
 class IntegrationTestCase(TestCase):
@@ -670,4 +692,1914 @@ class ErrorHandlingTestCase(TestCase):
             json.dumps({'text': 'New text'}),
             content_type='application/json'
         )
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+class HeartQRCacheTestCase(TestCase):
+    """Tests for the content-addressed heart QR cache"""
+
+    def test_lru_evicts_least_recently_used_over_byte_cap(self):
+        from .qr_cache import LRUByteCache
+
+        cache = LRUByteCache(max_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.get('a')
+        cache.set('c', b'12345')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'12345')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 10)
+
+    def test_key_depends_on_url_and_render_params(self):
+        from .qr import render_params
+        from .qr_cache import heart_qr_key
+
+        params = render_params()
+        self.assertEqual(heart_qr_key('http://a/'), heart_qr_key('http://a/', 'png', params))
+        self.assertNotEqual(heart_qr_key('http://a/'), heart_qr_key('http://b/'))
+        self.assertNotEqual(heart_qr_key('http://a/'), heart_qr_key('http://a/', 'svg'))
+        self.assertNotEqual(heart_qr_key('http://a/'), heart_qr_key('http://a/', 'png', dict(params, box_size=10)))
+
+    @patch('love_messages.qr_cache.render_heart_qr', return_value=b'png')
+    def test_repeat_requests_skip_rendering(self, mock_render):
+        from .qr_cache import QRCache
+
+        cache = QRCache()
+        self.assertEqual(cache.get_png('http://example.com/'), b'png')
+        self.assertEqual(cache.get_png('http://example.com/'), b'png')
+
+        mock_render.assert_called_once_with('http://example.com/', 'png')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['renders']), (1, 1, 1))
+
+    @patch('love_messages.qr_cache.render_heart_qr', return_value=b'png')
+    def test_shared_tier_is_used_across_processes(self, mock_render):
+        from django.core.cache import cache as default_cache
+        from .qr_cache import QRCache
+
+        default_cache.clear()
+        QRCache(backend='default').get_png('http://example.com/')
+        other_worker = QRCache(backend='default')
+        self.assertEqual(other_worker.get_png('http://example.com/'), b'png')
+
+        mock_render.assert_called_once()
+        self.assertEqual(other_worker.stats()['shared_hits'], 1)
+
+
+class HeartQRImageTestCase(TestCase):
+    """Tests for the cacheable heart QR image endpoint"""
+
+    def setUp(self):
+        self.client = Client()
+        self.page = MessagePage.objects.create(title='QR Page')
+
+    def test_png_is_served_with_cache_headers(self):
+        response = self.client.get(reverse('heart_qr_png', args=[self.page.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_svg_and_webp_variants(self):
+        svg = self.client.get(reverse('heart_qr_svg', args=[self.page.id]))
+        webp = self.client.get(reverse('heart_qr_webp', args=[self.page.id]))
+
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertTrue(svg.content.startswith(b'<svg'))
+        self.assertEqual(webp['Content-Type'], 'image/webp')
+        self.assertEqual(webp.content[8:12], b'WEBP')
+        self.assertNotEqual(svg['ETag'], webp['ETag'])
+
+    @patch('love_messages.views.heart_qr_cache')
+    def test_if_none_match_returns_304_without_rendering(self, mock_cache):
+        url = reverse('heart_qr_png', args=[self.page.id])
+        mock_cache.aget = AsyncMock(return_value=b'png')
+        etag = self.client.get(url)['ETag']
+        mock_cache.aget.reset_mock()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        mock_cache.aget.assert_not_called()
+
+    @patch('love_messages.views.heart_qr_cache')
+    def test_render_timeout_returns_503(self, mock_cache):
+        from .qr_service import QRRenderTimeout
+
+        mock_cache.aget = AsyncMock(side_effect=QRRenderTimeout('url'))
+        response = self.client.get(reverse('heart_qr_png', args=[self.page.id]))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    def test_unknown_page_returns_404(self):
+        import uuid
+        response = self.client.get(reverse('heart_qr_png', args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_edit_page_references_qr_url(self):
+        user = User.objects.create_user(username='qruser', password='testpass123')
+        self.page.user = user
+        self.page.save()
+        self.client.login(username='qruser', password='testpass123')
+
+        response = self.client.get(reverse('edit_page', args=[self.page.id]))
+
+        self.assertEqual(response.context['qr_code'], reverse('heart_qr_png', args=[self.page.id]))
+        self.assertNotContains(response, 'data:image/png;base64')
+
+
+class MaskAtlasTestCase(TestCase):
+    """Tests for the precomputed QR mask atlas"""
+
+    def test_masks_are_built_once_and_match_drawn_masks(self):
+        from .masks import MaskAtlas, draw_heart_mask, draw_lobe_mask
+
+        atlas = MaskAtlas()
+        with patch('love_messages.masks.draw_heart_mask', wraps=draw_heart_mask) as mock_draw:
+            with patch.dict('love_messages.masks.MASK_BUILDERS', {'heart': mock_draw}):
+                first = atlas.get('heart', 48)
+                second = atlas.get('heart', 48)
+
+        mock_draw.assert_called_once_with(48)
+        self.assertEqual(first.tobytes(), draw_heart_mask(48).tobytes())
+        self.assertEqual(second.tobytes(), first.tobytes())
+        self.assertEqual(atlas.get('lobe-left', 48).tobytes(), draw_lobe_mask(48, 'left').tobytes())
+
+    def test_memory_budget_and_resident_report(self):
+        from .masks import MaskAtlas
+
+        atlas = MaskAtlas(max_bytes=300)
+        atlas.warm([48], kinds=['heart', 'lobe-left'])
+        atlas.get('heart', 64)  # 512 bytes packed, over budget
+
+        self.assertEqual(atlas.resident(), [
+            {'kind': 'heart', 'size': 48, 'bytes': 288},
+        ])
+        self.assertEqual(atlas.get('heart', 64).size, (64, 64))
+
+    def test_model_heart_qr_keeps_qr_inside_heart(self):
+        from PIL import Image
+        from django.test import RequestFactory
+
+        page = MessagePage.objects.create(title='Heart')
+        result = page.generate_heart_qr(RequestFactory().get('/'))
+
+        self.assertTrue(result.startswith('data:image/png;base64,'))
+        image = Image.open(BytesIO(base64.b64decode(result.split(',', 1)[1])))
+        self.assertEqual(image.getpixel((0, 0)), (255, 182, 193, 100))
+        self.assertEqual(image.getpixel((image.width // 2, image.height // 2))[3], 255)
+
+
+class QRRenderServiceTestCase(TestCase):
+    """Tests for the process-pool QR rendering service"""
+
+    def test_renders_on_pool_and_records_metrics(self):
+        import asyncio
+        from .qr import render_heart_qr
+        from .qr_service import QRRenderService
+
+        service = QRRenderService(workers=1, max_pending=2, timeout=60)
+        try:
+            png = service.render('http://example.com/')
+            webp = asyncio.run(service.arender('http://example.com/', 'webp'))
+        finally:
+            service.shutdown()
+
+        self.assertEqual(png, render_heart_qr('http://example.com/'))
+        self.assertEqual(webp[8:12], b'WEBP')
+        stats = service.stats()
+        self.assertEqual((stats['pooled'], stats['inline'], stats['pending']), (2, 0, 0))
+        self.assertGreater(stats['render_seconds'], 0)
+
+    @patch('love_messages.qr_service.render_heart_qr', return_value=b'png')
+    def test_saturated_pool_renders_inline(self, mock_render):
+        from .qr_service import QRRenderService
+
+        service = QRRenderService(workers=1, max_pending=0)
+        self.assertEqual(service.render('http://example.com/'), b'png')
+
+        mock_render.assert_called_once_with('http://example.com/', 'png')
+        self.assertIsNone(service._executor)
+        self.assertEqual(service.stats()['inline'], 1)
+
+    def test_timeout_raises(self):
+        from concurrent.futures import Future
+        from .qr_service import QRRenderService, QRRenderTimeout
+
+        service = QRRenderService(workers=1, timeout=0.01)
+        service._executor = MagicMock()
+        service._executor.submit.return_value = Future()
+
+        with self.assertRaises(QRRenderTimeout):
+            service.render('http://example.com/')
+        self.assertEqual(service.stats()['timeouts'], 1)
+        # The job had not started, so cancelling it freed its slot
+        self.assertEqual(service.pending, 0)
+
+    def test_timed_out_running_job_holds_its_slot_until_done(self):
+        import asyncio
+        from concurrent.futures import Future
+        from .qr_service import QRRenderService, QRRenderTimeout
+
+        service = QRRenderService(workers=1, max_pending=2, timeout=0.01)
+        service._executor = MagicMock()
+        futures = [Future(), Future()]
+        for future in futures:
+            future.set_running_or_notify_cancel()  # already in a pool process: cancel() cannot stop it
+        service._executor.submit.side_effect = futures
+
+        with self.assertRaises(QRRenderTimeout):
+            service.render('http://example.com/')
+        with self.assertRaises(QRRenderTimeout):
+            asyncio.run(service.arender('http://example.com/'))
+        self.assertEqual(service.pending, 2)
+
+        # Both slots are still taken, so the next render runs inline
+        with patch('love_messages.qr_service.render_heart_qr', return_value=b'png'):
+            self.assertEqual(service.render('http://example.com/'), b'png')
+        self.assertEqual(service.stats()['inline'], 1)
+
+        for future in futures:
+            future.set_result((b'png', 0.0, 1.0))
+        self.assertEqual(service.pending, 0)
+
+
+class ViewCounterTestCase(TestCase):
+    """Tests for buffered view counting"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='counter', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Counted', view_count=3)
+        self.other_page = MessagePage.objects.create(user=self.user, title='Other')
+
+    def test_increments_are_buffered_until_flush(self):
+        from .view_counter import ViewCounter
+
+        counter = ViewCounter(flush_interval=60, batch_size=1000)
+        counter._thread = MagicMock()  # no background flusher in tests
+        for _ in range(4):
+            counter.increment(self.page.id)
+        counter.increment(self.other_page.id)
+
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.view_count, 3)
+        self.assertEqual(counter.pending(self.page.id), 4)
+
+        # Two UPDATEs inside one savepoint
+        with self.assertNumQueries(4):
+            self.assertEqual(counter.flush(), 5)
+        self.page.refresh_from_db()
+        self.other_page.refresh_from_db()
+        self.assertEqual((self.page.view_count, self.other_page.view_count), (7, 1))
+        self.assertEqual(counter.pending(self.page.id), 0)
+
+    def test_pages_with_equal_delta_share_one_update(self):
+        from .view_counter import ViewCounter
+
+        counter = ViewCounter(flush_interval=60)
+        counter._thread = MagicMock()
+        counter.increment(self.page.id, 2)
+        counter.increment(self.other_page.id, 2)
+
+        # One UPDATE inside one savepoint
+        with self.assertNumQueries(3):
+            counter.flush()
+
+    def test_failed_flush_keeps_pending_views(self):
+        from .view_counter import ViewCounter
+
+        counter = ViewCounter(flush_interval=60)
+        counter._thread = MagicMock()
+        counter.increment(self.page.id, 2)
+
+        with patch('love_messages.models.MessagePage.objects.filter', side_effect=Exception('db down')):
+            with self.assertLogs('love_messages.view_counter', 'ERROR'):
+                self.assertEqual(counter.flush(), 0)
+        self.assertEqual(counter.pending(self.page.id), 2)
+
+    def test_batch_size_wakes_flusher(self):
+        from .view_counter import ViewCounter
+
+        counter = ViewCounter(flush_interval=60, batch_size=2)
+        counter._thread = MagicMock()
+        counter.increment(self.page.id)
+        self.assertFalse(counter._wake.is_set())
+        counter.increment(self.page.id)
+        self.assertTrue(counter._wake.is_set())
+
+    def test_analytics_includes_pending_views(self):
+        from .view_counter import view_counter
+
+        self.client.login(username='counter', password='testpass123')
+        with patch.object(view_counter, 'pending', return_value=4):
+            response = self.client.get(reverse('page_analytics', args=[self.page.id]))
+
+        self.assertEqual(response.context['total_views'], 7)
+
+    def test_model_increment_is_atomic(self):
+        stale = MessagePage.objects.get(pk=self.page.pk)
+        MessagePage.objects.filter(pk=self.page.pk).update(view_count=10)
+
+        stale.increment_view_count()
+
+        self.assertEqual(stale.view_count, 11)
+
+
+class PageCacheTestCase(TestCase):
+    """Tests for the rendered view_page cache and its invalidation"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='cacher', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Cached Page', view_count=0)
+        self.message = Message.objects.create(page=self.page, text='Hello cache', order=0)
+        self.url = reverse('view_page', args=[self.page.id])
+
+    def test_hit_serves_cached_body_and_still_counts_views(self):
+        from .view_counter import view_counter
+
+        with patch.object(view_counter, 'increment') as mock_increment:
+            first = self.client.get(self.url)
+            with self.assertNumQueries(0):
+                second = self.client.get(self.url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(mock_increment.call_count, 2)
+
+    def test_message_changes_invalidate(self):
+        self.client.get(self.url)
+
+        self.message.text = 'Edited message'
+        self.message.save()
+        self.assertContains(self.client.get(self.url), 'Edited message')
+
+        self.message.delete()
+        self.assertNotContains(self.client.get(self.url), 'Edited message')
+
+    def test_page_save_invalidates(self):
+        self.client.get(self.url)
+        self.page.title = 'Renamed Page'
+        self.page.save()
+
+        self.assertContains(self.client.get(self.url), 'Renamed Page')
+
+    def test_reorder_invalidates(self):
+        second = Message.objects.create(page=self.page, text='Second', order=1)
+        self.client.get(self.url)
+        self.client.login(username='cacher', password='testpass123')
+
+        self.client.post(
+            reverse('reorder_messages', args=[self.page.id]),
+            json.dumps({'message_ids': [second.id, self.message.id]}),
+            content_type='application/json'
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(json.loads(response.context['messages_json']), ['Second', 'Hello cache'])
+
+    def test_render_racing_an_edit_is_not_served(self):
+        from . import page_cache
+
+        version = page_cache.current_version(self.page.id)
+        page_cache.invalidate_page(self.page.id)  # edit lands mid-render
+        page_cache.set_response(self.page.id, version, b'stale')
+
+        self.assertIsNone(page_cache.get_response(self.page.id))
+
+    def test_async_render_racing_an_edit_is_not_served(self):
+        from asgiref.sync import async_to_sync
+        from . import page_cache
+
+        version = async_to_sync(page_cache.arender_version)(self.page.id)
+        page_cache.invalidate_page(self.page.id)
+        async_to_sync(page_cache.aset_response)(self.page.id, version, b'stale')
+
+        self.assertIsNone(async_to_sync(page_cache.aget_response)(self.page.id))
+
+    def test_async_view_uses_async_cache_api(self):
+        from . import page_cache
+
+        blocking = MagicMock(side_effect=AssertionError('blocking cache call on the event loop'))
+        with patch.multiple(page_cache, get_response=blocking, render_version=blocking, set_response=blocking):
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+
+        self.assertContains(first, 'Hello cache')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(page_cache.get_response(self.page.id)[0], first.content)
+
+
+class DashboardQueryTestCase(TestCase):
+    """Query-count regression tests for the dashboard"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='poweruser', password='testpass123')
+        self.client.login(username='poweruser', password='testpass123')
+
+    def create_pages(self, count, messages_per_page=3):
+        for i in range(count):
+            page = MessagePage.objects.create(user=self.user, title=f'Power Page {i}')
+            for j in range(messages_per_page):
+                Message.objects.create(page=page, text=f'Message {j}', order=j)
+
+    def dashboard_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_constant_in_page_count(self):
+        self.create_pages(1)
+        few = self.dashboard_queries()
+        self.create_pages(30)
+        many = self.dashboard_queries()
+
+        self.assertEqual(few, many)
+        # session, user, page count, page of cards
+        self.assertLessEqual(many, 4)
+
+    def test_cards_are_paginated_with_message_counts(self):
+        self.create_pages(12, messages_per_page=2)
+
+        response = self.client.get(reverse('dashboard') + '?page=2')
+
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj.object_list), 3)
+        self.assertTrue(all(page.message_count == 2 for page in page_obj))
+        self.assertContains(response, 'Messages: 2')
+
+
+class BulkAddMessagesTestCase(TestCase):
+    """Tests for the bulk message creation API"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='bulkuser', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Bulk Page')
+        self.url = reverse('add_messages', args=[self.page.id])
+        self.client.login(username='bulkuser', password='testpass123')
+
+    def post(self, data):
+        return self.client.post(self.url, json.dumps(data), content_type='application/json')
+
+    def test_adds_all_messages_in_constant_queries(self):
+        # 150 rows fit one INSERT within SQLite's 999 parameter limit
+        items = [{'text': f'Line {i}', 'order': i, 'font_size': 20} for i in range(150)]
+
+        # session, user, page lookup, savepoint, INSERT, snapshot refresh
+        # (lock page, read texts, update page), release savepoint
+        with self.assertNumQueries(9):
+            response = self.post({'messages': items})
+
+        self.assertEqual(json.loads(response.content), {'success': True, 'created': 150})
+        self.assertEqual(self.page.messages.count(), 150)
+        self.assertEqual(self.page.messages.get(order=149).font_size, 20)
+
+    def test_bare_list_and_default_order(self):
+        response = self.post([{'text': 'First'}, {'text': 'Second'}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.page.messages.values_list('text', 'order', 'font_size')),
+                         [('First', 0, 32), ('Second', 1, 32)])
+
+    def test_invalid_items_reject_whole_request(self):
+        response = self.post({'messages': [{'text': 'ok'}, {'text': ' '}, {'text': 'x', 'order': 'a'}]})
+
+        self.assertEqual(response.status_code, 400)
+        errors = json.loads(response.content)['errors']
+        self.assertEqual([e['index'] for e in errors], [1, 2])
+        self.assertEqual(self.page.messages.count(), 0)
+
+    @patch('love_messages.services.MAX_MESSAGES_PER_REQUEST', 2)
+    def test_per_request_cap(self):
+        response = self.post({'messages': [{'text': 'a'}, {'text': 'b'}, {'text': 'c'}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.page.messages.count(), 0)
+
+    def test_other_users_page_is_404(self):
+        other = User.objects.create_user(username='bulkother', password='testpass123')
+        other_page = MessagePage.objects.create(user=other)
+
+        response = self.client.post(reverse('add_messages', args=[other_page.id]),
+                                    json.dumps([{'text': 'x'}]), content_type='application/json')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_add_invalidates_cached_page(self):
+        view_url = reverse('view_page', args=[self.page.id])
+        self.client.get(view_url)
+
+        self.post([{'text': 'Fresh line'}])
+
+        self.assertContains(self.client.get(view_url), 'Fresh line')
+
+
+class ReorderMessagesTestCase(TestCase):
+    """Tests for single-statement, versioned message reordering"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='reorderer', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Reorder Page')
+        self.messages = [Message.objects.create(page=self.page, text=f'M{i}', order=i) for i in range(50)]
+        self.url = reverse('reorder_messages', args=[self.page.id])
+        self.client.login(username='reorderer', password='testpass123')
+
+    def post(self, data):
+        return self.client.post(self.url, json.dumps(data), content_type='application/json')
+
+    def test_reorder_is_one_update_and_returns_version(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        ids = [str(m.id) for m in reversed(self.messages)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({'message_ids': ids, 'version': 0})
+
+        self.assertEqual(json.loads(response.content), {'success': True, 'version': 1})
+        message_updates = [q for q in queries if q['sql'].startswith('UPDATE "love_messages_message"')]
+        self.assertEqual(len(message_updates), 1)
+        self.assertEqual(list(self.page.messages.order_by('order').values_list('text', flat=True)),
+                         [f'M{i}' for i in reversed(range(50))])
+
+    def test_ids_from_another_page_are_rejected_up_front(self):
+        other_page = MessagePage.objects.create(user=self.user, title='Other')
+        foreign = Message.objects.create(page=other_page, text='Foreign', order=0)
+
+        response = self.post({'message_ids': [self.messages[1].id, foreign.id]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['unknown'], [foreign.id])
+        self.messages[1].refresh_from_db()
+        self.assertEqual(self.messages[1].order, 1)
+
+    def test_stale_version_conflicts(self):
+        self.post({'message_ids': [self.messages[1].id, self.messages[0].id], 'version': 0})
+
+        response = self.post({'message_ids': [self.messages[0].id, self.messages[1].id], 'version': 0})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['version'], 1)
+        self.messages[1].refresh_from_db()
+        self.assertEqual(self.messages[1].order, 0)
+
+    def test_invalid_ids_are_rejected(self):
+        self.assertEqual(self.post({'message_ids': ['abc']}).status_code, 400)
+        self.assertEqual(self.post({'message_ids': [self.messages[0].id] * 2}).status_code, 400)
+
+
+class PageCloningTestCase(TestCase):
+    """Tests for set-based page duplication and message copying"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='cloner', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Source', text_color='#123456',
+                                               animation_speed=1.5)
+        for i in range(40):
+            Message.objects.create(page=self.page, text=f'Line {i}', order=i, font_size=10 + i)
+        self.client.login(username='cloner', password='testpass123')
+
+    def test_copy_is_one_insert_regardless_of_size(self):
+        from .services import copy_page_messages
+
+        target = MessagePage.objects.create(user=self.user, title='Target')
+        # savepoint, INSERT ... SELECT, snapshot refresh (lock, read, update), release
+        with self.assertNumQueries(6):
+            stats = copy_page_messages(self.page, target)
+
+        self.assertEqual(stats['messages'], 40)
+        self.assertGreaterEqual(stats['seconds'], 0)
+        self.assertEqual(
+            list(target.messages.order_by('order').values_list('text', 'order', 'font_size')),
+            list(self.page.messages.order_by('order').values_list('text', 'order', 'font_size'))
+        )
+
+    def test_duplicate_page_copies_messages_and_reports(self):
+        response = self.client.post(reverse('duplicate_page', args=[self.page.id]))
+
+        clone = MessagePage.objects.get(title='Source (Copy)')
+        self.assertRedirects(response, reverse('edit_page', args=[clone.id]))
+        self.assertEqual(clone.text_color, '#123456')
+        self.assertEqual(clone.animation_speed, 1.5)
+        self.assertEqual(clone.messages.count(), 40)
+        flashed = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn('Copied 40 messages', flashed[0])
+
+    def test_duplicate_all_pages(self):
+        second = MessagePage.objects.create(user=self.user, title='Second')
+        Message.objects.create(page=second, text='Only', order=0)
+        other = User.objects.create_user(username='notcloned', password='testpass123')
+        MessagePage.objects.create(user=other, title='Not mine')
+
+        response = self.client.post(reverse('duplicate_all_pages'))
+
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertEqual(MessagePage.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(MessagePage.objects.get(title='Second (Copy)').messages.count(), 1)
+        self.assertEqual(MessagePage.objects.get(title='Source (Copy)').messages.count(), 40)
+        self.assertFalse(MessagePage.objects.filter(title='Not mine (Copy)').exists())
+
+    def test_duplicate_all_writes_snapshots_in_one_update(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services import clone_pages
+
+        for i in range(5):
+            page = MessagePage.objects.create(user=self.user, title=f'Extra {i}')
+            Message.objects.create(page=page, text=f'Extra message {i}', order=0)
+        pages = list(MessagePage.objects.filter(user=self.user))
+
+        with CaptureQueriesContext(connection) as queries:
+            clones, stats = clone_pages(pages, self.user)
+
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(stats['pages'], 6)
+        for clone in MessagePage.objects.filter(pk__in=[clone.pk for clone in clones]):
+            texts = list(clone.messages.values_list('text', flat=True))
+            self.assertEqual((clone.message_count, json.loads(clone.messages_json)), (len(texts), texts))
+
+    def test_copy_messages_reports_rows(self):
+        target = MessagePage.objects.create(user=self.user, title='Target')
+
+        response = self.client.post(reverse('copy_messages'), json.dumps({
+            'source_page_id': str(self.page.id),
+            'target_page_id': str(target.id),
+        }), content_type='application/json')
+
+        self.assertEqual(json.loads(response.content)['copied'], 40)
+
+    def test_clone_snapshot_matches_the_copied_messages(self):
+        from .services import clone_pages
+
+        source = MessagePage.objects.get(pk=self.page.pk)
+        # A message added after the source row was read
+        Message.objects.create(page=self.page, text='Late', order=40)
+
+        (clone,), stats = clone_pages([source], self.user)
+
+        self.assertEqual(stats['messages'], 41)
+        texts = list(clone.messages.values_list('text', flat=True))
+        self.assertEqual((clone.message_count, json.loads(clone.messages_json)), (41, texts))
+        clone.refresh_from_db()
+        self.assertEqual((clone.message_count, json.loads(clone.messages_json)), (41, texts))
+
+
+class AsyncViewsTestCase(TestCase):
+    """Tests for the ASGI-native read path"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='asyncuser', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Async Page')
+        Message.objects.create(page=self.page, text='Async hello', order=0)
+
+    def test_read_routes_are_coroutines(self):
+        import asyncio
+        from django.urls import resolve
+
+        for name, args in [('view_page', [self.page.id]), ('preview_page', [self.page.id]),
+                           ('page_analytics', [self.page.id]), ('add_message', [self.page.id]),
+                           ('update_message', [1]), ('delete_message', [1])]:
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(reverse(name, args=args)).func), name)
+
+    def test_login_required_redirects_anonymous_users(self):
+        response = self.client.get(reverse('preview_page', args=[self.page.id]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response['Location'])
+
+    def test_async_api_is_csrf_exempt(self):
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.login(username='asyncuser', password='testpass123')
+
+        response = csrf_client.post(reverse('add_message', args=[self.page.id]),
+                                    json.dumps({'text': 'No token needed'}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.page.messages.filter(text='No token needed').exists())
+
+    def test_sync_and_async_view_page_render_the_same(self):
+        from django.test import RequestFactory
+        from . import page_cache, views
+
+        request = RequestFactory().get('/')
+        sync_body = views.view_page(request, self.page.id).content
+        page_cache.invalidate_page(self.page.id)
+        async_body = self.client.get(reverse('view_page', args=[self.page.id])).content
+
+        self.assertEqual(sync_body, async_body)
+
+
+class ConnectionPoolTestCase(TestCase):
+    def setUp(self):
+        import os
+        import shutil
+        import sqlite3
+        import tempfile
+        from love_project.db import ConnectionPool
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        self.db_path = os.path.join(tmp_dir, 'pool.sqlite3')
+        self.opened = []
+
+        def connect():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool(connect, max_size=2, timeout=0.1)
+
+    def tearDown(self):
+        from love_project.db.pool import reset_pools
+        self.pool.close_all()
+        reset_pools()
+
+    def pooled_connection(self, **pool):
+        """A pooled SQLite DatabaseWrapper on its own alias and file"""
+        from django.db.utils import ConnectionHandler
+        handler = ConnectionHandler({'default': {'ENGINE': 'django.db.backends.sqlite3'}, 'pooled': {
+            'ENGINE': 'love_project.db.backends.sqlite3', 'NAME': self.db_path,
+            'CONN_HEALTH_CHECKS': True, 'POOL': pool,
+        }})
+        return handler['pooled']
+
+    def test_released_connections_are_reused(self):
+        conn, reused = self.pool.acquire()
+        self.assertFalse(reused)
+        self.pool.release(conn)
+
+        again, reused = self.pool.acquire()
+
+        self.assertTrue(reused)
+        self.assertIs(again, conn)
+        stats = self.pool.stats()
+        self.assertEqual((stats['acquires'], stats['created'], stats['reused']), (2, 1, 1))
+        self.assertEqual(stats['reuse_rate'], 0.5)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_acquire_times_out_when_pool_is_exhausted(self):
+        from love_project.db import PoolTimeout
+
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+    def test_waiting_acquire_gets_a_released_connection(self):
+        import threading
+
+        first, _ = self.pool.acquire()
+        self.pool.acquire()
+        self.pool.timeout = 5
+        threading.Timer(0.05, self.pool.release, [first]).start()
+
+        conn, reused = self.pool.acquire()
+
+        self.assertIs(conn, first)
+        self.assertTrue(reused)
+        self.assertEqual(self.pool.stats()['waits'], 1)
+
+    def test_stale_and_broken_connections_are_replaced(self):
+        conn, _ = self.pool.acquire()
+        self.pool.release(conn)
+        self.pool.max_idle = 0
+
+        replacement, reused = self.pool.acquire()
+
+        self.assertFalse(reused)
+        self.assertIsNot(replacement, conn)
+
+        self.pool.max_idle = None
+        self.pool.check, self.pool.check_after = (lambda c: False), 0
+        self.pool.release(replacement)
+        self.assertFalse(self.pool.acquire()[1])
+        self.assertEqual(self.pool.stats()['discarded'], 2)
+
+    def test_pooled_backend_returns_connections_on_close(self):
+        connection = self.pooled_connection(MAX_SIZE=2)
+
+        for _ in range(3):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+
+        stats = connection.pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 2))
+        self.assertEqual((stats['open'], stats['idle']), (1, 1))
+
+    def test_pooled_backend_discards_connection_closed_in_transaction(self):
+        from django.db import transaction
+        connection = self.pooled_connection(MAX_SIZE=2)
+
+        with patch('django.db.transaction.get_connection', return_value=connection):
+            with transaction.atomic(using=connection.alias):
+                connection.close()
+
+        stats = connection.pool.stats()
+        self.assertEqual((stats['discarded'], stats['open']), (1, 0))
+
+    def test_warm_up_fills_pools(self):
+        from love_project.db import connection_stats, warm_up_connections
+        connection = self.pooled_connection(MAX_SIZE=3, WARMUP=2)
+
+        with patch('django.db.connections', {'pooled': connection}):
+            warmed = warm_up_connections(['pooled'])
+
+        self.assertEqual(warmed, {'pooled': 2})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertTrue(connection.connection_reused)
+        self.assertEqual(connection_stats()['pools']['pooled']['idle'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DB_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTestCase(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='replicauser', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Primary title')
+        Message.objects.create(page=self.page, text='Primary message', order=0)
+
+        # The replica holds a recognisably different copy of the same rows
+        self.user.save(using='replica')
+        replica_page = MessagePage.objects.get(pk=self.page.pk)
+        replica_page.title = 'Replica title'
+        replica_page.save(using='replica')
+
+    def age_page_version(self):
+        """Pretend the page last changed long enough ago for replicas to have caught up"""
+        import time
+        from . import page_cache
+        page_cache._cache().set(page_cache._version_key(self.page.id), time.time_ns() - 60 * 10**9)
+
+    def login(self):
+        from django.contrib.sessions.models import Session
+        self.client.login(username='replicauser', password='testpass123')
+        Session.objects.get(pk=self.client.session.session_key).save(using='replica')
+
+    def test_public_views_read_from_replica(self):
+        self.age_page_version()
+
+        response = self.client.get(reverse('view_page', args=[self.page.id]))
+
+        self.assertContains(response, 'Replica title')
+        self.assertNotIn('db_primary_until', response.cookies)
+        # View counts are still written to the primary only
+        self.assertEqual(MessagePage.objects.get(pk=self.page.pk).view_count, 1)
+        self.assertEqual(MessagePage.objects.using('replica').get(pk=self.page.pk).view_count, 0)
+
+    def test_recently_changed_page_renders_from_primary(self):
+        response = self.client.get(reverse('view_page', args=[self.page.id]))
+
+        self.assertContains(response, 'Primary title')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        self.age_page_version()
+        self.login()
+        self.assertContains(self.client.get(reverse('preview_page', args=[self.page.id])), 'Replica title')
+
+        response = self.client.post(reverse('add_message', args=[self.page.id]),
+                                    json.dumps({'text': 'Fresh'}), content_type='application/json')
+
+        self.assertIn('db_primary_until', response.cookies)
+        self.assertTrue(Message.objects.filter(text='Fresh').exists())
+        self.assertFalse(Message.objects.using('replica').filter(text='Fresh').exists())
+        self.age_page_version()
+        self.assertContains(self.client.get(reverse('preview_page', args=[self.page.id])), 'Primary title')
+
+    def test_expired_stickiness_reads_replica_again(self):
+        import time
+        self.age_page_version()
+        self.login()
+        self.client.cookies['db_primary_until'] = str(time.time() - 1)
+
+        response = self.client.get(reverse('page_analytics', args=[self.page.id]))
+
+        self.assertContains(response, 'Replica title')
+
+    def test_unmarked_views_read_the_primary(self):
+        self.age_page_version()
+        self.login()
+
+        response = self.client.get(reverse('edit_page', args=[self.page.id]))
+
+        self.assertContains(response, 'Primary title')
+
+
+class HotQueryIndexTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='indexuser', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Indexed Page')
+        from .services import bulk_add_messages
+        bulk_add_messages(self.page, [{'text': f'Message {i}', 'order': 0} for i in range(3)])
+
+    def test_messages_ordering_matches_the_views(self):
+        # Bulk-created messages share created_at; id keeps their order stable
+        self.assertEqual(Message._meta.ordering, ['order', 'id'])
+        self.assertEqual(
+            list(self.page.messages.values_list('text', flat=True)),
+            list(self.page.messages.order_by('order', 'id').values_list('text', flat=True)),
+        )
+
+    def test_hot_queries_use_indexes(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+
+        self.assertIn('dashboard_pages: ok', out.getvalue())
+        self.assertNotIn('SCAN love_messages_message ', out.getvalue())
+
+    def test_scans_and_sorts_fail_the_check(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        unindexed = {'by_font_size': (Message.objects.order_by('font_size'), False)}
+        with patch('love_messages.management.commands.explain_hot_queries.hot_queries', return_value=unindexed):
+            with self.assertRaisesMessage(CommandError, 'by_font_size'):
+                call_command('explain_hot_queries', stdout=StringIO())
+
+    def test_dashboard_counts_messages(self):
+        from .views import dashboard_pages
+        MessagePage.objects.create(user=self.user, title='Empty Page')
+
+        counts = {page.title: page.message_count for page in dashboard_pages(self.user)}
+
+        self.assertEqual(counts, {'Indexed Page': 3, 'Empty Page': 0})
+
+
+class MessageSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='snapper', password='testpass123')
+        self.client.login(username='snapper', password='testpass123')
+        self.page = MessagePage.objects.create(user=self.user, title='Snapshot Page')
+        self.first = Message.objects.create(page=self.page, text='First', order=0)
+        self.second = Message.objects.create(page=self.page, text='Second', order=1)
+
+    def snapshot(self, page=None):
+        page = MessagePage.objects.get(pk=(page or self.page).pk)
+        return page.message_count, json.loads(page.messages_json)
+
+    def test_single_message_writes_refresh_snapshot(self):
+        self.assertEqual(self.snapshot(), (2, ['First', 'Second']))
+
+        self.client.post(reverse('add_message', args=[self.page.id]),
+                         json.dumps({'text': 'Third', 'order': 2}), content_type='application/json')
+        self.assertEqual(self.snapshot(), (3, ['First', 'Second', 'Third']))
+
+        self.client.post(reverse('update_message', args=[self.first.id]),
+                         json.dumps({'text': 'Edited'}), content_type='application/json')
+        self.assertEqual(self.snapshot(), (3, ['Edited', 'Second', 'Third']))
+
+        self.client.delete(reverse('delete_message', args=[self.second.id]))
+        self.assertEqual(self.snapshot(), (2, ['Edited', 'Third']))
+
+    def test_bulk_writes_refresh_snapshot(self):
+        self.client.post(reverse('add_messages', args=[self.page.id]),
+                         json.dumps({'messages': [{'text': 'Bulk', 'order': 5}]}), content_type='application/json')
+        self.assertEqual(self.snapshot(), (3, ['First', 'Second', 'Bulk']))
+
+        self.client.post(reverse('reorder_messages', args=[self.page.id]),
+                         json.dumps({'message_ids': [self.second.id, self.first.id]}), content_type='application/json')
+        self.assertEqual(self.snapshot()[1][:2], ['Second', 'First'])
+
+        target = MessagePage.objects.create(user=self.user, title='Target')
+        self.client.post(reverse('copy_messages'), json.dumps({
+            'source_page_id': str(self.page.id), 'target_page_id': str(target.id)
+        }), content_type='application/json')
+        self.assertEqual(self.snapshot(target), self.snapshot())
+
+        self.client.post(reverse('duplicate_page', args=[self.page.id]))
+        self.assertEqual(self.snapshot(MessagePage.objects.get(title='Snapshot Page (Copy)')), self.snapshot())
+
+    def test_public_view_makes_no_message_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('view_page', args=[self.page.id]))
+
+        self.assertEqual(json.loads(response.context['messages_json']), ['First', 'Second'])
+        self.assertFalse([q['sql'] for q in queries if 'FROM "love_messages_message"' in q['sql']])
+
+    def test_deleting_a_page_skips_snapshot_refresh(self):
+        with patch('love_messages.signals.refresh_message_snapshot') as refresh:
+            self.page.delete()
+
+        refresh.assert_not_called()
+        self.assertFalse(Message.objects.exists())
+
+    def test_rebuild_command_fixes_drift(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        MessagePage.objects.filter(pk=self.page.pk).update(message_count=7, messages_json='[]')
+        out = StringIO()
+
+        call_command('rebuild_message_snapshots', '--dry-run', stdout=out)
+        self.assertIn('would fix 1', out.getvalue())
+        self.assertEqual(self.snapshot()[0], 7)
+
+        call_command('rebuild_message_snapshots', stdout=out)
+        self.assertIn('fixed 1', out.getvalue())
+        self.assertEqual(self.snapshot(), (2, ['First', 'Second']))
+
+
+class TransferTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='exporter', password='exportpassword123')
+        self.importer = User.objects.create_user(username='importer', password='importpassword123')
+        for p in range(3):
+            page = MessagePage.objects.create(user=self.user, title=f'Page {p}', is_public=p != 1)
+            for i in range(4):
+                Message.objects.create(page=page, text=f'P{p} M{i}', order=i, font_size=20 + i)
+        self.client.login(username='exporter', password='exportpassword123')
+
+    def pages(self, user):
+        return sorted(
+            (page.title, page.is_public, page.message_count, json.loads(page.messages_json),
+             list(page.messages.values_list('text', 'order', 'font_size')))
+            for page in MessagePage.objects.filter(user=user)
+        )
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_pages'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_export_lines_stream_pages_then_messages(self):
+        from love_messages.transfer import export_lines
+
+        lines = [json.loads(line) for line in export_lines(MessagePage.objects.all(), chunk_size=2)]
+
+        self.assertEqual(lines[0], {'type': 'export', 'version': 1})
+        self.assertEqual([line['type'] for line in lines].count('page'), 3)
+        self.assertEqual([line['type'] for line in lines].count('message'), 12)
+        # A batch's messages always follow the page lines that define them
+        seen = set()
+        for line in lines[1:]:
+            if line['type'] == 'page':
+                seen.add(line['id'])
+            else:
+                self.assertIn(line['page'], seen)
+
+    def test_endpoint_round_trip(self):
+        body = self.export()
+        self.assertEqual(len(body.splitlines()), 16)
+
+        self.client.login(username='importer', password='importpassword123')
+        response = self.client.post(reverse('import_pages'), body, content_type='application/x-ndjson')
+
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual((data['pages'], data['messages']), (3, 12))
+        self.assertIn('rows_per_second', data)
+        self.assertEqual(self.pages(self.importer), self.pages(self.user))
+
+    def test_gzip_round_trip_in_small_batches(self):
+        import gzip
+        from love_messages.transfer import import_pages
+
+        body = self.export(gzip='1')
+        self.assertEqual(body[:2], b'\x1f\x8b')
+        self.assertEqual(gzip.decompress(body), self.export())
+
+        stats = import_pages(BytesIO(body), self.importer, batch_size=5)
+
+        self.assertEqual((stats['pages'], stats['messages']), (3, 12))
+        self.assertEqual(self.pages(self.importer), self.pages(self.user))
+
+    def test_commands_round_trip(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'pages.ndjson.gz')
+            err = StringIO()
+            call_command('export_pages', '--user', 'exporter', '--output', path, '--gzip', stderr=err)
+            self.assertIn('Exported 15 rows', err.getvalue())
+            self.assertIn('rows/s', err.getvalue())
+
+            out = StringIO()
+            call_command('import_pages', path, '--user', 'importer', stdout=out)
+
+        self.assertIn('Imported 3 pages with 12 messages', out.getvalue())
+        self.assertEqual(self.pages(self.importer), self.pages(self.user))
+
+    def test_invalid_line_is_rejected(self):
+        page_id = str(MessagePage.objects.first().id)
+        body = '\n'.join([
+            json.dumps({'type': 'page', 'id': page_id, 'title': 'Imported'}),
+            json.dumps({'type': 'message', 'page': 'unknown', 'text': 'Orphan'}),
+        ])
+        self.client.login(username='importer', password='importpassword123')
+
+        response = self.client.post(reverse('import_pages'), body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['line'], 2)
+        self.assertFalse(Message.objects.filter(text='Orphan').exists())
+
+    def test_disconnected_stream_releases_its_threads(self):
+        import asyncio
+        import threading
+        from love_messages.transfer import stream_in_thread
+
+        release = threading.Event()
+
+        def make_chunks():
+            yield b'first'
+            release.wait(5)  # a slow query: the consumer is left waiting for the next chunk
+            yield b'second'
+
+        async def disconnect():
+            stream = stream_in_thread(make_chunks)
+            self.assertEqual(await stream.__anext__(), b'first')
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.1)
+            pending.cancel()  # the client went away
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+            release.set()
+
+        # asyncio.run() waits for the default executor's threads before returning
+        runner = threading.Thread(target=asyncio.run, args=(disconnect(),), daemon=True)
+        runner.start()
+        runner.join(timeout=5)
+        self.assertFalse(runner.is_alive())
+        for thread in threading.enumerate():
+            if thread.name == 'export-stream':
+                thread.join(timeout=5)
+                self.assertFalse(thread.is_alive())
+
+    def test_failed_import_keeps_snapshots_of_committed_batches(self):
+        from love_messages.transfer import TransferError, import_pages
+
+        lines = [json.dumps({'type': 'page', 'id': 'p', 'title': 'Partial'})]
+        lines += [json.dumps({'type': 'message', 'page': 'p', 'text': f'M{i}', 'order': i}) for i in range(5)]
+        lines.append('{not json')
+
+        with self.assertRaises(TransferError) as raised:
+            import_pages(BytesIO('\n'.join(lines).encode()), self.importer, batch_size=3)
+
+        self.assertEqual(raised.exception.line_number, 7)
+        # The page's messages were split over two committed batches
+        page = MessagePage.objects.get(user=self.importer)
+        self.assertEqual(page.message_count, 5)
+        self.assertEqual(json.loads(page.messages_json), [f'M{i}' for i in range(5)])
+
+    def test_export_requires_login_and_is_scoped_to_user(self):
+        self.assertEqual(Client().get(reverse('export_pages')).status_code, 302)
+
+        self.client.login(username='importer', password='importpassword123')
+        self.assertEqual(len(self.export().splitlines()), 1)
+
+
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        from love_project.metrics import registry
+
+        registry.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username='metricsuser', password='metricspassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='Metrics Page')
+        Message.objects.create(page=self.page, text='Measured', order=0)
+
+    def server_timing(self, response):
+        return dict(
+            (entry.split(';')[0], entry) for entry in response['Server-Timing'].split(', ')
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0)
+    def test_sampled_request_gets_server_timing_and_log_line(self):
+        self.client.login(username='metricsuser', password='metricspassword123')
+
+        with self.assertLogs('love_project.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+
+        timing = self.server_timing(response)
+        self.assertTrue({'total', 'db', 'tpl'} <= set(timing))
+        self.assertRegex(timing['db'], r'desc="[1-9]\d* queries"')
+        self.assertNotIn('tpl;dur=0.0', timing['tpl'])
+        self.assertIn('GET dashboard 200', logs.output[0])
+        self.assertGreater(logs.records[0].db_queries, 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0)
+    def test_named_spans(self):
+        with patch('love_messages.views.heart_qr_cache.aget', AsyncMock(return_value=b'png')):
+            response = self.client.get(reverse('heart_qr_png', args=[self.page.id]))
+
+        self.assertIn('qr', self.server_timing(response))
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_is_only_counted(self):
+        from love_project.metrics import registry
+
+        response = self.client.get(reverse('view_page', args=[self.page.id]))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('http_request_duration_seconds_count{view="view_page",method="GET",status="200"} 1',
+                      registry.render())
+        self.assertNotIn('http_sampled_requests_total{', registry.render())
+
+    def test_dashboard_does_not_print(self):
+        self.client.login(username='metricsuser', password='metricspassword123')
+
+        with patch('builtins.print') as mocked_print:
+            self.client.get(reverse('dashboard'), {'page': 'bogus'})
+
+        mocked_print.assert_not_called()
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='scrape-me')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('view_page', args=[self.page.id]))
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="view_page",method="GET",status="200",le="+Inf"} 1',
+                      body)
+        self.assertIn('http_sampled_db_queries_total{view="view_page"}', body)
+        self.assertIn('db_new_connections_total', body)
+        self.assertIn('heart_qr_cache_events_total{event="hits"}', body)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_endpoint_hidden_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class TemplateRenderingTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='templateuser', password='templatepassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='Fragment Page')
+        Message.objects.create(page=self.page, text='Static message', order=0)
+        self.client.login(username='templateuser', password='templatepassword123')
+
+    def test_inline_assets_moved_to_static_files(self):
+        from django.contrib.staticfiles import finders
+
+        for path in ('style/base.css', 'style/view_page.css', 'style/edit_page.css',
+                     'js/view_page.js', 'js/edit_page.js'):
+            self.assertIsNotNone(finders.find(path), path)
+
+        view = Client().get(reverse('view_page', args=[self.page.id])).content.decode()
+        self.assertIn('/static/js/view_page.js', view)
+        self.assertIn('messages: ["Static message"]', view)
+        self.assertNotIn('function getInitialCameraSettings', view)
+        self.assertEqual(view.count('three.min.js'), 1)
+
+        edit = self.client.get(reverse('edit_page', args=[self.page.id])).content.decode()
+        self.assertIn('/static/js/edit_page.js', edit)
+        self.assertIn(f"reorderMessages: '/api/reorder-messages/{self.page.id}/'", edit)
+        self.assertNotIn('function handleDrop', edit)
+        self.assertEqual(edit.count('id="editModal"'), 1)
+
+    def test_fragments_follow_page_changes(self):
+        self.assertContains(self.client.get(reverse('preview_page', args=[self.page.id])), 'Fragment Page')
+
+        self.client.post(reverse('edit_page', args=[self.page.id]), json.dumps({'title': 'Renamed Page'}),
+                         content_type='application/json')
+
+        self.assertContains(self.client.get(reverse('preview_page', args=[self.page.id])), 'Renamed Page')
+
+    def test_editor_qr_fragment_outlives_message_edits(self):
+        from django.core.cache import caches
+        from django.core.cache.utils import make_template_fragment_key
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = reverse('edit_page', args=[self.page.id])
+        self.client.get(url)
+        # {% cache %} takes the fragment name literally, quotes included
+        key = make_template_fragment_key("'edit-qr'", [self.page.id])
+        fragment = caches['template_fragments'].get(key)
+        self.assertIsNotNone(fragment)
+
+        Message.objects.create(page=self.page, text='Second message', order=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        # Still the one cached entry, and the drag tip comes from the denormalized count
+        self.assertEqual(caches['template_fragments'].get(key), fragment)
+        self.assertContains(response, 'Drag and drop messages to reorder them')
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_dashboard_card_follows_message_count(self):
+        self.assertContains(self.client.get(reverse('dashboard')), 'Messages: 1')
+
+        Message.objects.create(page=self.page, text='Another', order=1)
+
+        self.assertContains(self.client.get(reverse('dashboard')), 'Messages: 2')
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        from . import page_cache
+
+        self.client = Client()
+        self.user = User.objects.create_user(username='etaguser', password='etagpassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='ETag Page')
+        self.message = Message.objects.create(page=self.page, text='Cacheable', order=0)
+        self.url = reverse('view_page', args=[self.page.id])
+        page_cache.invalidate_page(self.page.id)
+
+    def test_view_page_revalidates_without_rendering(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import page_cache
+
+        first = self.client.get(self.url)
+        etag = first['ETag']
+        self.assertTrue(first.has_header('Last-Modified'))
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        # From the page cache: nothing is read, only the view is counted
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+
+        # Cache miss: one page lookup, no Message query, no template
+        page_cache.invalidate_page(self.page.id)
+        with CaptureQueriesContext(connection) as queries:
+            fresh = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 304)
+        self.assertEqual(fresh.content, b'')
+        self.assertEqual(fresh.templates, [])
+        self.assertFalse([q for q in queries if '"love_messages_message"' in q['sql']])
+
+    def test_message_changes_bump_updated_at_and_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        updated_at = MessagePage.objects.get(pk=self.page.pk).updated_at
+
+        self.message.text = 'Edited'
+        self.message.save()
+
+        self.assertGreater(MessagePage.objects.get(pk=self.page.pk).updated_at, updated_at)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_reorder_changes_etag(self):
+        second = Message.objects.create(page=self.page, text='Second', order=1)
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='etaguser', password='etagpassword123')
+
+        self.client.post(reverse('reorder_messages', args=[self.page.id]),
+                         json.dumps({'message_ids': [second.id, self.message.id]}), content_type='application/json')
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_preview_page_is_private_and_revalidates(self):
+        self.client.login(username='etaguser', password='etagpassword123')
+        url = reverse('preview_page', args=[self.page.id])
+
+        first = self.client.get(url)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertNotEqual(first['ETag'], self.client.get(self.url)['ETag'])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_page_messages_endpoint(self):
+        url = reverse('page_messages', args=[self.page.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.json(), {
+            'page': str(self.page.id), 'count': 1, 'next': None,
+            'messages': [{'text': 'Cacheable', 'font_size': 32, 'order': 0}],
+        })
+
+        with self.assertNumQueries(1):
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        Message.objects.create(page=self.page, text='New', order=1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).json()['count'], 2)
+
+    def test_sync_views_send_the_same_validators(self):
+        from django.test import RequestFactory
+        from . import views
+
+        async_response = self.client.get(reverse('page_messages', args=[self.page.id]))
+        sync_response = views.page_messages(RequestFactory().get('/'), self.page.id)
+
+        self.assertEqual(sync_response['ETag'], async_response['ETag'])
+        self.assertEqual(sync_response.content, async_response.content)
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=self.client.get(self.url)['ETag'])
+        self.assertEqual(views.view_page(request, self.page.id).status_code, 304)
+
+
+class MessagesApiTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='apiuser', password='apipassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='API Page')
+        # Two messages share order 1, so the cursor has to break ties on id
+        Message.objects.bulk_create([
+            Message(page=self.page, text=f'Message {i}', order=order, font_size=20 + i)
+            for i, order in enumerate([0, 1, 1, 2, 3])
+        ])
+        self.url = reverse('page_messages', args=[self.page.id])
+
+    def test_keyset_pagination_walks_every_message_once(self):
+        texts, cursor = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'text'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).json()
+            texts += [message['text'] for message in data['messages']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(texts, [f'Message {i}' for i in range(5)])
+
+    def test_fields_projection(self):
+        data = self.client.get(self.url, {'fields': 'order,font_size', 'limit': 1}).json()
+        self.assertEqual(data['messages'], [{'order': 0, 'font_size': 20}])
+        self.assertIsNotNone(data['next'])
+
+    def test_rows_are_not_instantiated_as_models(self):
+        from django.db.models.signals import post_init
+
+        instances = []
+        receiver = lambda sender, **kwargs: instances.append(sender)
+        post_init.connect(receiver, sender=Message)
+        try:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        finally:
+            post_init.disconnect(receiver, sender=Message)
+        self.assertEqual(instances, [])
+
+    def test_bad_parameters(self):
+        for params in ({'fields': 'text,secret'}, {'limit': 0}, {'limit': 'ten'}, {'cursor': 'nope'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()['success'])
+
+    def test_compression_negotiates_brotli_then_gzip(self):
+        import brotli
+        import gzip
+
+        Message.objects.bulk_create([Message(page=self.page, text='Love ' * 20, order=10 + i) for i in range(20)])
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        br = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(br['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(br.content), plain.content)
+        self.assertEqual(br['ETag'], 'W/' + plain['ETag'])
+
+        gz = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(gz['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gz.content), plain.content)
+
+        # The weak ETag of an encoded response still revalidates
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=br['ETag']).status_code, 304)
+
+    def test_sync_view_matches_async_view(self):
+        from django.test import RequestFactory
+        from . import views
+
+        params = {'limit': 3, 'fields': 'text,order'}
+        sync_response = views.page_messages(RequestFactory().get(self.url, params), self.page.id)
+        self.assertEqual(sync_response.content, self.client.get(self.url, params).content)
+
+
+class CompressionMiddlewareTestCase(TestCase):
+    def setUp(self):
+        from love_project.compression import stats
+
+        stats.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username='gzipuser', password='gzippassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='Compressed Page')
+        Message.objects.bulk_create([Message(page=self.page, text=f'Love note {i}', order=i) for i in range(50)])
+        self.url = reverse('view_page', args=[self.page.id])
+
+    def test_view_page_is_brotli_encoded(self):
+        import brotli
+
+        plain = self.client.get(self.url)
+        encoded = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(encoded['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(encoded.content), plain.content)
+        self.assertLess(len(encoded.content), len(plain.content) / 2)
+        self.assertEqual(int(encoded['Content-Length']), len(encoded.content))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertTrue(encoded['ETag'].startswith('W/'))
+
+    def test_negotiation(self):
+        from love_project.compression import negotiate
+
+        self.assertEqual(negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(negotiate('br;q=0, gzip;q=0.5'), 'gzip')
+        self.assertEqual(negotiate('*'), 'br')
+        self.assertEqual(negotiate('*, br;q=0'), 'gzip')
+        self.assertIsNone(negotiate('identity'))
+        self.assertIsNone(negotiate(''))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 9)
+    def test_small_responses_are_not_encoded(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_CONTENT_TYPES=('application/json',))
+    def test_content_type_allowlist(self):
+        html = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(html.has_header('Content-Encoding'))
+        api = self.client.get(reverse('page_messages', args=[self.page.id]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(api['Content-Encoding'], 'gzip')
+
+    @override_settings(COMPRESSION_BROTLI_QUALITY=11, COMPRESSION_GZIP_LEVEL=0)
+    def test_levels_are_capped(self):
+        from love_project.compression import MAX_BROTLI_QUALITY, levels
+
+        self.assertEqual(levels(), (MAX_BROTLI_QUALITY, 1))
+
+    def test_streaming_export_is_encoded_chunk_by_chunk(self):
+        import gzip
+
+        self.client.login(username='gzipuser', password='gzippassword123')
+        plain = b''.join(self.client.get(reverse('export_pages')).streaming_content)
+        response = self.client.get(reverse('export_pages'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    async def test_async_streaming_content_is_encoded(self):
+        import brotli
+        from django.http import StreamingHttpResponse
+        from django.test import RequestFactory
+        from love_project.compression import compress_response
+
+        async def chunks():
+            for i in range(3):
+                yield f'{{"line": {i}}}\n'.encode()
+
+        response = compress_response(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br'),
+            StreamingHttpResponse(chunks(), content_type='application/x-ndjson')
+        )
+        self.assertEqual(response['Content-Encoding'], 'br')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(brotli.decompress(body), b'{"line": 0}\n{"line": 1}\n{"line": 2}\n')
+
+    @override_settings(COMPRESSION_STREAMING=False)
+    def test_streaming_can_be_disabled(self):
+        self.client.login(username='gzipuser', password='gzippassword123')
+        response = self.client.get(reverse('export_pages'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_already_encoded_export_is_left_alone(self):
+        self.client.login(username='gzipuser', password='gzippassword123')
+        response = self.client.get(reverse('export_pages') + '?gzip=1', HTTP_ACCEPT_ENCODING='br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_bytes_saved_and_cpu_are_exported(self):
+        from love_project.compression import stats
+
+        self.client.get(self.url, HTTP_ACCEPT_ENCODING='br')
+        responses, bytes_in, bytes_out, cpu = stats.totals()['br']
+        self.assertEqual(responses, 1)
+        self.assertGreater(bytes_in, bytes_out)
+        self.assertGreaterEqual(cpu, 0)
+
+        with override_settings(DEBUG=True, METRICS_TOKEN=''):
+            body = self.client.get('/metrics').content.decode()
+        self.assertIn(f'http_compression_bytes_saved_total{{encoding="br"}} {bytes_in - bytes_out}', body)
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='jobuser', password='jobpassword123')
+        self.client.login(username='jobuser', password='jobpassword123')
+        self.page = MessagePage.objects.create(user=self.user, title='Job Page')
+        Message.objects.bulk_create([Message(page=self.page, text=f'Job message {i}', order=i) for i in range(3)])
+        self.target = MessagePage.objects.create(user=self.user, title='Target Page')
+
+    def test_duplicate_page_in_the_background(self):
+        from . import jobs
+
+        response = self.client.get(reverse('duplicate_page', args=[self.page.id]) + '?async=1')
+        self.assertEqual(response.status_code, 202)
+        job = response.json()['job']
+        self.assertEqual(job['status'], 'queued')
+        self.assertEqual(response['Location'], job['url'])
+        self.assertEqual(MessagePage.objects.filter(user=self.user).count(), 2)
+
+        jobs.run_next('test-worker')
+
+        job = self.client.get(job['url']).json()['job']
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['messages'], 3)
+        clone = MessagePage.objects.get(id=job['result']['page_id'])
+        self.assertEqual(clone.title, 'Job Page (Copy)')
+        self.assertEqual(clone.messages.count(), 3)
+
+    def test_copy_messages_in_the_background(self):
+        from . import jobs
+
+        response = self.client.post(reverse('copy_messages'), json.dumps({
+            'source_page_id': str(self.page.id), 'target_page_id': str(self.target.id), 'async': True,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.target.messages.count(), 0)
+
+        job = jobs.run_next('test-worker')
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['copied'], 3)
+        self.assertEqual(self.target.messages.count(), 3)
+
+    def test_prefer_respond_async_header(self):
+        response = self.client.get(reverse('duplicate_page', args=[self.page.id]), HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+
+    def test_idempotency_key_returns_the_same_job(self):
+        url = reverse('duplicate_page', args=[self.page.id]) + '?async=1'
+        first = self.client.get(url, HTTP_IDEMPOTENCY_KEY='dup-1').json()
+        second = self.client.get(url, HTTP_IDEMPOTENCY_KEY='dup-1').json()
+
+        self.assertTrue(first['created'])
+        self.assertFalse(second['created'])
+        self.assertEqual(first['job']['id'], second['job']['id'])
+        self.assertEqual(Job.objects.count(), 1)
+
+        # Keys are per user
+        other = User.objects.create_user(username='otherjobuser', password='jobpassword123')
+        from . import jobs
+        _, created = jobs.enqueue('duplicate_page', {'page_id': str(self.page.id)}, user=other, idempotency_key='dup-1')
+        self.assertTrue(created)
+
+        self.assertEqual(self.client.get(url, HTTP_IDEMPOTENCY_KEY='k' * 101).status_code, 400)
+
+    def test_a_job_is_claimed_once(self):
+        from . import jobs
+
+        jobs.enqueue('duplicate_page', {'page_id': str(self.page.id)}, user=self.user)
+        job = jobs.claim('worker-a')
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(jobs.claim('worker-b'))
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        from . import jobs
+
+        def flaky(job):
+            raise RuntimeError('boom')
+
+        with patch.dict(jobs.HANDLERS, {'flaky': flaky}), self.assertLogs('love_messages.jobs', 'ERROR'):
+            job, _ = jobs.enqueue('flaky', user=self.user, max_attempts=2)
+            job = jobs.run_next('test-worker')
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertGreater(Job.objects.get(pk=job.pk).run_after, timezone.now())
+            # Not due yet
+            self.assertIsNone(jobs.run_next('test-worker'))
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = jobs.run_next('test-worker')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error, 'RuntimeError: boom')
+
+    def test_missing_page_fails_without_retry(self):
+        from . import jobs
+
+        job, _ = jobs.enqueue('duplicate_page', {'page_id': str(self.page.id)}, user=self.user)
+        self.page.delete()
+        with self.assertLogs('love_messages.jobs', 'ERROR'):
+            job = jobs.run_next('test-worker')
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_stale_running_jobs_are_requeued(self):
+        from . import jobs
+
+        job, _ = jobs.enqueue('duplicate_page', {'page_id': str(self.page.id)}, user=self.user)
+        jobs.claim('dead-worker')
+        self.assertEqual(jobs.requeue_stale(timeout=3600), 0)
+        with self.assertLogs('love_messages.jobs', 'WARNING'):
+            self.assertEqual(jobs.requeue_stale(timeout=-1), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    def test_slow_job_with_a_fresh_heartbeat_is_not_requeued(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import jobs
+
+        job, _ = jobs.enqueue('duplicate_page', {'page_id': str(self.page.id)}, user=self.user)
+        jobs.claim('slow-worker')
+        # Running for an hour, but its worker is still beating
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.heartbeat({'slow-worker'}), 1)
+
+        self.assertEqual(jobs.requeue_stale(timeout=60), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=2))
+        with self.assertLogs('love_messages.jobs', 'WARNING'):
+            self.assertEqual(jobs.requeue_stale(timeout=60), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    def test_jobs_are_private(self):
+        from . import jobs
+
+        other = User.objects.create_user(username='snoop', password='jobpassword123')
+        job, _ = jobs.enqueue('duplicate_all_pages', user=other)
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('job_list')).json()['jobs'], [])
+
+    def test_duplicate_all_in_the_background(self):
+        response = self.client.post(reverse('duplicate_all_pages'), {'async': '1'})
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertEqual(Job.objects.get().kind, 'duplicate_all_pages')
+        self.assertEqual(MessagePage.objects.filter(user=self.user).count(), 2)
+
+
+class RunWorkerCommandTestCase(TestCase):
+    # Runs in a child process against a SQLite file: the shared in-memory test
+    # database locks whole tables between the worker threads' connections
+    SCRIPT = """
+import json, django
+from io import StringIO
+django.setup()
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from love_messages import jobs
+from love_messages.models import Job, MessagePage
+
+@jobs.handler('flaky')
+def flaky(job):
+    if job.attempts == 1:
+        raise RuntimeError('first attempt fails')
+    return {'attempts': job.attempts}
+
+call_command('migrate', verbosity=0)
+user = User.objects.create_user(username='workeruser', password='workerpassword123')
+page = MessagePage.objects.create(user=user, title='Worker Page')
+for _ in range(4):
+    jobs.enqueue('duplicate_page', {'page_id': str(page.id)}, user=user)
+jobs.enqueue('flaky', user=user)
+out = StringIO()
+call_command('run_worker', burst=True, concurrency=2, poll_interval=0.01, stdout=out)
+print(json.dumps({
+    'output': out.getvalue(),
+    'statuses': sorted(Job.objects.values_list('status', flat=True)),
+    'pages': MessagePage.objects.filter(user=user).count(),
+}))
+"""
+
+    def test_burst_worker_drains_the_queue_and_waits_for_retries(self):
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        from django.conf import settings
+
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {key: value for key, value in os.environ.items() if key != 'TESTING'}
+            env.update(DJANGO_SETTINGS_MODULE='love_project.settings', USE_SQLITE='True', DB_WARMUP='False',
+                       SQLITE_PATH=os.path.join(tmp, 'jobs.sqlite3'), PAGE_CACHE_LOCATION=os.path.join(tmp, 'pages'),
+                       JOB_RETRY_BACKOFF='0.2')
+            result = subprocess.run([sys.executable, '-c', self.SCRIPT], cwd=settings.BASE_DIR, env=env,
+                                    capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        summary = json.loads(result.stdout.strip().splitlines()[-1])
+
+        # The flaky job failed once, backed off, and was still run before the worker exited
+        self.assertIn('Ran 6 jobs', summary['output'])
+        self.assertEqual(summary['statuses'], [Job.SUCCEEDED] * 5)
+        self.assertEqual(summary['pages'], 5)
+
+
+class StartupImportsTestCase(TestCase):
+    def test_worker_startup_does_not_import_the_qr_stack(self):
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        script = (
+            'import sys, django; django.setup(); import love_project.asgi, love_project.urls; '
+            'print(",".join(m for m in ("qrcode", "PIL", "numpy", "love_messages.qr_render") if m in sys.modules))'
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='love_project.settings', USE_SQLITE='True', DB_WARMUP='False')
+        result = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_light_parameters_match_the_renderer(self):
+        import qrcode
+        from .qr import HEART_QR_ERROR_CORRECTION
+
+        self.assertEqual(HEART_QR_ERROR_CORRECTION, qrcode.constants.ERROR_CORRECT_H)
+
+    def test_parse_importtime(self):
+        from .management.commands.profile_imports import parse_importtime
+
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     _io\n'
+            'import time:       300 |        420 |   io\n'
+            'import time:      1000 |       1420 | love_messages.views\n'
+        )
+        self.assertEqual(parse_importtime(output), [
+            ('_io', 120, 120, 2), ('io', 300, 420, 1), ('love_messages.views', 1000, 1420, 0),
+        ])
+
+
+class SyncViewsMixin:
+    """Runs a test case against the sync views in views.py, as routed with ASYNC_VIEWS=False"""
+
+    @classmethod
+    def setUpClass(cls):
+        from django.conf import settings
+
+        cls.route_views(async_views=False)
+        cls.addClassCleanup(cls.route_views, async_views=settings.ASYNC_VIEWS)
+        super().setUpClass()
+
+    @staticmethod
+    def route_views(async_views):
+        import importlib
+        from django.urls import clear_url_caches
+        import love_messages.urls
+        import love_project.urls
+
+        # urls.py picks the views at import time; the project URLconf holds its resolver
+        with override_settings(ASYNC_VIEWS=async_views):
+            importlib.reload(love_messages.urls)
+            importlib.reload(love_project.urls)
+        clear_url_caches()
+
+
+class SyncViewsTestCase(SyncViewsMixin, ViewsTestCase):
+    def test_routes_the_sync_views(self):
+        from django.urls import resolve
+        from . import views
+
+        for name, view in (('view_page', views.view_page), ('page_messages', views.page_messages),
+                           ('add_message', views.add_message)):
+            self.assertIs(resolve(reverse(name, args=[self.message_page.id])).func, view)
+
+
+class SyncIntegrationTestCase(SyncViewsMixin, IntegrationTestCase):
+    pass
+
+
+class SyncErrorHandlingTestCase(SyncViewsMixin, ErrorHandlingTestCase):
+    pass
+
+
+class SyncPageCacheTestCase(SyncViewsMixin, PageCacheTestCase):
+    # The sync view_page uses the sync cache API, so this one only applies to the async view
+    test_async_view_uses_async_cache_api = None
+
+
+class SyncMessageSnapshotTestCase(SyncViewsMixin, MessageSnapshotTestCase):
+    pass
+
+
+class SyncConditionalGetTestCase(SyncViewsMixin, ConditionalGetTestCase):
+    pass
+
+
+class SyncMessagesApiTestCase(SyncViewsMixin, MessagesApiTestCase):
+    pass
@@ -0,0 +1,276 @@
+"""Streaming NDJSON export and import of pages with their messages.
+
+An export is one JSON object per line: a header, then for each batch of
+pages their page lines followed by their message lines. Nothing is held in
+memory beyond one batch of pages and one chunk of messages, so an account of
+any size streams in flat memory; gzip_chunks compresses on the fly. Imports
+parse line by line and write with chunked bulk_create, committing each chunk
+in its own transaction.
+"""
+import gzip
+import io
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+import zlib
+
+from django.db import connections, transaction
+
+from .models import Message, MessagePage
+from .services import SNAPSHOT_BATCH, _is_int, message_snapshots
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+PAGE_FIELDS = ('title', 'text_color', 'background_color', 'animation_speed', 'is_public')
+MESSAGE_FIELDS = ('text', 'order', 'font_size')
+# Longest line an import accepts, so a corrupt or hostile file cannot exhaust memory
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class TransferError(ValueError):
+    """An import line is malformed; carries its 1-based line number"""
+
+    def __init__(self, line_number, message):
+        super().__init__(f"Line {line_number}: {message}")
+        self.line_number = line_number
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def export_lines(pages, chunk_size=2000):
+    """NDJSON lines (str) for pages, a MessagePage queryset, and all of their messages"""
+    yield _dumps({'type': 'export', 'version': FORMAT_VERSION})
+    pages = pages.order_by('pk').only('pk', *PAGE_FIELDS)
+    last_pk = None
+    while True:
+        # Keyset batches of pages, so only the message cursor is ever open
+        batch = list((pages.filter(pk__gt=last_pk) if last_pk else pages)[:chunk_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for page in batch:
+            line = {'type': 'page', 'id': str(page.pk)}
+            line.update((field, getattr(page, field)) for field in PAGE_FIELDS)
+            yield _dumps(line)
+        messages = (
+            Message.objects.filter(page_id__in=[page.pk for page in batch])
+            .order_by('page_id', 'order', 'id')
+            .values_list('page_id', *MESSAGE_FIELDS)
+        )
+        for page_id, text, order, font_size in messages.iterator(chunk_size=chunk_size):
+            yield _dumps({'type': 'message', 'page': str(page_id), 'text': text, 'order': order,
+                          'font_size': font_size})
+
+
+def encode_chunks(lines, chunk_bytes=64 * 1024):
+    """Join str lines into UTF-8 chunks of about chunk_bytes"""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, level=6):
+    """gzip-compress a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def stream_in_thread(make_chunks, max_buffered=8):
+    """Async iterator over a sync chunk generator run start to finish in one worker thread.
+
+    Django 4.2 would buffer a sync iterator whole before sending it over ASGI.
+    Running the generator in a single thread also keeps its database cursor on
+    the connection that opened it. At most max_buffered chunks wait in memory.
+    """
+    import asyncio
+
+    chunks = queue.Queue(maxsize=max_buffered)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Gives up once the consumer is gone, so a full queue cannot block the thread forever
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in make_chunks():
+                if not put(chunk):
+                    return
+            put(done)
+        except Exception as exc:
+            logger.exception("Streaming export failed")
+            put(exc)
+        finally:
+            connections.close_all()
+
+    def get():
+        # Runs in the default executor: a consumer cancelled while waiting here sets
+        # stop, and this returns instead of holding an executor thread forever
+        while True:
+            try:
+                return chunks.get(timeout=0.5)
+            except queue.Empty:
+                if stop.is_set():
+                    return done
+
+    thread = threading.Thread(target=produce, name='export-stream', daemon=True)
+    thread.start()
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, get)
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Client went away (or we finished): let the producer stop
+        stop.set()
+
+
+class _RawReader(io.RawIOBase):
+    """Raw binary adapter over anything with read(n), e.g. an HttpRequest"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_ndjson(stream):
+    """Binary line reader over stream, transparently gunzipping gzip input"""
+    reader = stream if hasattr(stream, 'peek') else io.BufferedReader(_RawReader(stream))
+    if reader.peek(2)[:2] == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=reader)
+    return reader
+
+
+def _read_lines(reader):
+    line_number = 0
+    while True:
+        raw = reader.readline(MAX_LINE_BYTES + 1)
+        if not raw:
+            return
+        line_number += 1
+        if len(raw) > MAX_LINE_BYTES:
+            raise TransferError(line_number, f"longer than {MAX_LINE_BYTES} bytes")
+        if raw.strip():
+            try:
+                yield line_number, json.loads(raw)
+            except ValueError:
+                raise TransferError(line_number, "not valid JSON")
+
+
+def _page_fields(line_number, item):
+    fields = {field: item[field] for field in PAGE_FIELDS if field in item}
+    for name, kind, limit in (('title', str, 200), ('text_color', str, 7), ('background_color', str, 7)):
+        if name in fields and (not isinstance(fields[name], kind) or len(fields[name]) > limit):
+            raise TransferError(line_number, f"{name} must be a string of at most {limit} characters")
+    if 'animation_speed' in fields and not isinstance(fields['animation_speed'], (int, float)):
+        raise TransferError(line_number, "animation_speed must be a number")
+    if 'is_public' in fields and not isinstance(fields['is_public'], bool):
+        raise TransferError(line_number, "is_public must be a boolean")
+    return fields
+
+
+def _message_fields(line_number, item):
+    text = item.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise TransferError(line_number, "text is required")
+    fields = {'text': text, 'order': item.get('order', 0)}
+    if 'font_size' in item:
+        fields['font_size'] = item['font_size']
+    for name in ('order', 'font_size'):
+        if name in fields and not _is_int(fields[name]):
+            raise TransferError(line_number, f"{name} must be an integer")
+    return fields
+
+
+def import_pages(stream, user, batch_size=1000):
+    """Create pages and messages for user from an NDJSON (or gzipped NDJSON) stream.
+
+    Imported pages get new ids. Every batch_size rows are written with
+    bulk_create in their own transaction, so memory and lock time stay
+    bounded; an invalid line stops the import with TransferError after the
+    batches before it were committed. Returns stats with rows/s.
+    """
+    started = time.perf_counter()
+    new_ids = {}  # exported page id -> imported page id
+    pages, messages = [], []
+    stats = {'pages': 0, 'messages': 0}
+
+    def flush():
+        # A page's messages can span batches: refresh it in each batch that touched it
+        touched = list({page.pk for page in pages} | {message.page_id for message in messages})
+        with transaction.atomic():
+            MessagePage.objects.bulk_create(pages, batch_size=batch_size)
+            Message.objects.bulk_create(messages, batch_size=batch_size)
+            # bulk_create sends no signals: fill in the message snapshots with the rows, so a
+            # later invalid line leaves the committed pages consistent
+            for start in range(0, len(touched), SNAPSHOT_BATCH):
+                for page_id, snapshot in message_snapshots(touched[start:start + SNAPSHOT_BATCH]).items():
+                    MessagePage.objects.filter(pk=page_id).update(**snapshot)
+        stats['pages'] += len(pages)
+        stats['messages'] += len(messages)
+        pages.clear()
+        messages.clear()
+
+    for line_number, item in _read_lines(open_ndjson(stream)):
+        if not isinstance(item, dict):
+            raise TransferError(line_number, "expected an object")
+        kind = item.get('type')
+        if kind == 'export':
+            if item.get('version') != FORMAT_VERSION:
+                raise TransferError(line_number, f"unsupported export version {item.get('version')!r}")
+        elif kind == 'page':
+            if 'id' not in item or item['id'] in new_ids:
+                raise TransferError(line_number, "page id is missing or repeated")
+            new_ids[item['id']] = uuid.uuid4()
+            pages.append(MessagePage(id=new_ids[item['id']], user=user, **_page_fields(line_number, item)))
+        elif kind == 'message':
+            page_id = new_ids.get(item.get('page'))
+            if page_id is None:
+                raise TransferError(line_number, "message for a page not defined above it")
+            messages.append(Message(page_id=page_id, **_message_fields(line_number, item)))
+        else:
+            raise TransferError(line_number, f"unknown line type {kind!r}")
+        if len(pages) + len(messages) >= batch_size:
+            flush()
+    flush()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = round((stats['pages'] + stats['messages']) / stats['seconds'], 1) if stats['seconds'] else 0.0
+    logger.info("Imported %(pages)s pages with %(messages)s messages in %(seconds).3fs (%(rows_per_second)s rows/s)",
+                stats)
+    return stats
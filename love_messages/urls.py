@@ -1,7 +1,11 @@
 # ENHANCED URLS (urls.py - Enhanced)
+from django.conf import settings
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# ASGI deployments serve the read path and single-message APIs natively async
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
@@ -10,20 +14,30 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
     path('create/', views.create_page, name='create_page'),
     path('edit/<uuid:page_id>/', views.edit_page, name='edit_page'),
-    path('view/<uuid:page_id>/', views.view_page, name='view_page'),
-    path('analytics/<uuid:page_id>/', views.page_analytics, name='page_analytics'),
+    path('view/<uuid:page_id>/', read_views.view_page, name='view_page'),
+    path('analytics/<uuid:page_id>/', read_views.page_analytics, name='page_analytics'),
+    path('qr/<uuid:page_id>.png', views.heart_qr_image, {'fmt': 'png'}, name='heart_qr_png'),
+    path('qr/<uuid:page_id>.webp', views.heart_qr_image, {'fmt': 'webp'}, name='heart_qr_webp'),
+    path('qr/<uuid:page_id>.svg', views.heart_qr_image, {'fmt': 'svg'}, name='heart_qr_svg'),
     
     # duplicate a page window.location.href = `{% url 'duplicate_page' page.id %}`;
     path('duplicate/<uuid:page_id>/', views.duplicate_page, name='duplicate_page'),
+    path('duplicate-all/', views.duplicate_all_pages, name='duplicate_all_pages'),
     path('delete/<uuid:page_id>/', views.delete_page, name='delete_page'),
     
     # API endpoints
-    path('api/add-message/<uuid:page_id>/', views.add_message, name='add_message'),
-    path('api/delete-message/<int:message_id>/', views.delete_message, name='delete_message'),
+    path('api/add-message/<uuid:page_id>/', read_views.add_message, name='add_message'),
+    path('api/add-messages/<uuid:page_id>/', views.add_messages, name='add_messages'),
+    path('api/delete-message/<int:message_id>/', read_views.delete_message, name='delete_message'),
     path('api/copy-messages/', views.copy_messages, name='copy_messages'),
-    path('api/update-message/<int:message_id>/', views.update_message, name='update_message'),
+    path('api/update-message/<int:message_id>/', read_views.update_message, name='update_message'),
     path('api/reorder-messages/<uuid:page_id>/', views.reorder_messages, name='reorder_messages'),
-    path('api/update-message/<int:message_id>/', views.update_message, name='update_message'),
+    path('api/update-message/<int:message_id>/', read_views.update_message, name='update_message'),
+    path('api/pages/<uuid:page_id>/messages/', read_views.page_messages, name='page_messages'),
+    path('api/jobs/', views.job_list, name='job_list'),
+    path('api/jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('api/export/', views.export_pages, name='export_pages'),
+    path('api/import/', views.import_pages, name='import_pages'),
     
-    path('preview/<uuid:page_id>/', views.preview_page, name='preview_page'),
+    path('preview/<uuid:page_id>/', read_views.preview_page, name='preview_page'),
 ]
\ No newline at end of file
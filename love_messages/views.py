@@ -2,21 +2,35 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, login as auth_login
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.http import JsonResponse, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 from django.contrib import messages as dj_messages
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
 from django.utils import timezone
 from django.urls import reverse
 import json
-import qrcode
-import io
-import base64
-from PIL import Image, ImageDraw
 import logging
-import math
 
-from .models import MessagePage, Message, MessageTemplate
+from love_project.db.routers import replica_reads
+from love_project.metrics import span
+
+from . import jobs, page_cache, transfer
+from .conditional import not_modified, page_validators, set_validators
+from .models import Job, MessagePage, Message, MessageTemplate
+from .qr import HEART_QR_FORMATS, png_data_uri
+from .qr_cache import heart_qr_cache, heart_qr_digest
+from .qr_service import QRRenderTimeout
+from .services import MessageValidationError, bulk_add_messages, clone_pages, copy_page_messages, message_snapshot
+from .view_counter import view_counter
+
+# Set up logging
+logger = logging.getLogger(__name__)
 
 def register(request):
     if request.method == 'POST':
@@ -46,13 +60,28 @@ def login(request):
         form = AuthenticationForm()
     return render(request, 'registration/login.html', {'form': form})
 
+def dashboard_pages(user):
+    """A user's pages for the dashboard cards, newest first.
+
+    One query with only the rendered columns, all of them (message_count
+    included) covered by page_user_updated_idx. updated_at keys the cached
+    card fragments.
+    """
+    return (
+        MessagePage.objects.filter(user=user)
+        .only('id', 'title', 'created_at', 'message_count', 'updated_at')
+        .order_by('-updated_at')
+    )
+
+
+@replica_reads
 @login_required
 def dashboard(request):
     try:
-        pages = MessagePage.objects.filter(user=request.user).order_by('-updated_at')
-        print(f"User {request.user.username} has {pages.count()} pages.")
+        pages = dashboard_pages(request.user)
 
         paginator = Paginator(pages, 9)  # Show 9 pages per page
+        logger.debug("User %s has %s pages", request.user.username, paginator.count)
 
         page_number = request.GET.get('page')
         if page_number is not None:
@@ -61,20 +90,20 @@ def dashboard(request):
                 if page_number < 1 or page_number > paginator.num_pages:
                     raise ValueError("Page number out of range")
             except (ValueError, TypeError) as e:
-                print(f"Invalid page number '{page_number}': {e}. Defaulting to page 1.")
+                logger.info("Invalid page number %r: %s. Defaulting to page 1.", page_number, e)
                 page_number = 1
         else:
             page_number = 1
 
         page_obj = paginator.get_page(page_number)
-        print(f"Displaying page {page_number} with {len(page_obj.object_list)} pages.")
+        logger.debug("Displaying page %s with %s pages", page_number, len(page_obj.object_list))
 
-        context = {'pages': MessagePage.objects.filter(user=request.user)}
+        context = {'pages': page_obj, 'page_obj': page_obj}
         
         return render(request, 'dashboard.html', context)
 
     except Exception as e:
-        print(f"Unexpected error in dashboard view: {e}")
+        logger.exception("Unexpected error in dashboard view")
         return render(request, 'dashboard.html', {'page_obj': None, 'error': 'An error occurred while loading your dashboard.'})
 
 
@@ -88,143 +117,35 @@ def create_page(request):
         background_color = request.POST.get('background_color', '#000000')
         template_id = request.POST.get('template')
         
-        page = MessagePage.objects.create(
-            user=request.user,
-            title=title,
-            text_color=text_color,
-            background_color=background_color
-        )
-        
-        # Add template messages if selected
-        if template_id:
-            try:
-                template = MessageTemplate.objects.get(id=template_id)
-                for i, msg_text in enumerate(template.messages):
-                    Message.objects.create(
-                        page=page,
-                        text=msg_text,
-                        order=i
-                    )
-            except MessageTemplate.DoesNotExist:
-                pass
+        with transaction.atomic():
+            page = MessagePage.objects.create(
+                user=request.user,
+                title=title,
+                text_color=text_color,
+                background_color=background_color
+            )
+            
+            # Add template messages if selected
+            if template_id:
+                try:
+                    template = MessageTemplate.objects.get(id=template_id)
+                    bulk_add_messages(page, [
+                        {'text': msg_text, 'order': i} for i, msg_text in enumerate(template.messages)
+                    ])
+                except MessageTemplate.DoesNotExist:
+                    pass
+                except MessageValidationError as e:
+                    logger.warning("Template %s has invalid messages: %s", template_id, e.errors or e)
         
         return redirect('edit_page', page_id=page.id)
     
     return render(request, 'create_page.html', {'templates': templates})
 
-def remove_whiteBG(image):
-    """Remove white background from an image and make it transparent"""
-    datas = image.getdata()
-    newData = []
-    for item in datas:
-        # Change all white (also shades of whites)
-        # pixels to transparent
-        if item[0] > 240 and item[1] > 240 and item[2] > 240:
-            newData.append((255, 255, 255, 0))
-        else:
-            newData.append(item)
-    image.putdata(newData)
-    return image
-    
-
 def generate_heart_qr_code(url):
     """Generate a heart-shaped QR code with rotated QR and semi-circles, transparent QR background"""
-
-    # Create QR code with high error correction
-    qr = qrcode.QRCode(
-        version=6,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=8,
-        border=1
-    )
-    qr.add_data(url)
-    qr.make(fit=True)
-
-    # Create base QR code image with red fill and white background
-    qr_img = qr.make_image(fill_color="red", back_color="white").convert("RGBA")
-    qr_img = remove_whiteBG(qr_img)  # Remove white background
-    qr_size = qr_img.size[0]
-
-    # Create semi-circular QR code masks
-    mask_left = Image.new("L", (qr_size, qr_size), 0)
-    draw_left = ImageDraw.Draw(mask_left)
-    draw_left.pieslice([0, 0, qr_size, qr_size], 90, 270, fill=255)  # Left semi-circle
-
-    mask_right = Image.new("L", (qr_size, qr_size), 0)
-    draw_right = ImageDraw.Draw(mask_right)
-    draw_right.pieslice([0, 0, qr_size, qr_size], 270, 90, fill=255)  # Right semi-circle
-
-    # Apply masks to QR code to get left and right semi-circular QR lobes
-    qr_left = qr_img.copy()
-    qr_left.putalpha(mask_left)
-    qr_left = remove_whiteBG(qr_left)  # Ensure transparency
-
-    qr_right = qr_img.copy()
-    qr_right.putalpha(mask_right)
-    qr_right = remove_whiteBG(qr_right)  # Ensure transparency
-
-    # Rotate the QR lobes
-    qr_left = qr_left.rotate(-45, expand=False, fillcolor=(255, 255, 255, 0))
-    qr_right = qr_right.rotate(45, expand=False, fillcolor=(255, 255, 255, 0))
-
-    # Rotate QR code 45 degrees for the bottom
-    rotated_qr = qr_img.rotate(45, expand=True, fillcolor=(255, 255, 255, 0))
-    rotated_size = rotated_qr.size[0]
-
-    # Create heart shape components
-    heart_width = rotated_size + qr_size  # Space for QR + semi-circles
-    heart_height = rotated_size + qr_size // 2  # Height for the heart
-
-    # Create the final heart image
-    heart_img = Image.new('RGBA', (heart_width, heart_height), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(heart_img)
-
-    # Position the rotated QR code in the center-bottom of the heart
-    qr_x = (heart_width - rotated_size) // 2
-    qr_y = heart_height - rotated_size - 10
-
-    # Paste the rotated QR code (now with transparent background)
-    heart_img.paste(rotated_qr, (qr_x, qr_y), rotated_qr)
-
-    # Calculate positions for the semi-circular QR codes
-    radius = qr_size // 2
-    center_x = heart_width // 2
-    vertical_offset = (radius // 2) + 40
-    # horizontal_offset = floor((radius // 2) // PI) 
-    TWO_PI = 2 * math.pi  # Define a constant for 2 * pi
-    horizontal_offset = int(radius // TWO_PI)  # Derived horizontal offset using TWO_PI
-    print(f"Heart dimensions: {heart_width}x{heart_height}, QR size: {qr_size}, radius: {radius}")
-    
-    # Left semi-circular QR position
-    left_center_x = center_x - radius // 2 - horizontal_offset #32
-    left_center_y = qr_y + vertical_offset
-    left_qr_x = left_center_x - radius
-    left_qr_y = left_center_y - radius
-    
-    # Right semi-circular QR position
-    right_center_x = center_x + radius // 2 + horizontal_offset
-    right_center_y = qr_y + vertical_offset
-    right_qr_x = right_center_x - radius
-    right_qr_y = right_center_y - radius
-
-    # Paste the semi-circular QR codes at the calculated positions
-    heart_img.paste(qr_left, (left_qr_x, left_qr_y), qr_left)
-    heart_img.paste(qr_right, (right_qr_x, right_qr_y), qr_right)
-
-    # Add a romantic border
-    border_size = 15
-    bordered_img = Image.new('RGBA', 
-                            (heart_width + border_size * 2, heart_height + border_size * 2), 
-                            (255, 182, 193, 100))  # Light pink border
-    bordered_img.paste(heart_img, (border_size, border_size), heart_img)
-    
-    # Convert to base64
-    buffered = io.BytesIO()
-    bordered_img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
-    
-    # Return base64 string for embedding in HTML    
-    return f"data:image/png;base64,{img_str}"
+    # Return base64 string for embedding in HTML
+    with span('qr'):
+        return png_data_uri(heart_qr_cache.get_png(url))
 
 @login_required
 def edit_page(request, page_id):
@@ -250,33 +171,67 @@ def edit_page(request, page_id):
         dj_messages.success(request, 'Page updated successfully!')
         return redirect('edit_page', page_id=page.id)
     
-    # Generate QR code
-    view_url = request.build_absolute_uri(reverse('view_page', args=[page.id]))
-    print(f"Generating QR code for page {page.id} with URL: {view_url}")
-    qr_code = generate_heart_qr_code(view_url)
-    
+    # The QR image is served (and browser-cached) by heart_qr_image
     return render(request, 'edit_page.html', {
         'page': page,
-        'qr_code': qr_code,
+        'qr_code': reverse('heart_qr_png', args=[page.id]),
         'messages': page.messages.all().order_by('order', 'id')
     })
 
+async def heart_qr_image(request, page_id, fmt='png'):
+    """Serve the heart QR code of a page as a long-lived, content-addressed image"""
+    try:
+        created_at = await MessagePage.objects.values_list('created_at', flat=True).aget(id=page_id)
+    except MessagePage.DoesNotExist:
+        raise Http404("No MessagePage matches the given query.")
+    view_url = request.build_absolute_uri(reverse('view_page', args=[page_id]))
+    etag = quote_etag(heart_qr_digest(view_url, fmt))
+    last_modified = int(created_at.timestamp())
+
+    # Answer revalidation before touching the renderer or its cache
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            with span('qr'):
+                image = await heart_qr_cache.aget(view_url, fmt)
+        except QRRenderTimeout:
+            response = HttpResponse(status=503)
+            response['Retry-After'] = '5'
+            return response
+        response = HttpResponse(image, content_type=HEART_QR_FORMATS[fmt])
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@replica_reads
 def view_page(request, page_id):
+    # Hot pages are served straight from the cache; views are still counted
+    cached = page_cache.get_response(page_id)
+    if cached is not None:
+        view_counter.increment(page_id)
+        content, etag, last_modified = cached
+        response = not_modified(request, etag, last_modified) or HttpResponse(content)
+        return set_validators(response, etag, last_modified)
+
+    version = page_cache.render_version(page_id)
     page = get_object_or_404(MessagePage, id=page_id)
     
     # Increment view count
-    page.view_count = (page.view_count or 0) + 1
-    page.save(update_fields=['view_count'])
-    
-    messages_list = list(page.messages.values_list('text', flat=True).order_by('order', 'id'))
+    view_counter.increment(page.id)
     
-    return render(request, 'view_page.html', {
-        'page': page,
-        'messages_json': json.dumps(messages_list)
-    })
-
-# Set up logging
-logger = logging.getLogger(__name__)
+    # A revalidating viewer gets a 304 without the page being rendered
+    etag, last_modified = page_validators(page)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        # The page row carries its messages snapshot: no Message queries
+        response = render(request, 'view_page.html', {
+            'page': page,
+            'messages_json': page.messages_json
+        })
+        page_cache.set_response(page.id, version, response.content, etag, last_modified)
+    return set_validators(response, etag, last_modified)
 
 @csrf_exempt
 @login_required
@@ -293,27 +248,55 @@ def add_message(request, page_id):
         if 'text' not in data or not data['text'].strip():
             return JsonResponse({'success': False, 'error': 'Text field is required'}, status=400)
         
-        Message.objects.create(
-            page=page,
-            text=data['text'],
-            order=data.get('order', 0)
-        )
+        # The message and its page's snapshot (see signals.py) commit together
+        with transaction.atomic():
+            Message.objects.create(
+                page=page,
+                text=data['text'],
+                order=data.get('order', 0)
+            )
         
         return JsonResponse({'success': True})
     
     return JsonResponse({'success': False}, status=405)
     
+@csrf_exempt
+@login_required
+def add_messages(request, page_id):
+    """Add many messages to a page in one request"""
+    if request.method == 'POST':
+        page = get_object_or_404(MessagePage, id=page_id, user=request.user)
+        
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        
+        items = data.get('messages') if isinstance(data, dict) else data
+        try:
+            created = bulk_add_messages(page, items)
+        except MessageValidationError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'errors': e.errors}, status=400)
+        
+        return JsonResponse({'success': True, 'created': len(created)})
+    
+    return JsonResponse({'success': False}, status=405)
+
 @csrf_exempt
 @login_required
 def update_message(request, message_id):
     """Update an existing message"""
     if request.method == 'POST':
         message = get_object_or_404(Message, id=message_id, page__user=request.user)
-        data = json.loads(request.body)
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
         
         message.text = data.get('text', message.text)
         message.font_size = data.get('font_size', message.font_size)
-        message.save()
+        with transaction.atomic():
+            message.save()
         
         return JsonResponse({
             'success': True,
@@ -329,7 +312,8 @@ def delete_message(request, message_id):
     if request.method == 'DELETE':
         try:
             message = get_object_or_404(Message, id=message_id, page__user=request.user)
-            message.delete()
+            with transaction.atomic():
+                message.delete()
             return JsonResponse({'success': True})
         except:
             return JsonResponse({'success': False, 'error': 'Message not found or access denied'})
@@ -341,18 +325,47 @@ def delete_message(request, message_id):
 def reorder_messages(request, page_id):
     """Reorder messages via drag and drop"""
     if request.method == 'POST':
-        page = get_object_or_404(MessagePage, id=page_id, user=request.user)
-        data = json.loads(request.body)
-        message_ids = data.get('message_ids', [])
+        try:
+            data = json.loads(request.body)
+            message_ids = [int(message_id) for message_id in data.get('message_ids', [])]
+        except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Invalid message ids'}, status=400)
+        if len(set(message_ids)) != len(message_ids):
+            return JsonResponse({'success': False, 'error': 'Duplicate message ids'}, status=400)
         
-        # Update order for each message
-        for index, message_id in enumerate(message_ids):
-            Message.objects.filter(
-                id=message_id, 
-                page=page
-            ).update(order=index)
+        with transaction.atomic():
+            page = get_object_or_404(
+                MessagePage.objects.select_for_update(), id=page_id, user=request.user
+            )
+            
+            # Every id must belong to this page before anything is written
+            found = set(page.messages.filter(id__in=message_ids).values_list('id', flat=True))
+            unknown = [message_id for message_id in message_ids if message_id not in found]
+            if unknown:
+                return JsonResponse({'success': False, 'error': 'Unknown message ids', 'unknown': unknown}, status=400)
+            
+            expected_version = data.get('version')
+            if expected_version is not None and expected_version != page.messages_version:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Messages were reordered elsewhere',
+                    'version': page.messages_version
+                }, status=409)
+            
+            # Update order for all messages in a single statement
+            if message_ids:
+                Message.objects.filter(page=page, id__in=message_ids).update(order=Case(
+                    *[When(id=message_id, then=Value(index)) for index, message_id in enumerate(message_ids)],
+                    output_field=IntegerField()
+                ))
+            MessagePage.objects.filter(pk=page.pk).update(
+                messages_version=F('messages_version') + 1, updated_at=timezone.now(), **message_snapshot(page.pk)
+            )
+            
+            # update() sends no signals, so drop the cached render explicitly
+            page_cache.invalidate_page(page.id)
         
-        return JsonResponse({'success': True})
+        return JsonResponse({'success': True, 'version': page.messages_version + 1})
     
     return JsonResponse({'success': False})
 
@@ -368,19 +381,64 @@ def copy_messages(request):
         source_page = get_object_or_404(MessagePage, id=source_page_id, user=request.user)
         target_page = get_object_or_404(MessagePage, id=target_page_id, user=request.user)
         
-        # Copy messages
-        for message in source_page.messages.all():
-            Message.objects.create(
-                page=target_page,
-                text=message.text,
-                order=message.order,
-                font_size=message.font_size
-            )
+        if wants_background(request, data):
+            return enqueue_job(request, 'copy_messages', {
+                'source_page_id': str(source_page.id), 'target_page_id': str(target_page.id)
+            })
         
-        return JsonResponse({'success': True})
+        # Copy messages server-side in one statement
+        stats = copy_page_messages(source_page, target_page)
+        
+        return JsonResponse({'success': True, 'copied': stats['messages'], 'seconds': stats['seconds']})
     
     return JsonResponse({'success': False})
 
+def wants_background(request, data=None):
+    """Whether the client asked for a job instead of waiting: Prefer: respond-async, ?async=1 or "async": true"""
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    if request.GET.get('async') == '1' or request.POST.get('async') == '1':
+        return True
+    return isinstance(data, dict) and data.get('async') is True
+
+def job_json(job):
+    return {
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error or None,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'url': reverse('job_status', args=[job.id]),
+    }
+
+def enqueue_job(request, kind, payload):
+    """Queue a job for request.user and answer 202 with where to poll it"""
+    try:
+        job, created = jobs.enqueue(kind, payload, user=request.user,
+                                    idempotency_key=request.headers.get('Idempotency-Key'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    response = JsonResponse({'success': True, 'created': created, 'job': job_json(job)}, status=202)
+    response['Location'] = reverse('job_status', args=[job.id])
+    return response
+
+@login_required
+def job_status(request, job_id):
+    """Poll a background job of the current user"""
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return JsonResponse({'success': True, 'job': job_json(job)})
+
+@login_required
+def job_list(request):
+    """The current user's most recent background jobs"""
+    recent = Job.objects.filter(user=request.user).order_by('-created_at')[:50]
+    return JsonResponse({'success': True, 'jobs': [job_json(job) for job in recent]})
+
+@replica_reads
 @login_required
 def page_analytics(request, page_id):
     """Simple analytics for page views"""
@@ -388,8 +446,8 @@ def page_analytics(request, page_id):
     
     context = {
         'page': page,
-        'total_views': page.view_count or 0,
-        'total_messages': page.messages.count(),
+        'total_views': (page.view_count or 0) + view_counter.pending(page.id),
+        'total_messages': page.message_count,
         'created_days_ago': (timezone.now() - page.created_at).days
     }
     
@@ -400,27 +458,32 @@ def duplicate_page(request, page_id):
     """Duplicate an existing page"""
     original_page = get_object_or_404(MessagePage, id=page_id, user=request.user)
     
-    # Create new page
-    new_page = MessagePage.objects.create(
-        user=request.user,
-        title=f"{original_page.title} (Copy)",
-        text_color=original_page.text_color,
-        background_color=original_page.background_color,
-        animation_speed=original_page.animation_speed
-    )
+    if wants_background(request):
+        return enqueue_job(request, 'duplicate_page', {'page_id': str(original_page.id)})
     
-    # Copy all messages
-    for message in original_page.messages.all():
-        Message.objects.create(
-            page=new_page,
-            text=message.text,
-            order=message.order,
-            font_size=message.font_size
-        )
+    # Create new page with all of its messages
+    (new_page,), stats = clone_pages([original_page], request.user)
     
-    dj_messages.success(request, f'Page duplicated successfully!')
+    dj_messages.success(request, f'Page duplicated successfully! Copied {stats["messages"]} messages in {stats["seconds"] * 1000:.0f} ms.')
     return redirect('edit_page', page_id=new_page.id)
 
+@login_required
+def duplicate_all_pages(request):
+    """Duplicate every page of the current user"""
+    if request.method == 'POST' and wants_background(request):
+        try:
+            jobs.enqueue('duplicate_all_pages', user=request.user, idempotency_key=request.headers.get('Idempotency-Key'))
+        except ValueError as e:
+            dj_messages.error(request, str(e))
+        else:
+            dj_messages.info(request, 'Your pages are being duplicated in the background.')
+    elif request.method == 'POST':
+        pages = MessagePage.objects.filter(user=request.user).order_by('created_at')
+        clones, stats = clone_pages(pages, request.user)
+        dj_messages.success(request, f'Duplicated {stats["pages"]} pages with {stats["messages"]} messages in {stats["seconds"] * 1000:.0f} ms.')
+    
+    return redirect('dashboard')
+
 @login_required
 def delete_page(request, page_id):
     """Delete a page"""
@@ -433,15 +496,109 @@ def delete_page(request, page_id):
     
     return redirect('dashboard')
 
+@replica_reads
 @login_required
 def preview_page(request, page_id):
     """Preview page in a modal or new tab"""
     page = get_object_or_404(MessagePage, id=page_id, user=request.user)
-    messages_list = list(page.messages.values_list('text', flat=True).order_by('order', 'id'))
     
-    # Don't increment view count for preview
-    return render(request, 'view_page.html', {  # Changed from 'preview_page.html'
-        'page': page,
-        'messages_json': json.dumps(messages_list),
-        'is_preview': True
-    })
\ No newline at end of file
+    etag, last_modified = page_validators(page, variant='preview')
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        # Don't increment view count for preview
+        response = render(request, 'view_page.html', {  # Changed from 'preview_page.html'
+            'page': page,
+            'messages_json': page.messages_json,
+            'is_preview': True
+        })
+    return set_validators(response, etag, last_modified, public=False)
+
+PAGE_MESSAGES_FIELDS = ('id', 'updated_at', 'messages_version', 'message_count')
+MESSAGE_API_FIELDS = ('text', 'font_size', 'order')
+MESSAGE_API_PAGE_SIZE = getattr(settings, 'MESSAGE_API_PAGE_SIZE', 100)
+MESSAGE_API_MAX_PAGE_SIZE = getattr(settings, 'MESSAGE_API_MAX_PAGE_SIZE', 1000)
+
+def page_messages_query(page, params):
+    """(values() queryset of one page of messages, requested fields, page size) for the messages API
+
+    Pages are keyset-paginated on (order, id), the message_page_order_idx order:
+    the cursor is the last message's "order.id". Raises ValueError for bad parameters.
+    """
+    fields = [name for name in params.get('fields', ','.join(MESSAGE_API_FIELDS)).split(',') if name]
+    unknown = sorted(set(fields) - set(MESSAGE_API_FIELDS))
+    if unknown or not fields:
+        raise ValueError(f"fields must be a comma-separated subset of {', '.join(MESSAGE_API_FIELDS)}")
+    try:
+        limit = int(params.get('limit', MESSAGE_API_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if not 1 <= limit <= MESSAGE_API_MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MESSAGE_API_MAX_PAGE_SIZE}')
+
+    qs = Message.objects.filter(page_id=page.pk).order_by('order', 'id')
+    cursor = params.get('cursor')
+    if cursor:
+        try:
+            order, last_id = (int(part) for part in cursor.rsplit('.', 1))
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        qs = qs.filter(Q(order__gt=order) | Q(order=order, id__gt=last_id))
+    # One extra row tells whether there is a next page
+    return qs.values('order', 'id', *fields)[:limit + 1], fields, limit
+
+def page_messages_response(page, rows, fields, limit):
+    """JSON for one page of messages, serialized from the values() rows without model instances"""
+    last = rows[limit - 1] if len(rows) > limit else None
+    with span('json'):
+        content = json.dumps({
+            'page': str(page.id),
+            'count': page.message_count,
+            'messages': [{name: row[name] for name in fields} for row in rows[:limit]],
+            'next': f"{last['order']}.{last['id']}" if last else None,
+        }, separators=(',', ':'))
+    return HttpResponse(content, content_type='application/json')
+
+@replica_reads
+def page_messages(request, page_id):
+    """A page's messages as paginated JSON (?fields=text,order&limit=100&cursor=...), with ETag revalidation"""
+    page = get_object_or_404(MessagePage.objects.only(*PAGE_MESSAGES_FIELDS), id=page_id)
+    # One ETag covers every cursor and projection: any message write bumps the page
+    etag, last_modified = page_validators(page, variant='messages')
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        try:
+            rows, fields, limit = page_messages_query(page, request.GET)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        response = page_messages_response(page, list(rows), fields, limit)
+    return set_validators(response, etag, last_modified)
+
+@login_required
+def export_pages(request):
+    """Stream all of the user's pages and messages as NDJSON (?gzip=1 to compress)"""
+    compress = request.GET.get('gzip') == '1'
+    pages = MessagePage.objects.filter(user=request.user)
+
+    def chunks():
+        chunks = transfer.encode_chunks(transfer.export_lines(pages))
+        return transfer.gzip_chunks(chunks) if compress else chunks
+
+    # Under ASGI a sync iterator would be read to the end before the first byte is sent
+    content = transfer.stream_in_thread(chunks) if isinstance(request, ASGIRequest) else chunks()
+    filename = 'love-pages.ndjson.gz' if compress else 'love-pages.ndjson'
+    response = StreamingHttpResponse(content, content_type='application/gzip' if compress else 'application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@csrf_exempt
+@login_required
+def import_pages(request):
+    """Import pages and messages from an NDJSON (or gzipped NDJSON) request body"""
+    if request.method == 'POST':
+        try:
+            stats = transfer.import_pages(request, request.user)
+        except transfer.TransferError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'line': e.line_number}, status=400)
+        return JsonResponse({'success': True, **stats})
+
+    return JsonResponse({'success': False}, status=405)
@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'love_project.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DB_WARMUP:
+    import threading
+
+    from love_project.db import warm_up_connections
+
+    # Connections are per thread under ASGI, so only pools are worth filling. That
+    # happens in the background: the app may be imported inside the event loop
+    threading.Thread(target=warm_up_connections, kwargs={'pooled_only': True},
+                     name='db-warmup', daemon=True).start()
@@ -0,0 +1,263 @@
+"""Brotli / gzip encoding of dynamic responses.
+
+compression_middleware encodes HTML, JSON and other text responses for the
+client, preferring br over gzip, the way Django's GZipMiddleware does (Vary,
+Content-Length, weak ETag). Responses smaller than COMPRESSION_MIN_SIZE or
+of a type outside COMPRESSION_CONTENT_TYPES are sent as they are; WhiteNoise
+serves its own precompressed static files. Streaming responses are encoded
+chunk by chunk, each chunk flushed so the client sees it as soon as it is
+produced (COMPRESSION_STREAMING).
+
+Levels come from COMPRESSION_BROTLI_QUALITY / COMPRESSION_GZIP_LEVEL and are
+capped at MAX_BROTLI_QUALITY / MAX_GZIP_LEVEL: above that the CPU per byte
+climbs steeply for a few percent of size. Bytes in and out and the CPU time
+spent are exported at /metrics per encoding.
+
+Pages that carry a CSRF token are safe to compress: Django masks the token
+differently in every response, which defeats BREACH.
+"""
+import threading
+import time
+import zlib
+
+import brotli
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.regex_helper import _lazy_re_compile
+
+from love_project.metrics import registry, span
+
+# In order of preference
+ENCODINGS = ('br', 'gzip')
+
+# Below this, headers and framing outweigh what compression saves
+MIN_SIZE = 200
+
+# Brotli's default quality (11) is meant for static assets; 5 compresses
+# about as well as gzip -6 at a similar speed
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+# Brotli 10 and 11 switch to a far slower algorithm; gzip tops out at 9
+MAX_BROTLI_QUALITY = 9
+MAX_GZIP_LEVEL = 9
+
+CONTENT_TYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'image/svg+xml',
+)
+
+_weak_etag = _lazy_re_compile(r'^W/')
+
+
+def negotiate(accept_encoding, encodings=ENCODINGS):
+    """The first of encodings allowed by an Accept-Encoding header, or None"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def levels():
+    """(brotli quality, gzip level) from settings, capped"""
+    return (
+        max(0, min(getattr(settings, 'COMPRESSION_BROTLI_QUALITY', BROTLI_QUALITY), MAX_BROTLI_QUALITY)),
+        max(1, min(getattr(settings, 'COMPRESSION_GZIP_LEVEL', GZIP_LEVEL), MAX_GZIP_LEVEL)),
+    )
+
+
+class Compressor:
+    """Incremental br or gzip encoder"""
+
+    def __init__(self, encoding):
+        brotli_quality, gzip_level = levels()
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: a gzip header and trailer, with mtime 0
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._brotli.process(data) if self._brotli else self._zlib.compress(data)
+
+    def flush(self):
+        """Everything compressed so far, decodable by the client without waiting for the rest"""
+        return self._brotli.flush() if self._brotli else self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._brotli.finish() if self._brotli else self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(content, encoding):
+    compressor = Compressor(encoding)
+    return compressor.compress(content) + compressor.finish()
+
+
+class CompressionStats:
+    """Per-encoding response count, bytes before and after, and CPU seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings = {}  # encoding -> [responses, bytes in, bytes out, cpu seconds]
+
+    def observe(self, encoding, bytes_in, bytes_out, cpu_seconds, responses=1):
+        with self._lock:
+            totals = self._encodings.setdefault(encoding, [0, 0, 0, 0.0])
+            totals[0] += responses
+            totals[1] += bytes_in
+            totals[2] += bytes_out
+            totals[3] += cpu_seconds
+
+    def totals(self):
+        with self._lock:
+            return {encoding: list(values) for encoding, values in self._encodings.items()}
+
+    def reset(self):
+        with self._lock:
+            self._encodings.clear()
+
+    def collect(self):
+        totals = sorted(self.totals().items())
+
+        def family(index):
+            return [({'encoding': encoding}, values[index]) for encoding, values in totals]
+
+        return [
+            ('http_compressed_responses_total', 'Responses encoded by compression_middleware', 'counter', family(0)),
+            ('http_compression_bytes_in_total', 'Response bytes before encoding', 'counter', family(1)),
+            ('http_compression_bytes_out_total', 'Response bytes after encoding', 'counter', family(2)),
+            ('http_compression_bytes_saved_total', 'Response bytes saved by encoding', 'counter', [
+                ({'encoding': encoding}, values[1] - values[2]) for encoding, values in totals
+            ]),
+            ('http_compression_cpu_seconds_total', 'Thread CPU time spent encoding', 'counter', family(3)),
+        ]
+
+
+stats = CompressionStats()
+registry.register_collector(stats.collect)
+
+
+def _compressible(response):
+    if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    return content_type in getattr(settings, 'COMPRESSION_CONTENT_TYPES', CONTENT_TYPES)
+
+
+def _mark_encoded(response, encoding):
+    # The encoded bytes differ from the identity ones: a strong ETag would claim otherwise
+    etag = response.get('ETag')
+    if etag and not _weak_etag.match(etag):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+
+
+def _compress_stream(chunks, encoding):
+    compressor = Compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            started = time.thread_time()
+            data = compressor.compress(chunk) + compressor.flush()
+            cpu += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(data)
+            if data:
+                yield data
+        data = compressor.finish()
+        bytes_out += len(data)
+        yield data
+    finally:
+        stats.observe(encoding, bytes_in, bytes_out, cpu)
+
+
+async def _acompress_stream(chunks, encoding):
+    compressor = Compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    try:
+        async for chunk in chunks:
+            started = time.thread_time()
+            data = compressor.compress(chunk) + compressor.flush()
+            cpu += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(data)
+            if data:
+                yield data
+        data = compressor.finish()
+        bytes_out += len(data)
+        yield data
+    finally:
+        stats.observe(encoding, bytes_in, bytes_out, cpu)
+
+
+def compress_response(request, response):
+    """Encode a response for the client in place, if it is worth it"""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not _compressible(response):
+        return response
+
+    if response.streaming:
+        if not getattr(settings, 'COMPRESSION_STREAMING', True):
+            return response
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        if response.is_async:
+            response.streaming_content = _acompress_stream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = _compress_stream(response.streaming_content, encoding)
+        del response.headers['Content-Length']
+        _mark_encoded(response, encoding)
+        return response
+
+    if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', MIN_SIZE):
+        return response
+    encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    with span('compress'):
+        started = time.thread_time()
+        compressed = compress(response.content, encoding)
+        cpu = time.thread_time() - started
+    stats.observe(encoding, len(response.content), len(compressed), cpu)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    _mark_encoded(response, encoding)
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    """compress_response for every response"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return compress_response(request, await get_response(request))
+    else:
+        def middleware(request):
+            return compress_response(request, get_response(request))
+    return middleware
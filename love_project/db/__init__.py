@@ -0,0 +1 @@
+from .pool import ConnectionPool, PoolTimeout, connection_stats, warm_up_connections  # noqa: F401
@@ -0,0 +1,8 @@
+"""mssql-django with pooled pyodbc connections"""
+from mssql import base
+
+from ..pooled import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
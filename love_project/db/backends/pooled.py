@@ -0,0 +1,71 @@
+from functools import partial
+
+from django.db import DatabaseError
+
+from ..pool import get_pool
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,      # open connections per worker process
+    'TIMEOUT': 5.0,      # seconds to wait for a free connection before PoolTimeout
+    'MAX_IDLE': 300.0,   # close connections idle longer than this (Azure drops them anyway)
+    'CHECK_AFTER': 5.0,  # ping connections idle longer than this before reuse (CONN_HEALTH_CHECKS)
+    'WARMUP': 1,         # connections opened per worker by warm_up_connections()
+}
+
+
+class PooledDatabaseWrapperMixin:
+    """Borrow connections from the alias's ConnectionPool instead of opening one per connect().
+
+    Configured by the POOL entry of the database settings (see POOL_DEFAULTS).
+    close() hands the connection back rather than closing it, so run with
+    CONN_MAX_AGE = 0: every request ends by returning its connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+
+    @property
+    def pool(self):
+        options = self.pool_options
+        connect = partial(super().get_new_connection, self.get_connection_params())
+        return get_pool(
+            self.alias, connect,
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_idle=options['MAX_IDLE'],
+            check=self._ping if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+            check_after=options['CHECK_AFTER'],
+        )
+
+    def get_new_connection(self, conn_params):
+        connection, self.connection_reused = self.pool.acquire()
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection closed mid-transaction, or broken by an error, is not reusable
+        if self.in_atomic_block or (self.errors_occurred and not self.is_usable()):
+            self.pool.discard(self.connection)
+            return
+        try:
+            with self.wrap_database_errors:
+                if not self.autocommit:
+                    self.connection.rollback()
+        except DatabaseError:
+            self.pool.discard(self.connection)
+            return
+        self.pool.release(self.connection)
+
+    def warm_pool(self):
+        return self.pool.fill(self.pool_options['WARMUP'])
+
+    @staticmethod
+    def _ping(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+        return True
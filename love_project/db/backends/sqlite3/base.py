@@ -0,0 +1,8 @@
+"""Django's SQLite backend with pooled connections; used to exercise the pool locally"""
+from django.db.backends.sqlite3 import base
+
+from ..pooled import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
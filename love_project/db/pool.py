@@ -0,0 +1,255 @@
+"""Per-process pool of raw DB-API connections.
+
+Under ASGI every request's sync code runs in a fresh thread, so Django's
+per-thread persistent connections (CONN_MAX_AGE) are never reused there and
+each request pays a full TCP + TLS + ODBC login to Azure SQL. The pooled
+database backends in love_project.db.backends instead borrow a connection
+from a ConnectionPool on connect() and hand it back on close().
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+class ConnectionPool:
+    """Up to max_size open connections made by connect(), shared by all threads of a worker"""
+
+    def __init__(self, connect, max_size=10, timeout=5.0, max_idle=300.0, check=None, check_after=5.0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        # Idle connections older than max_idle seconds are closed rather than reused
+        self.max_idle = max_idle
+        # check(conn) -> bool is run on connections idle for more than check_after seconds
+        self.check = check
+        self.check_after = check_after
+        self._idle = deque()  # (connection, returned_at), most recently returned last
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'acquires': 0, 'created': 0, 'reused': 0, 'waits': 0, 'timeouts': 0,
+            'discarded': 0, 'acquire_seconds': 0.0, 'max_acquire_seconds': 0.0,
+        }
+
+    def acquire(self):
+        """Check out an idle connection, opening a new one while under max_size"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                conn = self._pop_idle()
+                if conn is not None:
+                    reused = True
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    reused = False
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s "
+                                      f"({self.max_size} in use)")
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+
+        if not reused:
+            try:
+                conn = self.connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+        self._record(started, reused)
+        return conn, reused
+
+    def release(self, conn):
+        """Return a checked-out connection for reuse"""
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Close a checked-out connection instead of returning it"""
+        self._close(conn)
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def fill(self, n):
+        """Open connections until n are idle (or the pool is full); returns how many were opened"""
+        opened = 0
+        while True:
+            with self._cond:
+                if len(self._idle) >= n or self._open >= self.max_size:
+                    return opened
+                self._open += 1
+            try:
+                conn = self.connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+            self.release(conn)
+            opened += 1
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones are closed when discarded"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats, open=self._open, idle=len(self._idle), max_size=self.max_size)
+        stats['in_use'] = stats['open'] - stats['idle']
+        acquires = stats['acquires']
+        stats['reuse_rate'] = round(stats['reused'] / acquires, 4) if acquires else 0.0
+        stats['avg_acquire_seconds'] = stats['acquire_seconds'] / acquires if acquires else 0.0
+        return stats
+
+    def _pop_idle(self):
+        """Most recently returned usable idle connection, closing stale ones (caller holds the lock)"""
+        while self._idle:
+            conn, returned_at = self._idle.pop()
+            idle_for = time.monotonic() - returned_at
+            stale = self.max_idle is not None and idle_for > self.max_idle
+            if not stale and (self.check is None or idle_for <= self.check_after or self._safe_check(conn)):
+                return conn
+            self._close(conn)
+            self._open -= 1
+            self._stats['discarded'] += 1
+        return None
+
+    def _safe_check(self, conn):
+        try:
+            return bool(self.check(conn))
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            logger.debug("Error closing pooled connection", exc_info=True)
+
+    def _record(self, started, reused):
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._stats['acquires'] += 1
+            self._stats['reused' if reused else 'created'] += 1
+            self._stats['acquire_seconds'] += elapsed
+            self._stats['max_acquire_seconds'] = max(self._stats['max_acquire_seconds'], elapsed)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_requests = 0
+_new_connections = 0
+
+
+def get_pool(alias, connect, **options):
+    """The pool for a database alias, created on first use"""
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(connect, **options)
+    return pool
+
+
+def reset_pools():
+    """Close and forget every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+# A forked child must not share its parent's sockets: forget them without closing
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pools.clear)
+
+
+def _count_request(**kwargs):
+    global _requests
+    _requests += 1
+
+
+def _count_connection(connection, **kwargs):
+    global _new_connections
+    # Pooled checkouts of an already open connection are not new connections
+    if not getattr(connection, 'connection_reused', False):
+        _new_connections += 1
+
+
+request_started.connect(_count_request, dispatch_uid='love_project.db.pool.count_request')
+connection_created.connect(_count_connection, dispatch_uid='love_project.db.pool.count_connection')
+
+
+def connection_stats():
+    """Pool metrics per alias, plus new physical connections per request served by this worker.
+
+    connections_per_request is 1.0 when nothing is reused; persistent
+    connections or a pool push it towards 0.
+    """
+    return {
+        'requests': _requests,
+        'new_connections': _new_connections,
+        'connections_per_request': round(_new_connections / _requests, 4) if _requests else None,
+        'pools': {alias: pool.stats() for alias, pool in list(_pools.items())},
+    }
+
+
+def warm_up_connections(aliases=None, pooled_only=False):
+    """Open connections for each database before the first request arrives.
+
+    Pooled aliases are filled to their configured WARMUP size; others, unless
+    pooled_only, get this thread's connection opened, which persists under
+    CONN_MAX_AGE (useful for WSGI workers serving from their main thread).
+    Failures are logged, never raised: a worker should still start when the
+    database is briefly unreachable.
+    """
+    from django.db import connections
+
+    warmed = {}
+    for alias in aliases or connections:
+        connection = connections[alias]
+        started = time.perf_counter()
+        try:
+            if hasattr(connection, 'warm_pool'):
+                opened = connection.warm_pool()
+            elif pooled_only:
+                continue
+            else:
+                connection.ensure_connection()
+                opened = 1
+        except Exception:
+            logger.exception("Warming up database connections for %r failed", alias)
+            continue
+        warmed[alias] = opened
+        logger.info("Opened %s connection(s) to %r in %.1f ms", opened, alias,
+                    (time.perf_counter() - started) * 1000)
+    return warmed
@@ -0,0 +1,116 @@
+"""Send selected reads to read replicas, with read-your-writes stickiness.
+
+Only views wrapped in replica_reads read from settings.DATABASE_REPLICAS;
+everything else, and every write, uses the primary ('default'). A request
+that writes pins the rest of itself to the primary, and
+replica_routing_middleware then sets a cookie keeping that client's reads on
+the primary for DB_REPLICA_STICKY_SECONDS, long enough for replicas to catch
+up with what the user just saved.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+
+STICKY_COOKIE = 'db_primary_until'
+
+
+class RoutingState:
+    """Where the current request may read from"""
+
+    def __init__(self, pinned=False):
+        self.replica_reads = False  # set by replica_reads
+        self.pinned = pinned        # reads must see the primary
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_reads(view):
+    """Let a view's reads go to a replica (unless the request is pinned to the primary)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            _allow_replica_reads()
+            return await view(request, *args, **kwargs)
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        _allow_replica_reads()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _allow_replica_reads():
+    state = _state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+def pin_to_primary():
+    """Read from the primary for the rest of this request"""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or not replicas or not state.replica_reads or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    def start(request):
+        try:
+            pinned = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = RoutingState(pinned=pinned)
+        return state, _state.set(state)
+
+    def finish(state, response):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            window = settings.DB_REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(time.time() + window), max_age=window,
+                                httponly=True, samesite='Lax')
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state, token = start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _state.reset(token)
+            return finish(state, response)
+    else:
+        def middleware(request):
+            state, token = start(request)
+            try:
+                response = get_response(request)
+            finally:
+                _state.reset(token)
+            return finish(state, response)
+    return middleware
@@ -0,0 +1,316 @@
+"""Per-request timings: Server-Timing headers, structured log lines and /metrics.
+
+metrics_middleware times every request into a per-process registry (request
+count and latency histogram per view). A METRICS_SAMPLE_RATE fraction of
+requests is also broken down into DB queries and time, template render time
+and named spans (span('qr'), span('json'), ...); only those get a
+Server-Timing header and a log line, so unsampled requests pay for two clock
+reads and a counter update.
+
+metrics_view serves the registry, plus any registered collectors, in the
+Prometheus text format. Every worker process keeps its own numbers.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    """Breakdown of one sampled request"""
+
+    __slots__ = ('queries', 'db_seconds', 'template_seconds', 'spans')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.spans = {}
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        entries = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+        ]
+        entries.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.spans.items())
+        return ', '.join(entries)
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+def current_timings():
+    """Timings of the current request, or None when it is not sampled"""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Time a block as a named span of the current request (a no-op unless it is sampled)"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, time.perf_counter() - started)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def _install_query_timer(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timer, dispatch_uid='love_project.metrics.install_query_timer')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time counted in sampled requests"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class MetricsRegistry:
+    """Request counters and latency histograms per (view, method, status)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = {}  # (view, method, status) -> [count, seconds, bucket counts]
+        self._sampled = {}   # view -> {'requests', 'queries', 'db_seconds', 'template_seconds', 'spans'}
+        self._collectors = []
+
+    def observe(self, view, method, status, seconds, timings=None):
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        key = (view, method, status)
+        with self._lock:
+            series = self._requests.get(key)
+            if series is None:
+                series = self._requests[key] = [0, 0.0, [0] * (len(self.buckets) + 1)]
+            series[0] += 1
+            series[1] += seconds
+            series[2][bucket] += 1
+            if timings is not None:
+                sampled = self._sampled.get(view)
+                if sampled is None:
+                    sampled = self._sampled[view] = {
+                        'requests': 0, 'queries': 0, 'db_seconds': 0.0, 'template_seconds': 0.0, 'spans': {},
+                    }
+                sampled['requests'] += 1
+                sampled['queries'] += timings.queries
+                sampled['db_seconds'] += timings.db_seconds
+                sampled['template_seconds'] += timings.template_seconds
+                for name, span_seconds in timings.spans.items():
+                    sampled['spans'][name] = sampled['spans'].get(name, 0.0) + span_seconds
+
+    def register_collector(self, collect):
+        """Add collect() -> [(metric name, help, type, [(labels dict, value), ...]), ...] to /metrics"""
+        if collect not in self._collectors:
+            self._collectors.append(collect)
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._sampled.clear()
+
+    def collect(self):
+        with self._lock:
+            requests = {key: (count, seconds, list(buckets)) for key, (count, seconds, buckets) in self._requests.items()}
+            sampled = {view: dict(values, spans=dict(values['spans'])) for view, values in self._sampled.items()}
+
+        histogram = []
+        for (view, method, status), (count, seconds, buckets) in sorted(requests.items()):
+            labels = {'view': view, 'method': method, 'status': str(status)}
+            cumulative = 0
+            for bound, in_bucket in zip(self.buckets, buckets):
+                cumulative += in_bucket
+                histogram.append(('_bucket', dict(labels, le=repr(bound)), cumulative))
+            histogram.append(('_bucket', dict(labels, le='+Inf'), count))
+            histogram.append(('_sum', labels, seconds))
+            histogram.append(('_count', labels, count))
+        families = [('http_request_duration_seconds', 'Request wall time', 'histogram', histogram)]
+
+        def per_view(field):
+            return [('', {'view': view}, values[field]) for view, values in sorted(sampled.items())]
+
+        families += [
+            ('http_sampled_requests_total', 'Requests broken down into the metrics below', 'counter',
+             per_view('requests')),
+            ('http_sampled_db_queries_total', 'DB queries of sampled requests', 'counter', per_view('queries')),
+            ('http_sampled_db_seconds_total', 'DB time of sampled requests', 'counter', per_view('db_seconds')),
+            ('http_sampled_template_seconds_total', 'Template render time of sampled requests', 'counter',
+             per_view('template_seconds')),
+            ('http_sampled_span_seconds_total', 'Named span time of sampled requests', 'counter', [
+                ('', {'view': view, 'span': name}, seconds)
+                for view, values in sorted(sampled.items()) for name, seconds in sorted(values['spans'].items())
+            ]),
+        ]
+        for collect in self._collectors:
+            try:
+                for name, help_text, kind, samples in collect():
+                    families.append((name, help_text, kind, [('', labels, value) for labels, value in samples]))
+            except Exception:
+                logger.exception("Metrics collector %r failed", collect)
+        return families
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for name, help_text, kind, samples in self.collect():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {value}' if label_text else f'{name}{suffix} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def _db_pool_metrics():
+    from love_project.db import connection_stats
+
+    stats = connection_stats()
+    pools = stats['pools']
+    return [
+        ('db_new_connections_total', 'Physical DB connections opened', 'counter', [({}, stats['new_connections'])]),
+        ('db_pool_connections', 'Pooled DB connections by state', 'gauge', [
+            ({'alias': alias, 'state': state}, pool[state])
+            for alias, pool in sorted(pools.items()) for state in ('idle', 'in_use')
+        ]),
+        ('db_pool_acquires_total', 'Pool checkouts', 'counter', [
+            ({'alias': alias}, pool['acquires']) for alias, pool in sorted(pools.items())
+        ]),
+        ('db_pool_timeouts_total', 'Pool checkouts that timed out', 'counter', [
+            ({'alias': alias}, pool['timeouts']) for alias, pool in sorted(pools.items())
+        ]),
+    ]
+
+
+registry.register_collector(_db_pool_metrics)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Time every request; break a METRICS_SAMPLE_RATE fraction of them down further"""
+
+    def start():
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None, None
+        timings = RequestTimings()
+        # Connections opened before this module was imported have no query timer yet
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(connection)
+        return timings, _current.set(timings)
+
+    def finish(request, response, started, timings):
+        elapsed = time.perf_counter() - started
+        view = _view_name(request)
+        registry.observe(view, request.method, response.status_code, elapsed, timings)
+        if timings is not None:
+            response['Server-Timing'] = timings.server_timing(elapsed)
+            logger.info(
+                "%s %s %s %.1fms db=%d/%.1fms tpl=%.1fms%s", request.method, view, response.status_code,
+                elapsed * 1000, timings.queries, timings.db_seconds * 1000, timings.template_seconds * 1000,
+                ''.join(f' {name}={seconds * 1000:.1f}ms' for name, seconds in timings.spans.items()),
+                extra={'view': view, 'status': response.status_code, 'duration_ms': round(elapsed * 1000, 3),
+                       'db_queries': timings.queries, 'db_ms': round(timings.db_seconds * 1000, 3),
+                       'template_ms': round(timings.template_seconds * 1000, 3),
+                       'spans_ms': {name: round(seconds * 1000, 3) for name, seconds in timings.spans.items()}},
+            )
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            timings, token = start()
+            try:
+                response = await get_response(request)
+            finally:
+                if token is not None:
+                    _current.reset(token)
+            return finish(request, response, started, timings)
+    else:
+        def middleware(request):
+            started = time.perf_counter()
+            timings, token = start()
+            try:
+                response = get_response(request)
+            finally:
+                if token is not None:
+                    _current.reset(token)
+            return finish(request, response, started, timings)
+    return middleware
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs METRICS_TOKEN as a bearer token, or DEBUG when none is set"""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -24,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-l)ard_fykgb)pzy44(i6xjgoasn5a83*kq+!jt&anu*ix!6tmv'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ["*"]  # Allow all hosts for development; change in production
 
@@ -41,12 +41,19 @@ INSTALLED_APPS = [
     'love_messages',
 ]
 
+# Index INCLUDE columns (love_messages.models) are for SQL Server; SQLite builds
+# the same indexes without them
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 MIDDLEWARE = [
+    'love_project.metrics.metrics_middleware',
+    'love_project.compression.compression_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'love_project.db.routers.replica_routing_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -54,12 +61,19 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'love_project.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, with render time counted in sampled requests (love_project.metrics)
+        'BACKEND': 'love_project.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept in memory outside DEBUG; in DEBUG edits show up on reload
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -76,6 +90,7 @@ WSGI_APPLICATION = 'love_project.wsgi.application'
 # Check if we're in testing/CI environment
 import os
 import sys
+import tempfile
 
 TESTING = 'test' in sys.argv or os.environ.get('TESTING') == 'True'
 
@@ -84,9 +99,15 @@ if TESTING or os.environ.get('USE_SQLITE') == 'True':
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': ':memory:' if TESTING else BASE_DIR / 'db.sqlite3',
+            'NAME': ':memory:' if TESTING else os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
         }
     }
+    if TESTING:
+        # Second database standing in for a read replica in the routing tests
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
 else:
     # Check if we're in production (Render) or development
     if os.environ.get('DB_ENGINE'):
@@ -120,11 +141,147 @@ else:
             },
         }
 
+# Database connection lifecycle. Under ASGI each request's sync code runs in a
+# new thread, so per-thread persistent connections (CONN_MAX_AGE) only pay off
+# under WSGI. DB_POOL_SIZE > 0 instead shares a pool of up to that many open
+# connections per worker (love_project.db), and disables pyodbc's own
+# driver-manager pooling (mssql-django reads DATABASE_CONNECTION_POOLING)
+POOLED_DB_ENGINES = {
+    'mssql': 'love_project.db.backends.mssql',
+    'django.db.backends.sqlite3': 'love_project.db.backends.sqlite3',
+}
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0 if 'sqlite' in DATABASES['default']['ENGINE'] else 10))
+DATABASE_CONNECTION_POOLING = os.environ.get('DB_ODBC_POOLING', 'False' if DB_POOL_SIZE else 'True') == 'True'
+# Open connections when a worker starts rather than on its first request
+DB_WARMUP = os.environ.get('DB_WARMUP', 'False' if TESTING else 'True') == 'True'
+
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+if DB_POOL_SIZE > 0:
+    DATABASES['default'].update({
+        'ENGINE': POOLED_DB_ENGINES.get(DATABASES['default']['ENGINE'], DATABASES['default']['ENGINE']),
+        # Closing a pooled connection returns it to the pool, so do it after every request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'WARMUP': int(os.environ.get('DB_POOL_WARMUP', 2)),
+        },
+    })
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 0 if TESTING else 60))
+
+# Read replicas. Each comma-separated DB_REPLICAS entry is the HOST (MSSQL) or
+# NAME (SQLite) of a replica of the default database, added as replica1, ...
+# Views marked replica_reads read from them unless the client wrote within the
+# last DB_REPLICA_STICKY_SECONDS (love_project.db.routers)
+DATABASE_REPLICAS = []
+for _index, _target in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(','))):
+    _replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if 'sqlite' in _replica['ENGINE']:
+        _replica['NAME'] = _target.strip()
+    else:
+        _replica['HOST'] = _target.strip()
+        # e.g. ApplicationIntent=ReadOnly for Azure SQL read scale-out
+        _replica['OPTIONS'] = dict(_replica.get('OPTIONS', {}),
+                                   extra_params=os.environ.get('DB_REPLICA_EXTRA_PARAMS', ''))
+    DATABASES[f'replica{_index + 1}'] = _replica
+    DATABASE_REPLICAS.append(f'replica{_index + 1}')
+DATABASE_ROUTERS = ['love_project.db.routers.ReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+
 # Remove the DATABASE_URL override since we're not using it anymore
 # if 'DATABASE_URL' in os.environ:
 #     DATABASES['default'] = dj_database_url.parse(os.environ['DATABASE_URL'])
 
 
+# Caches. Rendered public pages get their own alias, which must be shared by
+# every worker process (file or Redis backed) so an edit invalidates all copies
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # {% cache %} fragments, keyed on the page's updated_at so edits never serve stale ones
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'pages': {
+        'BACKEND': os.environ.get('PAGE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache' if TESTING
+                                  else 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'love_messages_pages')),
+    },
+}
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Heart QR render cache: in-process LRU capped in bytes, plus an optional
+# shared tier on one of the CACHES aliases (e.g. a FileBasedCache)
+QR_CACHE_MAX_BYTES = int(os.environ.get('QR_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+QR_CACHE_BACKEND = os.environ.get('QR_CACHE_BACKEND') or None
+
+# Heart QR rendering process pool. With 0 workers renders run inline; when
+# QR_RENDER_MAX_PENDING jobs are already in flight new renders also run inline
+QR_RENDER_WORKERS = int(os.environ.get('QR_RENDER_WORKERS', 2))
+QR_RENDER_MAX_PENDING = int(os.environ.get('QR_RENDER_MAX_PENDING', 8))
+QR_RENDER_TIMEOUT = float(os.environ.get('QR_RENDER_TIMEOUT', 10))
+
+# Page views are buffered per worker and written every VIEW_COUNT_FLUSH_INTERVAL
+# seconds, or sooner once VIEW_COUNT_BATCH_SIZE views are pending (0 = write-through)
+VIEW_COUNT_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 0 if TESTING else 5))
+VIEW_COUNT_BATCH_SIZE = int(os.environ.get('VIEW_COUNT_BATCH_SIZE', 100))
+
+# Serve the read path and single-message JSON APIs from love_messages.async_views
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'True') == 'True'
+
+# Most messages a single bulk add (API or template) may insert
+MAX_MESSAGES_PER_REQUEST = int(os.environ.get('MAX_MESSAGES_PER_REQUEST', 500))
+
+# Background jobs (love_messages.jobs), run by `manage.py run_worker`: worker threads
+# per process, seconds between polls of an empty queue, seconds between heartbeats
+# of running jobs, seconds without a heartbeat after which a running job is
+# assumed lost with its worker and requeued, and seconds before the first retry
+# of a failed job (doubled for each further attempt)
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 600))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 2))
+
+# Fraction of requests broken down into DB, template and span timings, sent
+# back as a Server-Timing header and logged; every request is still counted
+# at /metrics. That endpoint needs METRICS_TOKEN as a bearer token (or DEBUG)
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.05))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Brotli/gzip encoding of dynamic text responses of at least COMPRESSION_MIN_SIZE
+# bytes (levels are capped in love_project.compression to bound CPU per request)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 200))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_STREAMING = os.environ.get('COMPRESSION_STREAMING', 'True') == 'True'
+COMPRESSION_CONTENT_TYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'image/svg+xml',
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'root': {
+        # Tests assert on the log records they care about; keep their output clean
+        'handlers': [] if TESTING else ['console'],
+        'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -166,7 +323,8 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
     # Enable the WhiteNoise storage backend, which compresses static files to reduce disk use
     # and renames the files with unique names for each version to support long-term caching
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STATICFILES_STORAGE = ('django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING  # no collectstatic manifest
+                       else 'whitenoise.storage.CompressedManifestStaticFilesStorage')
 #STATIC_ROOT = BASE_DIR / 'staticfiles'
 #STATICFILES_DIRS = [BASE_DIR / 'static']
 